@@ -0,0 +1,123 @@
+"""Время работы с базой данных на один запрос рекомендаций (без модели).
+
+Сравнивает три способа получить студента и активные проекты:
+    sequential — два запроса по очереди в одной сессии (прежнее поведение);
+    concurrent — запросы параллельно в разных сессиях из пула;
+    snapshot   — проекты из теплого снимка SkillIndex, в базу идет только запрос студента.
+Для каждого режима печатает задержку выборки, суммарное время выполнения SQL и
+число запросов к базе на один запрос рекомендаций.
+
+Запуск (из корня репозитория, база заполнена benchmarks/seed_database.py):
+    python benchmarks/db_time.py --requests 2000
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from sqlalchemy import event, select  # noqa: E402
+
+from db import Repositories  # noqa: E402
+from db.database import db  # noqa: E402
+from db.models import Project, Student  # noqa: E402
+from db.project_repository import ProjectRepository  # noqa: E402
+from db.student_repository import StudentRepository  # noqa: E402
+from services.recommendation_engine import RecommendationEngine  # noqa: E402
+from services.skill_index import SkillIndex  # noqa: E402
+
+
+class StatementTimer:
+    """Суммарное время и число SQL-запросов через события движка SQLAlchemy"""
+
+    def __init__(self, engines):
+        self.total = 0.0
+        self.count = 0
+        for engine in engines:
+            event.listen(engine.sync_engine, "before_cursor_execute", self._before)
+            event.listen(engine.sync_engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        context._started = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        self.total += time.perf_counter() - context._started
+        self.count += 1
+
+    def reset(self) -> None:
+        self.total = 0.0
+        self.count = 0
+
+
+async def fetch(engine: RecommendationEngine, mode: str, student_id: int) -> None:
+    if mode == "sequential":
+        session = db.read_session()
+        try:
+            await engine._fetch_student_and_projects(
+                student_id, StudentRepository(session, Student), ProjectRepository(session, Project))
+        finally:
+            await session.close()
+        return
+
+    repos = Repositories(session_factory=db.async_session, read_session_factory=db.read_session)
+    try:
+        await engine._fetch_student_and_projects(student_id, repos.student_repo, repos.project_repo)
+    finally:
+        await repos.close()
+
+
+async def measure(engine: RecommendationEngine, timer: StatementTimer, mode: str, student_ids: np.ndarray):
+    latencies = np.empty(len(student_ids))
+    sql_time = np.empty(len(student_ids))
+    statements = np.empty(len(student_ids))
+    for i, student_id in enumerate(student_ids.tolist()):
+        timer.reset()
+        started = time.perf_counter()
+        await fetch(engine, mode, student_id)
+        latencies[i] = time.perf_counter() - started
+        sql_time[i] = timer.total
+        statements[i] = timer.count
+    return latencies * 1000, sql_time * 1000, statements
+
+
+async def main(args: argparse.Namespace) -> None:
+    await db.connect()
+    replicas = db.replica_router.replicas if db.replica_router else []
+    timer = StatementTimer([db.engine, *(replica.engine for replica in replicas)])
+    try:
+        async with db.async_session() as session:
+            ids = (await session.execute(select(Student.id))).scalars().all()
+        rng = np.random.default_rng(args.seed)
+        student_ids = rng.choice(np.array(ids), args.requests)
+
+        modes = {
+            "sequential": RecommendationEngine(None, skill_index=SkillIndex({}, {})),
+            "concurrent": RecommendationEngine(None, skill_index=SkillIndex({}, {})),
+            "snapshot": RecommendationEngine(None, skill_index=SkillIndex({}, {}), project_snapshot_max_age=3600),
+        }
+        print(f"{args.requests} requests, {len(ids)} students")
+        for mode, engine in modes.items():
+            await measure(engine, timer, mode, student_ids[:args.warmup])
+            latencies, sql_time, statements = await measure(engine, timer, mode, student_ids)
+            p50, p95 = np.percentile(latencies, [50, 95])
+            print(f"{mode:<11} fetch p50={p50:7.2f}ms p95={p95:7.2f}ms "
+                  f"sql={sql_time.mean():7.2f}ms/request statements={statements.mean():.2f}/request")
+    finally:
+        await db.disconnect()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
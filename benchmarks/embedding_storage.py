@@ -0,0 +1,105 @@
+"""Память, скорость и согласие ранжирования компактных форматов хранения эмбеддингов.
+
+Строит эмбеддинги s_tower и p_tower текущей версии модели для синтетических
+профилей (стек и роли из словарей модели, описание — случайный единичный вектор
+вместо SentenceTransformer) и для float32, float16 и int8 печатает:
+    memory     — байты матрицы студентов;
+    query      — запросов проект -> top-k студентов в секунду (как StudentMatrix.top_k);
+    batch      — оценок студент x проект в секунду при умножении матрицы на матрицу проектов;
+    recall@k   — доля top-k компактного формата, входящих в top-k по float32 (с учетом равных оценок);
+    max_err    — максимальная абсолютная ошибка косинуса.
+
+Запуск (из корня репозитория, база не нужна):
+    python benchmarks/embedding_storage.py --students 100000 --projects 500
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from config import settings  # noqa: E402
+from services.compact_embeddings import EMBEDDING_DTYPES, CompactMatrix  # noqa: E402
+from services.model_loader import ModelLoader  # noqa: E402
+
+
+def synthetic_features(rng: np.random.Generator, n: int, stack_size: int, roles_size: int, text_dim: int) -> np.ndarray:
+    features = np.zeros((n, stack_size + roles_size + text_dim), dtype=np.float32)
+    rows = np.arange(n)
+    for _ in range(4):
+        features[rows, rng.integers(0, stack_size, n)] = 1.0
+    features[rows, stack_size + rng.integers(0, roles_size, n)] = 1.0
+    if text_dim:
+        text = rng.normal(size=(n, text_dim)).astype(np.float32)
+        features[:, stack_size + roles_size:] = text / np.linalg.norm(text, axis=1, keepdims=True)
+    return features
+
+
+def tower(model: torch.nn.Module, features: np.ndarray, batch_size: int = 8192) -> np.ndarray:
+    with torch.no_grad():
+        return np.concatenate([
+            model(torch.from_numpy(features[start:start + batch_size])).numpy()
+            for start in range(0, len(features), batch_size)
+        ])
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    return np.argpartition(-scores, k - 1, axis=0)[:k]
+
+
+def main(args: argparse.Namespace) -> None:
+    model_data = ModelLoader(str(SRC_DIR / settings.MODEL_DIR)).load_model()
+    model = model_data["model"].cpu()
+    stack_size, roles_size = len(model_data["stack_vocab"]), len(model_data["roles_vocab"])
+    rng = np.random.default_rng(args.seed)
+    students = tower(model.s_tower, synthetic_features(rng, args.students, stack_size, roles_size, 0))
+    projects = tower(model.p_tower, synthetic_features(rng, args.projects, stack_size, roles_size, 384))
+    project_queries = projects / np.linalg.norm(projects, axis=1, keepdims=True)
+    print(f"model {model_data['version']}: {args.students} students, {args.projects} projects, "
+          f"dim={students.shape[1]}, k={args.k}")
+
+    reference = CompactMatrix.from_embeddings(students, "float32")
+    reference_scores = reference.dot(project_queries)
+    reference_top = top_k(reference_scores, args.k)
+
+    for dtype in EMBEDDING_DTYPES:
+        matrix = CompactMatrix.from_embeddings(students, dtype)
+
+        started = time.perf_counter()
+        for query in project_queries[:args.queries]:
+            scores = matrix.dot(query)
+            np.argpartition(-scores, args.k - 1)[:args.k]
+        query_rate = min(args.queries, len(project_queries)) / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        scores = matrix.dot(project_queries)
+        batch_rate = scores.size / (time.perf_counter() - started)
+
+        # Одинаковые профили дают одинаковые эмбеддинги, поэтому совпадение считается по оценке:
+        # найденный студент верен, если его float32-косинус не ниже k-го лучшего
+        found = top_k(scores, args.k)
+        columns = np.arange(scores.shape[1])
+        threshold = reference_scores[reference_top, columns].min(axis=0)
+        recall = float(np.mean(reference_scores[found, columns] >= threshold - 1e-6))
+        max_err = float(np.abs(scores - reference_scores).max())
+        print(f"{dtype:<8} memory={matrix.nbytes / 2**20:8.2f}MiB query={query_rate:8.0f}/s "
+              f"batch={batch_rate / 1e6:8.1f}M scores/s recall@{args.k}={recall:.4f} max_err={max_err:.5f}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--projects", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200, help="Запросов проект -> студенты для замера")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,297 @@
+"""Нагрузочный тест HTTP API рекомендаций против локального Postgres.
+
+Для каждой комбинации (workers, pool_size) поднимает uvicorn, затем для каждого
+уровня конкурентности гоняет асинхронный генератор нагрузки по
+/recommendations/student/{id} с ципфовским распределением ключей и печатает
+RPS, p50/p95/p99, долю ошибок и насыщение пула соединений (по pg_stat_activity
+и по метрикам /health/pool).
+
+Запуск (из корня репозитория, база заполнена benchmarks/seed_database.py):
+    python benchmarks/load_test.py --workers 1 2 4 --pool-sizes 5 10 --concurrency 16 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+
+import asyncpg
+import numpy as np
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from config import settings  # noqa: E402
+
+
+@dataclass
+class RunResult:
+    workers: int
+    pool_size: int
+    max_overflow: int
+    concurrency: int
+    requests: int = 0
+    errors: int = 0
+    duration: float = 0.0
+    rps: float = 0.0
+    p50_ms: float = 0.0
+    p95_ms: float = 0.0
+    p99_ms: float = 0.0
+    error_rate: float = 0.0
+    peak_connections: int = 0
+    peak_active_connections: int = 0
+    pool_capacity: int = 0
+    pool_saturation: float = 0.0
+    app_pool_max_wait_ms: float = 0.0
+    app_pool_peak_overflow: int = 0
+    app_pool_timeouts: int = 0
+    latencies: list[float] = field(default_factory=list, repr=False)
+
+
+class KeySampler:
+    """Выбирает id студентов по закону Ципфа: немногие «горячие» студенты запрашиваются чаще всего"""
+
+    def __init__(self, student_ids: list[int], skew: float, seed: int):
+        self.rng = np.random.default_rng(seed)
+        self.ids = np.array(student_ids)
+        self.rng.shuffle(self.ids)
+        weights = 1.0 / np.arange(1, len(self.ids) + 1) ** skew
+        self.cdf = np.cumsum(weights / weights.sum())
+
+    def sample(self, size: int) -> np.ndarray:
+        idx = np.searchsorted(self.cdf, self.rng.random(size))
+        return self.ids[np.minimum(idx, len(self.ids) - 1)]
+
+
+class HttpConnection:
+    """Минимальный HTTP/1.1 клиент с keep-alive, чтобы не тащить зависимость ради бенчмарка"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+
+    async def get(self, path: str) -> int:
+        status, _ = await self.request(path)
+        return status
+
+    async def request(self, path: str) -> tuple[int, bytes]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\n\r\n".encode())
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by server")
+        status = int(status_line.split()[1])
+        content_length = 0
+        keep_alive = True
+        while (line := await self.reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                content_length = int(value)
+            elif name == "connection" and value.strip().lower() == "close":
+                keep_alive = False
+        body = await self.reader.readexactly(content_length)
+        if not keep_alive:
+            await self.close()
+        return status, body
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.reader = None
+
+
+async def fetch_student_ids(limit: int | None) -> list[int]:
+    conn = await asyncpg.connect(
+        user=settings.POSTGRES_USER, password=settings.POSTGRES_PASSWORD,
+        database=settings.POSTGRES_DB, host=settings.DB_HOST, port=settings.POSTGRES_PORT)
+    try:
+        query = "SELECT id FROM student WHERE stack IS NOT NULL ORDER BY id"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        return [row["id"] for row in await conn.fetch(query)]
+    finally:
+        await conn.close()
+
+
+async def sample_app_pool(args: argparse.Namespace, http: HttpConnection, result: RunResult) -> None:
+    """Забирает метрики пула из /health/pool (ответ дает тот воркер, которому достался запрос)"""
+    try:
+        status, body = await http.request("/health/pool")
+    except (OSError, ConnectionError, asyncio.IncompleteReadError):
+        await http.close()
+        return
+    if status != 200:
+        return
+    stats = json.loads(body)
+    result.app_pool_max_wait_ms = max(result.app_pool_max_wait_ms, stats["max_wait_ms"])
+    result.app_pool_peak_overflow = max(result.app_pool_peak_overflow, stats["peak_overflow"])
+    result.app_pool_timeouts = max(result.app_pool_timeouts, stats["timeouts"])
+
+
+async def sample_connections(args: argparse.Namespace, result: RunResult, stop: asyncio.Event) -> None:
+    """Периодически смотрит в pg_stat_activity, сколько соединений держат воркеры приложения"""
+    http = HttpConnection(args.host, args.port)
+    conn = await asyncpg.connect(
+        user=settings.POSTGRES_USER, password=settings.POSTGRES_PASSWORD,
+        database=settings.POSTGRES_DB, host=settings.DB_HOST, port=settings.POSTGRES_PORT)
+    try:
+        while not stop.is_set():
+            row = await conn.fetchrow(
+                "SELECT count(*) AS total, count(*) FILTER (WHERE state = 'active') AS active "
+                "FROM pg_stat_activity WHERE datname = $1 AND pid <> pg_backend_pid()",
+                settings.POSTGRES_DB)
+            result.peak_connections = max(result.peak_connections, row["total"])
+            result.peak_active_connections = max(result.peak_active_connections, row["active"])
+            await sample_app_pool(args, http, result)
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=args.sample_interval)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        await conn.close()
+        await http.close()
+
+
+async def run_load(args: argparse.Namespace, sampler: KeySampler, result: RunResult) -> None:
+    keys = iter(sampler.sample(10_000_000))
+    deadline_warmup = time.perf_counter() + args.warmup
+    deadline = deadline_warmup + args.duration
+
+    async def client() -> None:
+        conn = HttpConnection(args.host, args.port)
+        try:
+            while (now := time.perf_counter()) < deadline:
+                path = f"/recommendations/student/{next(keys)}?top_n={args.top_n}"
+                start = time.perf_counter()
+                try:
+                    status = await conn.get(path)
+                except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+                    status = 0
+                    await conn.close()
+                if now < deadline_warmup:
+                    continue
+                result.latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    result.errors += 1
+        finally:
+            await conn.close()
+
+    stop = asyncio.Event()
+    sampler_task = asyncio.create_task(sample_connections(args, result, stop))
+    await asyncio.gather(*(client() for _ in range(result.concurrency)))
+    stop.set()
+    await sampler_task
+
+    latencies_ms = np.array(result.latencies) * 1000
+    result.requests = len(latencies_ms)
+    result.duration = args.duration
+    result.rps = result.requests / args.duration
+    if result.requests:
+        result.p50_ms, result.p95_ms, result.p99_ms = (float(v) for v in np.percentile(latencies_ms, [50, 95, 99]))
+        result.error_rate = result.errors / result.requests
+    result.pool_capacity = result.workers * (result.pool_size + result.max_overflow)
+    result.pool_saturation = result.peak_connections / result.pool_capacity if result.pool_capacity else 0.0
+
+
+def start_server(args: argparse.Namespace, workers: int, pool_size: int) -> subprocess.Popen:
+    env = dict(os.environ, DB_POOL_SIZE=str(pool_size), DB_MAX_OVERFLOW=str(args.max_overflow))
+    cmd = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--app-dir", str(SRC_DIR), "--host", args.host, "--port", str(args.port),
+        "--workers", str(workers), "--log-level", "warning",
+    ]
+    return subprocess.Popen(cmd, env=env, cwd=SRC_DIR, stdout=subprocess.DEVNULL if args.quiet else None)
+
+
+async def wait_ready(args: argparse.Namespace, server: subprocess.Popen) -> None:
+    deadline = time.perf_counter() + args.startup_timeout
+    while time.perf_counter() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        conn = HttpConnection(args.host, args.port)
+        try:
+            if await conn.get("/openapi.json") == 200:
+                return
+        except OSError:
+            pass
+        finally:
+            await conn.close()
+        await asyncio.sleep(0.5)
+    raise TimeoutError("Server did not become ready in time")
+
+
+def print_result(result: RunResult) -> None:
+    print(
+        f"workers={result.workers:<3} pool={result.pool_size:<3}+{result.max_overflow:<3} "
+        f"conc={result.concurrency:<4} rps={result.rps:>9.1f} "
+        f"p50={result.p50_ms:>8.2f}ms p95={result.p95_ms:>8.2f}ms p99={result.p99_ms:>8.2f}ms "
+        f"errors={result.error_rate:>6.2%} "
+        f"db_conn_peak={result.peak_connections}/{result.pool_capacity} "
+        f"(active {result.peak_active_connections}, saturation {result.pool_saturation:.0%}) "
+        f"pool_wait_max={result.app_pool_max_wait_ms:.2f}ms overflow_peak={result.app_pool_peak_overflow} "
+        f"pool_timeouts={result.app_pool_timeouts}"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    student_ids = await fetch_student_ids(args.students)
+    if not student_ids:
+        raise SystemExit("No students in the database, run benchmarks/seed_database.py first")
+    print(f"Loaded {len(student_ids)} student ids, zipf skew={args.zipf_skew}")
+
+    results: list[RunResult] = []
+    for workers in args.workers:
+        for pool_size in args.pool_sizes:
+            server = start_server(args, workers, pool_size)
+            try:
+                await wait_ready(args, server)
+                for concurrency in args.concurrency:
+                    sampler = KeySampler(student_ids, args.zipf_skew, args.seed)
+                    result = RunResult(workers, pool_size, args.max_overflow, concurrency)
+                    await run_load(args, sampler, result)
+                    print_result(result)
+                    results.append(result)
+            finally:
+                server.terminate()
+                server.wait()
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump([{k: v for k, v in asdict(r).items() if k != "latencies"} for r in results], f, indent=2)
+        print(f"Results written to {args.json_out}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1])
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[settings.DB_POOL_SIZE])
+    parser.add_argument("--max-overflow", type=int, default=settings.DB_MAX_OVERFLOW)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16, 64])
+    parser.add_argument("--duration", type=float, default=30.0, help="Длительность замера, секунды")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Прогрев без учета в статистике, секунды")
+    parser.add_argument("--zipf-skew", type=float, default=1.1)
+    parser.add_argument("--students", type=int, default=None, help="Ограничить число id студентов")
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--sample-interval", type=float, default=0.2)
+    parser.add_argument("--startup-timeout", type=float, default=180.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json-out", default=None)
+    parser.add_argument("--quiet", action="store_true", help="Скрыть stdout сервера")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,3 @@
+#!/bin/bash
+# Разрешает потоковую репликацию для реплики из benchmarks/docker-compose.yml
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -0,0 +1,138 @@
+"""Заполняет локальный Postgres синтетическими компаниями, проектами и студентами.
+
+Запуск (из корня репозитория):
+    python benchmarks/seed_database.py --students 5000 --projects 300 --reset
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+from config import settings  # noqa: E402
+from db.models import Base, Company, Project, Student  # noqa: E402
+from services.model_loader import current_version  # noqa: E402
+
+DIRECTIONS = ["web", "mobile", "data", "ml", "gamedev", "embedded", "devops"]
+GROUPS = [f"ИТ-{year}{n}" for year in range(21, 25) for n in range(1, 6)]
+WORDS = (
+    "платформа сервис система анализ данных пользователей интеграция мониторинг "
+    "автоматизация приложение бот панель управления отчетов поиск рекомендаций "
+    "учет обработка заявок визуализация модели прогнозирования"
+).split()
+
+
+def load_vocab(name: str) -> list[str]:
+    model_dir = SRC_DIR / settings.MODEL_DIR
+    version = current_version(model_dir)
+    with open((model_dir / version if version else model_dir) / name, "r") as f:
+        return list(json.load(f).keys())
+
+
+def skewed_sample(rng: random.Random, terms: list[str], weights: list[float], k: int) -> list[str]:
+    """Выбирает k различных терминов с учетом популярности (частые стеки встречаются чаще)"""
+    chosen: list[str] = []
+    while len(chosen) < k:
+        term = rng.choices(terms, weights=weights)[0]
+        if term not in chosen:
+            chosen.append(term)
+    return chosen
+
+
+def build_rows(args: argparse.Namespace) -> tuple[list[dict], list[dict], list[dict]]:
+    rng = random.Random(args.seed)
+    stack_terms = load_vocab("stack_vocab.json")
+    roles = load_vocab("roles_vocab.json")
+    stack_weights = [1.0 / (rank + 1) ** args.term_skew for rank in range(len(stack_terms))]
+    rng.shuffle(stack_terms)
+    role_weights = [1.0 / (rank + 1) ** args.term_skew for rank in range(len(roles))]
+    rng.shuffle(roles)
+    now = datetime.datetime.now()
+
+    companies = [
+        {
+            "id": company_id,
+            "contacts": f"+7900{company_id:07d}",
+            "created_at": now,
+            "email": f"company{company_id}@example.com",
+            "name": f"Company {company_id}",
+            "representative": f"Representative {company_id}",
+        }
+        for company_id in range(1, args.companies + 1)
+    ]
+
+    projects = []
+    for project_id in range(1, args.projects + 1):
+        projects.append({
+            "id": project_id,
+            "is_active": rng.random() < args.active_ratio,
+            "created_at": now,
+            "updated_at": now,
+            "description": " ".join(rng.choices(WORDS, k=rng.randint(12, 40))),
+            "name": f"Project {project_id}",
+            "stack": ", ".join(skewed_sample(rng, stack_terms, stack_weights, rng.randint(3, 8))),
+            "teams_amount": rng.randint(1, 4),
+            "company_id": rng.randint(1, args.companies),
+            "direction": rng.choice(DIRECTIONS),
+            "required_roles": ", ".join(skewed_sample(rng, roles, role_weights, rng.randint(1, 4))),
+        })
+
+    students = []
+    for student_id in range(1, args.students + 1):
+        students.append({
+            "id": student_id,
+            "username": f"student{student_id}",
+            "created_at": now,
+            "first_name": f"Имя{student_id}",
+            "last_name": f"Фамилия{student_id}",
+            "group_id": rng.choice(GROUPS),
+            "year": rng.randint(1, 4),
+            "stack": ", ".join(skewed_sample(rng, stack_terms, stack_weights, rng.randint(2, 6))),
+            "desired_role": rng.choices(roles, weights=role_weights)[0],
+        })
+
+    return companies, projects, students
+
+
+async def seed(args: argparse.Namespace) -> None:
+    database_url = f"postgresql+asyncpg://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}@{settings.DB_HOST}:{settings.POSTGRES_PORT}/{settings.POSTGRES_DB}"
+    engine = create_async_engine(database_url)
+    companies, projects, students = build_rows(args)
+
+    async with engine.begin() as conn:
+        if args.reset:
+            await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+        for model, rows in ((Company, companies), (Project, projects), (Student, students)):
+            for start in range(0, len(rows), args.batch_size):
+                await conn.execute(insert(model), rows[start:start + args.batch_size])
+            print(f"Inserted {len(rows)} rows into {model.__tablename__}")
+
+    await engine.dispose()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--projects", type=int, default=300)
+    parser.add_argument("--companies", type=int, default=40)
+    parser.add_argument("--active-ratio", type=float, default=0.9)
+    parser.add_argument("--term-skew", type=float, default=1.1,
+                        help="Показатель Ципфа для популярности стеков и ролей")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="Удалить и заново создать таблицы")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(seed(parse_args()))
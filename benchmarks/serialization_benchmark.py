@@ -0,0 +1,120 @@
+"""Латентность попадания в кэш /recommendations/student/{id}: pydantic response_model против готовых байтов JSON.
+
+Запросы идут напрямую в ASGI-приложение (без сети и базы данных), поэтому
+замеряется только стоимость маршрутизации, зависимостей и сериализации.
+
+Запуск (из корня репозитория):
+    python benchmarks/serialization_benchmark.py --requests 20000 --top-n 20
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from fastapi import FastAPI  # noqa: E402
+
+from api.endpoints import recommendations as endpoint  # noqa: E402
+from config import settings  # noqa: E402
+from db import get_repositories  # noqa: E402
+from services.recommendation_engine import RecommendationEngine  # noqa: E402
+
+
+async def no_repositories():
+    yield None
+
+
+def build_app(students: int, top_n: int) -> FastAPI:
+    app = FastAPI()
+    app.include_router(endpoint.recommendation_router)
+    app.dependency_overrides[get_repositories] = no_repositories
+    engine = RecommendationEngine(model_service=None)
+    app.state.recommendation_engine = engine
+
+    for student_id in range(students):
+        recommendations = [
+            {
+                "project_id": 1000 + rank,
+                "project_name": f"Проект {rank}",
+                "final_score": round(0.9 - rank * 0.01, 4),
+                "base_similarity": round(0.85 - rank * 0.01, 4),
+                "bonus_score": 0.05,
+                "required_stack": "python, fastapi, postgresql, docker",
+                "required_roles": "backend-разработчик, devops",
+            }
+            for rank in range(top_n)
+        ]
+        endpoint.recommendations_cache.set(
+            endpoint.recommendation_key(engine, student_id, top_n), endpoint.dump_recommendations(recommendations))
+    return app
+
+
+async def call(app: FastAPI, path: str, query: str) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+        "app": app,
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(app: FastAPI, args: argparse.Namespace, fast: bool) -> np.ndarray:
+    settings.FAST_RESPONSE_SERIALIZATION = fast
+    latencies = np.empty(args.requests)
+    query = f"top_n={args.top_n}"
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(args.warmup):
+            await call(app, f"/recommendations/student/{i % args.students}", query)
+        for i in range(args.requests):
+            started = time.perf_counter()
+            status = await call(app, f"/recommendations/student/{i % args.students}", query)
+            latencies[i] = time.perf_counter() - started
+            assert status == 200, status
+    return latencies * 1e6
+
+
+async def main(args: argparse.Namespace) -> None:
+    app = build_app(args.students, args.top_n)
+    async with app.router.lifespan_context(app):
+        results = {
+            "pydantic response_model": await measure(app, args, fast=False),
+            "pre-serialized bytes": await measure(app, args, fast=True),
+        }
+
+    serializer = "orjson" if endpoint.orjson is not None else "json"
+    print(f"{args.requests} cached hits, top_n={args.top_n}, serializer={serializer}")
+    for name, latencies in results.items():
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f"{name:<24} mean={latencies.mean():8.1f}us p50={p50:8.1f}us p95={p95:8.1f}us p99={p99:8.1f}us")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--warmup", type=int, default=1000)
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--top-n", type=int, default=20)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,97 @@
+"""Проверка полноты (recall@N) отбора кандидатов по SkillIndex относительно полного скоринга.
+
+Для выборки студентов считает top-N по всем активным проектам и top-N только по
+shortlist из инвертированного индекса, печатает средний recall и долю проектов,
+которые пришлось оценивать моделью, для каждого размера shortlist.
+
+Запуск (из корня репозитория):
+    python benchmarks/shortlist_recall.py --sizes 25 50 100 200 --top-n 5
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from sqlalchemy import select  # noqa: E402
+
+from config import settings  # noqa: E402
+from db import Repositories  # noqa: E402
+from db.database import db  # noqa: E402
+from db.models import Student  # noqa: E402
+from services.batch_scoring import build_term_index, multi_hot, normalize_rows, rank_students  # noqa: E402
+from services.recommendation_service import RecommendationService  # noqa: E402
+from services.skill_index import SkillIndex, shortlist_recall  # noqa: E402
+
+
+async def load_data(sample: int, seed: int):
+    await db.connect()
+    repos = Repositories(session_factory=db.async_session)
+    try:
+        result = await repos.session.execute(
+            select(Student).where(Student.stack.is_not(None), Student.desired_role.is_not(None)))
+        students = [s for s in result.scalars().all() if s.stack and s.desired_role]
+        projects = [p for p in await repos.project_repo.get_active_projects()
+                    if p.stack and p.required_roles and p.description]
+    finally:
+        await repos.close()
+        await db.disconnect()
+    rng = np.random.default_rng(seed)
+    if len(students) > sample:
+        students = [students[i] for i in rng.choice(len(students), sample, replace=False)]
+    return students, projects
+
+
+def main(args: argparse.Namespace) -> None:
+    students, projects = asyncio.run(load_data(args.sample, args.seed))
+    print(f"{len(students)} students, {len(projects)} active projects, top_n={args.top_n}")
+
+    model_service = RecommendationService(model_dir=str(SRC_DIR / settings.MODEL_DIR))
+    project_embeddings = normalize_rows(model_service.embed_projects(projects).cpu().numpy())
+    student_embeddings = normalize_rows(model_service.embed_students(students).cpu().numpy())
+    term_index = build_term_index(p.stack for p in projects)
+    project_terms = multi_hot([p.stack for p in projects], term_index)
+    student_terms = multi_hot([s.stack for s in students], term_index)
+    project_ids = np.array([p.id for p in projects])
+    position = {project_id: i for i, project_id in enumerate(project_ids)}
+
+    full = rank_students(student_embeddings, project_embeddings, student_terms, project_terms, args.top_n)
+    full_ranking = [list(project_ids[row]) for row in full.project_idx]
+
+    skill_index = SkillIndex(model_service.stack_vocab, model_service.roles_vocab)
+    skill_index.sync(projects)
+
+    for size in args.sizes:
+        shortlist_ranking = []
+        scored = 0
+        started = time.perf_counter()
+        for i, student in enumerate(students):
+            shortlisted = skill_index.shortlist(student.stack, student.desired_role, size) or list(project_ids)
+            idx = np.array([position[project_id] for project_id in shortlisted])
+            scored += len(idx)
+            ranked = rank_students(
+                student_embeddings[i:i + 1], project_embeddings[idx],
+                student_terms[i:i + 1], project_terms[idx], args.top_n)
+            shortlist_ranking.append(list(project_ids[idx[ranked.project_idx[0]]]))
+        elapsed = time.perf_counter() - started
+        print(f"shortlist={size:<5} recall@{args.top_n}={shortlist_recall(full_ranking, shortlist_ranking):.3f} "
+              f"scored={scored / len(students) / len(projects):.1%} of projects "
+              f"({elapsed / len(students) * 1000:.3f} ms/student)")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[25, 50, 100, 200])
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--sample", type=int, default=1000, help="Число студентов в выборке")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -1,7 +1,22 @@
 from services.recommendation_engine import RecommendationEngine
+from services.distribution import DistributionService
+from services.model_manager import ModelManager
+from services.cache_warmer import CacheWarmer
+from typing import Optional
 from fastapi import Request
 
 def get_recommendation_engine(request: Request) -> RecommendationEngine:
     """Обёртка для получения RecommendationEngine из FastAPI"""
     return request.app.state.recommendation_engine
 
+def get_distribution_service(request: Request) -> DistributionService:
+    """Обёртка для получения DistributionService из FastAPI"""
+    return request.app.state.distribution_service
+
+def get_model_manager(request: Request) -> ModelManager:
+    """Обёртка для получения ModelManager из FastAPI"""
+    return request.app.state.model_manager
+
+def get_cache_warmer(request: Request) -> Optional[CacheWarmer]:
+    """CacheWarmer воркера или None, если прогрев выключен"""
+    return getattr(request.app.state, "cache_warmer", None)
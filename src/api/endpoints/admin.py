@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, Dict, Optional
+from services.model_loader import check_version
+from services.model_manager import ModelManager
+from api.dependencies import get_model_manager
+
+admin_router = APIRouter(prefix="/admin", tags=["admin"])
+
+@admin_router.get("/model")
+async def get_model_status(manager: ModelManager = Depends(get_model_manager)) -> Dict[str, Any]:
+    """Текущая версия модели воркера, версия в CURRENT и состояние перезагрузки"""
+    return manager.stats()
+
+@admin_router.post("/model/reload", status_code=202)
+async def reload_model(
+    version: Optional[str] = None,
+    manager: ModelManager = Depends(get_model_manager)
+) -> Dict[str, Any]:
+    """Фоновая загрузка версии модели и атомарная замена движка.
+
+    С version после успешной загрузки переключает CURRENT, и остальные воркеры
+    подхватывают версию при следующей проверке; если версия не загрузилась,
+    CURRENT не меняется. Без version перечитывает версию из CURRENT.
+    """
+    if manager.reloading:
+        raise HTTPException(status_code=409, detail="Model reload is already in progress.")
+    if version is not None:
+        try:
+            check_version(manager.model_dir, version)
+        except (FileNotFoundError, ValueError) as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    manager.start_reload(version, activate=version is not None)
+    return manager.stats()
@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+from config import settings
+from services.distribution import DistributionService
+from db import get_repositories, Repositories
+from api.dependencies import get_distribution_service
+
+distribution_router = APIRouter(prefix="/distribution", tags=["distribution"])
+
+class WhatIfRequest(BaseModel):
+    capacities: Dict[int, int] = {}
+    removed_teams: List[int] = []
+
+@distribution_router.post("/solve")
+async def solve_distribution(
+    repos: Repositories = Depends(get_repositories),
+    service: DistributionService = Depends(get_distribution_service)
+) -> Dict[str, Any]:
+    """Полное решение распределения команд по проектам"""
+    try:
+        return await service.solve(repos.team_repo, repos.project_repo)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@distribution_router.get("")
+async def get_distribution(service: DistributionService = Depends(get_distribution_service)) -> Dict[int, Optional[int]]:
+    try:
+        return service.assignment()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@distribution_router.post("/teams/{team_id}/refresh")
+async def refresh_team(
+    team_id: int,
+    repos: Repositories = Depends(get_repositories),
+    service: DistributionService = Depends(get_distribution_service)
+) -> Dict[str, Any]:
+    """Инкрементальный пересчет после изменения команды или приоритетов ее участников"""
+    try:
+        return await service.refresh_team(team_id, repos.team_repo)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@distribution_router.post("/projects/{project_id}/refresh")
+async def refresh_project(
+    project_id: int,
+    repos: Repositories = Depends(get_repositories),
+    service: DistributionService = Depends(get_distribution_service)
+) -> Dict[str, Any]:
+    """Инкрементальный пересчет после изменения проекта (teams_amount, активность, профиль)"""
+    try:
+        return await service.refresh_project(project_id, repos.project_repo, repos.team_repo)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@distribution_router.post("/what-if")
+async def simulate_distribution(
+    request: WhatIfRequest,
+    service: DistributionService = Depends(get_distribution_service)
+) -> Dict[str, Any]:
+    """Сценарий «что если» на копии состояния решателя, текущее распределение не меняется"""
+    try:
+        return await service.what_if(capacities=request.capacities, removed_teams=request.removed_teams)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@distribution_router.post("/form-teams")
+async def form_teams(
+    team_size: int = Query(settings.TEAM_FORMATION_SIZE, ge=1),
+    time_limit: float = Query(settings.TEAM_FORMATION_TIME_LIMIT, gt=0),
+    repos: Repositories = Depends(get_repositories),
+    service: DistributionService = Depends(get_distribution_service)
+) -> Dict[str, Any]:
+    """Предлагает команды из студентов без команды: покрытие ролей и стека целевых проектов и оценки участников"""
+    try:
+        return await service.form_teams(repos.student_repo, repos.project_repo, team_size, time_limit)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
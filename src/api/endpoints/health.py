@@ -0,0 +1,54 @@
+from typing import Any, Dict, List
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from db.database import db
+from api.endpoints.recommendations import recommendations_cache
+
+health_router = APIRouter(prefix="/health", tags=["health"])
+
+@health_router.get("/pool")
+async def get_pool_status() -> Dict[str, Any]:
+    """Состояние пула соединений воркера: выданные соединения, overflow, время ожидания"""
+    return db.pool_status()
+
+@health_router.get("/replicas")
+async def get_replicas_status() -> List[Dict[str, Any]]:
+    """Доступность и отставание реплик для чтения"""
+    return db.replicas_status()
+
+@health_router.get("/inference")
+async def get_inference_status(request: Request) -> Dict[str, Any]:
+    """Доступность модели, очередь инференса и число ответов в деградированном режиме"""
+    engine = request.app.state.recommendation_engine
+    return {
+        "model_loaded": engine.model_service is not None,
+        "model_failures": engine.model_failures,
+        "deadline_misses": engine.deadline_misses,
+        "limiter": engine.inference_limiter.stats() if engine.inference_limiter else None,
+    }
+
+@health_router.get("/cache")
+async def get_cache_status() -> Dict[str, Any]:
+    """Попадания, промахи и ожидания чужого вычисления в кэше рекомендаций воркера"""
+    return {"backend": type(recommendations_cache.backend).__name__, **recommendations_cache.stats()}
+
+@health_router.get("/listener")
+async def get_listener_status(request: Request) -> Dict[str, Any]:
+    """Подключение слушателя LISTEN/NOTIFY, число уведомлений и время применения последней пачки"""
+    listener = getattr(request.app.state, "change_listener", None)
+    if listener is None:
+        return {"enabled": False}
+    return {"enabled": True, **listener.stats()}
+
+@health_router.get("/ready")
+async def get_readiness(request: Request):
+    """Готовность воркера принимать трафик (503, пока не прогреты индекс и доля WARMUP_READY_FRACTION кэша) и прогресс прогрева"""
+    engine = getattr(request.app.state, "recommendation_engine", None)
+    warmer = getattr(request.app.state, "cache_warmer", None)
+    ready = engine is not None and (warmer is None or warmer.ready())
+    content = {
+        "ready": ready,
+        "model_version": engine.model_version if engine is not None else None,
+        "warmup": warmer.stats() if warmer is not None else None,
+    }
+    return JSONResponse(content=content, status_code=200 if ready else 503)
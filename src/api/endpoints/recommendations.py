@@ -1,9 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List, Dict, Any
+import asyncio
+import json
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from pydantic import BaseModel
 from services.recommendation_engine import RecommendationEngine
+from services.result_cache import ResultCache, create_backend
+from services.cache_warmer import CacheWarmer
+from services.cohort_stream import CohortScorer
 from db import get_repositories, Repositories
-from api.dependencies import get_recommendation_engine
+from db.database import db
+from api.dependencies import get_cache_warmer, get_recommendation_engine
+from config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 recommendation_router = APIRouter(prefix="/recommendations", tags=["recommendations"])
 
@@ -15,50 +29,300 @@ class RecommendationResponse(BaseModel):
     bonus_score: float
     required_stack: str
     required_roles: str
+    collaborative_score: float = 0.0
+    degraded: bool = False
+    complete: bool = True
+
+class TeamRecommendationResponse(RecommendationResponse):
+    role_coverage: float
+
+class StudentCandidateResponse(BaseModel):
+    student_id: int
+    username: str
+    final_score: float
+    base_similarity: float
+    bonus_score: float
+    stack: str
+    desired_role: str
+    year: Optional[int] = None
+    group_id: Optional[str] = None
+    team_id: Optional[int] = None
+
+recommendations_cache = ResultCache(
+    create_backend(settings.RESULT_CACHE_BACKEND, settings.RESULT_CACHE_PATH, settings.RESULT_CACHE_PURGE_EVERY),
+    ttl=settings.RESULT_CACHE_TTL,
+    lock_timeout=settings.RESULT_CACHE_LOCK_TIMEOUT
+)
+
+RESPONSE_FIELDS = {name: field.default for name, field in RecommendationResponse.model_fields.items()}
 
-recommendations_cache: Dict[tuple, List[Dict[str, Any]]] = {}
+def dump_json(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def dump_recommendations(recommendations: List[Dict[str, Any]]) -> bytes:
+    """Сериализует рекомендации в JSON той же формы, что и response_model, минуя pydantic"""
+    return dump_json([
+        {name: rec.get(name, default) for name, default in RESPONSE_FIELDS.items()}
+        for rec in recommendations
+    ])
+
+async def compute_recommendations(
+    student_id: int,
+    top_n: int,
+    repos: Repositories,
+    engine: RecommendationEngine,
+    diversity: float = 0.0,
+    deadline: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    try:
+        recommendations = None
+        if settings.SERVE_PRECOMPUTED_RECOMMENDATIONS and diversity == 0:
+            recommendations = await engine.get_precomputed_recommendations(
+                student_id=student_id,
+                recommendation_repo=repos.recommendation_repo,
+                top_n=top_n
+            )
+
+        if recommendations is None:
+            recommendations = await engine.get_recommendations(
+                student_id=student_id,
+                student_repo=repos.student_repo,
+                project_repo=repos.project_repo,
+                top_n=top_n,
+                diversity=diversity,
+                deadline=deadline
+            )
+        return recommendations
+
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def recommendation_key(engine: RecommendationEngine, student_id: int, top_n: int, diversity: float = 0.0) -> str:
+    """Ключ кэша включает версию модели: после горячей замены ответы старой версии не отдаются"""
+    key = f"student:{engine.model_version}:{student_id}:{top_n}"
+    return f"{key}:mmr{diversity:g}" if diversity > 0 else key
+
+def request_deadline(deadline_ms: Optional[float]) -> Optional[float]:
+    """Момент time.monotonic(), к которому нужно ответить; None — без ограничения (0 в параметре или настройке)"""
+    budget = settings.RECOMMENDATION_DEADLINE_MS if deadline_ms is None else deadline_ms
+    return time.monotonic() + budget / 1000 if budget > 0 else None
+
+def load_recommendations(content: bytes) -> List[Dict[str, Any]]:
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+async def cached_recommendations(
+    student_id: int,
+    top_n: int,
+    repos: Repositories,
+    engine: RecommendationEngine,
+    diversity: float = 0.0,
+    deadline: Optional[float] = None,
+    lookup: bool = True
+) -> Tuple[bytes, Dict[str, str]]:
+    """Байты JSON рекомендаций из общего кэша (или посчитанные) и заголовки деградированного или неполного ответа;
+    lookup=False пропускает повторное чтение ключа, уже не найденного в multi-get"""
+    headers: Dict[str, str] = {}
+
+    async def compute() -> Tuple[bytes, bool]:
+        print(f"Cache miss for student_id={student_id}, top_n={top_n}. Fetching from engine...")
+        recommendations = await compute_recommendations(student_id, top_n, repos, engine, diversity, deadline)
+        if any(rec.get("degraded") for rec in recommendations):
+            headers["X-Recommendations-Degraded"] = "true"
+        if any(rec.get("complete") is False for rec in recommendations):
+            headers["X-Recommendations-Complete"] = "false"
+        # Деградированный и оборванный по дедлайну ответы не кэшируем, чтобы потом вернуться к полному ранжированию
+        return dump_recommendations(recommendations), not headers
+
+    content = await recommendations_cache.get_or_compute(
+        recommendation_key(engine, student_id, top_n, diversity), compute, lookup=lookup)
+    return content, headers
 
 @recommendation_router.get("/student/{student_id}", response_model=List[RecommendationResponse])
 async def get_student_recommendations(
     student_id: int,
+    response: Response,
     top_n: int = 5,
+    diversity: float = Query(0.0, ge=0.0, le=1.0),
+    deadline_ms: Optional[float] = Query(None, ge=0.0),
     repos: Repositories = Depends(get_repositories),
+    engine: RecommendationEngine = Depends(get_recommendation_engine),
+    warmer: Optional[CacheWarmer] = Depends(get_cache_warmer)
+):
+    """Рекомендации студенту; diversity > 0 включает MMR-переранжирование пула кандидатов,
+    deadline_ms ограничивает время оценки (по умолчанию RECOMMENDATION_DEADLINE_MS)"""
+    if warmer is not None:
+        warmer.record(student_id)
+    deadline = request_deadline(deadline_ms)
+    content, headers = await cached_recommendations(student_id, top_n, repos, engine, diversity, deadline)
+
+    if settings.FAST_RESPONSE_SERIALIZATION:
+        # Быстрый путь: в кэше лежат готовые байты JSON, которые отдаются без валидации и сериализации
+        return Response(content=content, media_type="application/json", headers=headers)
+
+    if headers:
+        response.headers.update(headers)
+    return [RecommendationResponse(**rec) for rec in load_recommendations(content)]
+
+@recommendation_router.get("/students", response_model=Dict[int, List[RecommendationResponse]])
+async def get_students_recommendations(
+    student_ids: List[int] = Query(...),
+    top_n: int = 5,
+    diversity: float = Query(0.0, ge=0.0, le=1.0),
+    deadline_ms: Optional[float] = Query(None, ge=0.0),
+    engine: RecommendationEngine = Depends(get_recommendation_engine),
+    warmer: Optional[CacheWarmer] = Depends(get_cache_warmer)
+):
+    """Рекомендации для нескольких студентов (deadline_ms — общий бюджет запроса): попадания берутся из кэша одним multi-get,
+    промахи считаются параллельно (не больше RESULT_CACHE_MISS_CONCURRENCY), студенты без профиля пропускаются"""
+    deadline = request_deadline(deadline_ms)
+    keys = {student_id: recommendation_key(engine, student_id, top_n, diversity) for student_id in student_ids}
+    found = await recommendations_cache.get_many(keys.values())
+    semaphore = asyncio.Semaphore(settings.RESULT_CACHE_MISS_CONCURRENCY)
+
+    async def compute_missing(student_id: int) -> Optional[bytes]:
+        async with semaphore:
+            # AsyncSession не допускает параллельных запросов, поэтому у каждого промаха свои репозитории
+            repos = Repositories(session_factory=db.async_session, read_session_factory=db.read_session)
+            try:
+                content, _ = await cached_recommendations(student_id, top_n, repos, engine, diversity, deadline, lookup=False)
+                return content
+            except HTTPException as e:
+                if e.status_code == 404:
+                    return None
+                raise
+            finally:
+                await repos.close()
+
+    missing = [student_id for student_id, key in keys.items() if key not in found]
+    computed = dict(zip(missing, await asyncio.gather(*(compute_missing(student_id) for student_id in missing))))
+
+    result = {}
+    for student_id, key in keys.items():
+        if warmer is not None:
+            warmer.record(student_id)
+        content = found[key] if key in found else computed[student_id]
+        if content is not None:
+            result[student_id] = load_recommendations(content)
+    return result
+
+
+@recommendation_router.get("/cohort/stream")
+async def stream_cohort_recommendations(
+    top_n: int = Query(5, ge=1),
+    year: Optional[int] = None,
+    group_id: Optional[str] = None,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|sse)$"),
     engine: RecommendationEngine = Depends(get_recommendation_engine)
 ):
-    cache_key = (student_id, top_n)
+    """Top-N для всех студентов с профилем (фильтры year, group_id) потоком NDJSON или SSE:
+    строка/событие на студента, как только посчитана его пачка. Если конвейер упал на середине,
+    поток заканчивается событием error (SSE) или строкой {"error": ...} (NDJSON)"""
+    if engine.model_service is None:
+        raise HTTPException(status_code=503, detail="Model not loaded.")
+    scorer = CohortScorer(engine, top_n=top_n, max_in_flight=settings.COHORT_STREAM_MAX_IN_FLIGHT)
+    repos = Repositories(session_factory=db.async_session, read_session_factory=db.read_session)
+    try:
+        await scorer.prepare(repos.project_repo)
+    finally:
+        await repos.close()
 
-    if cache_key in recommendations_cache:
-        print(f"Cache hit for student_id={student_id}, top_n={top_n}")
-        recommendations = recommendations_cache[cache_key]
-    else:
-        print(f"Cache miss for student_id={student_id}, top_n={top_n}. Fetching from engine...")
+    async def body() -> AsyncIterator[bytes]:
+        # Поток живет дольше обработчика, поэтому сессия для студентов открывается и закрывается внутри генератора
+        repos = Repositories(session_factory=db.async_session, read_session_factory=db.read_session)
+        started, count = time.perf_counter(), 0
         try:
-            student_repo = repos.student_repo
-            project_repo = repos.project_repo
+            batches = repos.student_repo.stream_students_with_profiles(
+                settings.COHORT_STREAM_BATCH_SIZE, year=year, group_id=group_id)
+            try:
+                async for result in scorer.stream(batches):
+                    count += 1
+                    if fmt == "sse":
+                        yield b"event: student\ndata: " + dump_json(result) + b"\n\n"
+                    else:
+                        yield dump_json(result) + b"\n"
+            except Exception as e:
+                # Статус 200 уже отправлен: клиент узнает об оборванной когорте только из самого потока
+                print(f"Cohort stream failed after {count} students: {e}")
+                error = {"error": str(e), "students": count}
+                if fmt == "sse":
+                    yield b"event: error\ndata: " + dump_json(error) + b"\n\n"
+                else:
+                    yield dump_json(error) + b"\n"
+                return
+            if fmt == "sse":
+                summary = {"students": count, "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)}
+                yield b"event: done\ndata: " + dump_json(summary) + b"\n\n"
+        finally:
+            await repos.close()
 
-            recommendations = await engine.get_recommendations(
-                student_id=student_id,
-                student_repo=student_repo,
-                project_repo=project_repo,
-                top_n=top_n
-            )
+    media_type = "text/event-stream" if fmt == "sse" else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type)
+
+@recommendation_router.get("/team/{team_id}", response_model=List[TeamRecommendationResponse])
+async def get_team_recommendations(
+    team_id: int,
+    top_n: int = 5,
+    coverage_weight: float = 0.1,
+    repos: Repositories = Depends(get_repositories),
+    engine: RecommendationEngine = Depends(get_recommendation_engine)
+):
+    try:
+        return await engine.get_team_recommendations(
+            team_id=team_id,
+            team_repo=repos.team_repo,
+            project_repo=repos.project_repo,
+            top_n=top_n,
+            coverage_weight=coverage_weight
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-            recommendations_cache[cache_key] = recommendations
-
-        except ValueError as e:
-            raise HTTPException(status_code=404, detail=str(e))
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
-
-    return [
-        RecommendationResponse(
-            project_id=rec["project_id"],
-            project_name=rec["project_name"],
-            final_score=rec["final_score"],
-            base_similarity=rec["base_similarity"],
-            bonus_score=rec["bonus_score"],
-            required_stack=rec["required_stack"],
-            required_roles=rec["required_roles"]
+@recommendation_router.get("/teams", response_model=Dict[int, List[TeamRecommendationResponse]])
+async def get_all_team_recommendations(
+    top_n: int = 5,
+    coverage_weight: float = 0.1,
+    repos: Repositories = Depends(get_repositories),
+    engine: RecommendationEngine = Depends(get_recommendation_engine)
+):
+    try:
+        return await engine.get_all_team_recommendations(
+            team_repo=repos.team_repo,
+            project_repo=repos.project_repo,
+            top_n=top_n,
+            coverage_weight=coverage_weight
         )
-        for rec in recommendations
-    ]
\ No newline at end of file
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@recommendation_router.get("/project/{project_id}/students", response_model=List[StudentCandidateResponse])
+async def get_project_student_candidates(
+    project_id: int,
+    top_n: int = 5,
+    year: Optional[int] = None,
+    group_id: Optional[str] = None,
+    unassigned_only: bool = False,
+    repos: Repositories = Depends(get_repositories),
+    engine: RecommendationEngine = Depends(get_recommendation_engine)
+):
+    try:
+        return await engine.get_students_for_project(
+            project_id=project_id,
+            project_repo=repos.project_repo,
+            student_repo=repos.student_repo,
+            top_n=top_n,
+            year=year,
+            group_id=group_id,
+            unassigned_only=unassigned_only
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
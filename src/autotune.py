@@ -0,0 +1,229 @@
+"""Подбор параметров CPU-инференса на текущем узле.
+
+Перебирает число потоков torch, interop-потоков, воркеров uvicorn (так, чтобы
+воркеры x потоки не превышали число ядер) и batch_size SentenceTransformer на
+реальной модели из MODEL_DIR и синтетических профилях. Нагрузка одного запроса
+— как в сервисе с прогретым кэшем эмбеддингов проектов: s_tower для студента и
+косинусы с --projects заранее посчитанными эмбеддингами p_tower. Печатает кривую
+пропускной способности (упавшие конфигурации — с ошибкой) и записывает лучшую
+конфигурацию в INFERENCE_TUNING_PATH; ModelLoader применяет ее при загрузке
+модели, а python src/main.py запускает указанное число воркеров.
+
+Запуск (база не нужна, узел не должен быть нагружен):
+    python src/autotune.py --duration 3 --projects 200
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+
+from config import settings
+from services.model_loader import ModelLoader, save_tuning
+
+TEXT_DIM = 384
+TEXT_BATCH_SIZES = (8, 16, 32, 64, 128)
+
+
+def synthetic_features(rng: np.random.Generator, n: int, stack_size: int, roles_size: int, text_dim: int) -> np.ndarray:
+    features = np.zeros((n, stack_size + roles_size + text_dim), dtype=np.float32)
+    rows = np.arange(n)
+    for _ in range(4):
+        features[rows, rng.integers(0, stack_size, n)] = 1.0
+    features[rows, stack_size + rng.integers(0, roles_size, n)] = 1.0
+    if text_dim:
+        text = rng.normal(size=(n, text_dim)).astype(np.float32)
+        features[:, stack_size + roles_size:] = text / np.linalg.norm(text, axis=1, keepdims=True)
+    return features
+
+
+def load_model(model_dir: str) -> Dict[str, Any]:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return ModelLoader(model_dir).load_model()
+
+
+def measure(model_dir: str, threads: int, interop: Optional[int], n_projects: int, duration: float,
+            seed: int, setup_timeout: float, barrier, results) -> None:
+    """Один воркер: крутит запросы duration секунд и кладет в results ("ok", их число) или ("error", текст)"""
+    try:
+        torch.set_num_threads(threads)
+        if interop:
+            torch.set_num_interop_threads(interop)
+        model_data = load_model(model_dir)
+        model = model_data["model"].cpu()
+        stack_size, roles_size = len(model_data["stack_vocab"]), len(model_data["roles_vocab"])
+        rng = np.random.default_rng(seed)
+        students = torch.from_numpy(synthetic_features(rng, 64, stack_size, roles_size, 0))
+        with torch.no_grad():
+            # В сервисе эмбеддинги проектов берутся из кэша, поэтому p_tower считается один раз
+            project_embeddings = model.p_tower(
+                torch.from_numpy(synthetic_features(rng, n_projects, stack_size, roles_size, TEXT_DIM)))
+
+        def request(i: int) -> None:
+            with torch.no_grad():
+                student = model.s_tower(students[i % len(students)].unsqueeze(0))
+                torch.nn.functional.cosine_similarity(student, project_embeddings).topk(min(5, n_projects))
+
+        for i in range(3):
+            request(i)
+    except Exception as e:
+        barrier.abort()
+        results.put(("error", f"{type(e).__name__}: {e}"))
+        return
+    try:
+        barrier.wait(timeout=setup_timeout)
+    except threading.BrokenBarrierError:
+        results.put(("error", "another worker failed during setup"))
+        return
+    count, deadline = 0, time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        request(count)
+        count += 1
+    results.put(("ok", count))
+
+
+def run_config(args: argparse.Namespace, workers: int, threads: int, interop: Optional[int] = None) -> Tuple[float, Optional[str]]:
+    """Суммарные запросы в секунду workers параллельных процессов по threads потоков и ошибка, если конфигурация упала.
+
+    Ни одно ожидание не бесконечно: воркер, умерший при загрузке модели или по
+    OOM, не подвешивает перебор, а помечает конфигурацию как неудачную.
+    """
+    ctx = mp.get_context("spawn")
+    barrier, results = ctx.Barrier(workers), ctx.Queue()
+    processes = [
+        ctx.Process(target=measure, args=(args.model_dir, threads, interop, args.projects, args.duration,
+                                          args.seed + i, args.setup_timeout, barrier, results))
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    total, error, pending = 0, None, workers
+    deadline = time.monotonic() + args.setup_timeout + args.duration * 2 + 10
+    while pending and error is None:
+        try:
+            status, value = results.get(timeout=1.0)
+        except queue.Empty:
+            died = [process.exitcode for process in processes if process.exitcode not in (None, 0)]
+            if died:
+                error = f"worker exited with code {died[0]}"
+            elif time.monotonic() > deadline:
+                error = "timed out waiting for workers"
+            continue
+        pending -= 1
+        if status == "error":
+            error = value
+        else:
+            total += value
+    if error is not None:
+        # Остальные воркеры не ждут у барьера до setup_timeout
+        barrier.abort()
+    for process in processes:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+    return (0.0, error) if error else (total / args.duration, None)
+
+
+def thread_counts(limit: int) -> List[int]:
+    counts = sorted({1, limit} | {2 ** p for p in range(1, limit.bit_length()) if 2 ** p <= limit})
+    return [c for c in counts if c <= limit]
+
+
+def sweep_text_batch_size(args: argparse.Namespace, threads: int) -> Optional[Dict[str, Any]]:
+    """Описаний в секунду у SentenceTransformer по batch_size; None, если модель недоступна"""
+    try:
+        from sentence_transformers import SentenceTransformer
+        text_model = SentenceTransformer('sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2', device="cpu")
+    except Exception as e:
+        print(f"SentenceTransformer is unavailable, keeping default text batch size: {e}")
+        return None
+    torch.set_num_threads(threads)
+    rng = np.random.default_rng(args.seed)
+    words = ["сервис", "данные", "модель", "интерфейс", "команда", "api", "python", "react", "анализ", "бот"]
+    texts = [" ".join(rng.choice(words, size=int(rng.integers(20, 80)))) for _ in range(args.texts)]
+    text_model.encode(texts[:8], batch_size=8)
+    curve = []
+    for batch_size in TEXT_BATCH_SIZES:
+        started = time.perf_counter()
+        text_model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+        rate = len(texts) / (time.perf_counter() - started)
+        curve.append({"text_batch_size": batch_size, "texts_per_s": round(rate, 1)})
+        print(f"text batch={batch_size:<4} {rate:8.1f} texts/s")
+    best = max(curve, key=lambda row: row["texts_per_s"])
+    return {"text_batch_size": best["text_batch_size"], "curve": curve}
+
+
+def main(args: argparse.Namespace) -> None:
+    cores = args.cores or os.cpu_count() or 1
+    model_data = load_model(args.model_dir)
+    print(f"model {model_data['version']}: {cores} cores, {args.projects} projects per request, {args.duration}s per run")
+
+    curve = []
+    for workers in range(1, min(cores, args.max_workers) + 1):
+        for threads in thread_counts(cores // workers):
+            rate, error = run_config(args, workers, threads)
+            curve.append({"uvicorn_workers": workers, "torch_num_threads": threads, "requests_per_s": round(rate, 1), "error": error})
+            print(f"workers={workers:<3} threads={threads:<3} " + (f"failed: {error}" if error else f"{rate:10.1f} req/s"))
+    measured = [row for row in curve if row["error"] is None]
+    if not measured:
+        raise SystemExit("Every configuration failed, tuning file is not written.")
+    best = max(measured, key=lambda row: row["requests_per_s"])
+
+    # interop-потоки фиксируются до первой параллельной операции, поэтому каждый вариант — в новом процессе
+    interop_curve = []
+    for interop in thread_counts(max(cores // best["uvicorn_workers"], 1)):
+        rate, error = run_config(args, best["uvicorn_workers"], best["torch_num_threads"], interop)
+        interop_curve.append({"torch_interop_threads": interop, "requests_per_s": round(rate, 1), "error": error})
+        print(f"interop={interop:<3} " + (f"failed: {error}" if error else f"{rate:10.1f} req/s"))
+    measured_interop = [row for row in interop_curve if row["error"] is None]
+    best_interop = max(measured_interop, key=lambda row: row["requests_per_s"]) if measured_interop else {
+        "torch_interop_threads": None, "requests_per_s": best["requests_per_s"]}
+
+    text = sweep_text_batch_size(args, best["torch_num_threads"])
+    tuning = {
+        "torch_num_threads": best["torch_num_threads"],
+        "torch_interop_threads": best_interop["torch_interop_threads"],
+        "text_batch_size": text["text_batch_size"] if text else 64,
+        "uvicorn_workers": best["uvicorn_workers"],
+        "cpu_count": cores,
+        "model_version": model_data["version"],
+        "measured_at": datetime.now(timezone.utc).isoformat(),
+        "curve": curve,
+        "interop_curve": interop_curve,
+        "text_curve": text["curve"] if text else [],
+    }
+    if args.dry_run:
+        print("Dry run, tuning file is not written.")
+    else:
+        save_tuning(args.output, tuning)
+        print(f"Wrote {args.output}")
+    print(f"Best: {tuning['uvicorn_workers']} workers x {tuning['torch_num_threads']} threads, "
+          f"interop={tuning['torch_interop_threads']}, text batch={tuning['text_batch_size']} "
+          f"({best_interop['requests_per_s']:.1f} req/s)")
+
+
+if __name__ == "__main__":
+    src_dir = Path(__file__).parent
+    parser = argparse.ArgumentParser(description="Sweep CPU inference settings and write the best configuration")
+    parser.add_argument("--model-dir", default=str(src_dir / settings.MODEL_DIR))
+    parser.add_argument("--output", default=str(src_dir / settings.INFERENCE_TUNING_PATH))
+    parser.add_argument("--cores", type=int, default=0, help="Cores to tune for (default: all)")
+    parser.add_argument("--max-workers", type=int, default=8)
+    parser.add_argument("--projects", type=int, default=200, help="Cached project embeddings scored per request")
+    parser.add_argument("--texts", type=int, default=256, help="Descriptions encoded per text batch size run")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per configuration")
+    parser.add_argument("--setup-timeout", type=float, default=120.0, help="Seconds a worker may spend loading the model")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dry-run", action="store_true")
+    main(parser.parse_args())
@@ -6,7 +6,54 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = "project-practice-api"
     DB_HOST: str = "localhost"
     MODEL_DIR: str = 'models'
+    MODEL_WATCH_INTERVAL: float = 10.0
+    INFERENCE_TUNING_PATH: str = "inference_tuning.json"
     POSTGRES_PORT: int = 5432
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = False
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_REPLICA_HOSTS: str = ""
+    DB_REPLICA_STRATEGY: str = "round_robin"
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    DB_REPLICA_CHECK_INTERVAL: float = 2.0
+    STUDENT_EMBEDDING_CACHE_SIZE: int = 10000
+    PROJECT_EMBEDDING_CACHE_SIZE: int = 10000
+    SERVE_PRECOMPUTED_RECOMMENDATIONS: bool = False
+    SHORTLIST_SIZE: int = 0
+    PROJECT_SNAPSHOT_MAX_AGE: float = 0.0
+    INFERENCE_MAX_CONCURRENCY: int = 4
+    INFERENCE_MAX_QUEUE: int = 32
+    FAST_RESPONSE_SERIALIZATION: bool = False
+    RESULT_CACHE_BACKEND: str = "memory"
+    RESULT_CACHE_PATH: str = "result_cache.sqlite3"
+    RESULT_CACHE_TTL: float = 0.0
+    RESULT_CACHE_LOCK_TIMEOUT: float = 5.0
+    RESULT_CACHE_PURGE_EVERY: int = 1000
+    RESULT_CACHE_MISS_CONCURRENCY: int = 4
+    COLLABORATIVE_WEIGHT: float = 0.0
+    COLLABORATIVE_REFRESH_INTERVAL: float = 60.0
+    COLLABORATIVE_CHUNK_SIZE: int = 100000
+    STUDENT_MATRIX_REFRESH_INTERVAL: float = 300.0
+    EMBEDDING_STORAGE_DTYPE: str = "float32"
+    CHANGE_LISTENER_ENABLED: bool = False
+    CHANGE_LISTENER_DEBOUNCE: float = 0.05
+    CHANGE_LISTENER_CHECK_INTERVAL: float = 5.0
+    WARMUP_ENABLED: bool = False
+    WARMUP_MAX_STUDENTS: int = 1000
+    WARMUP_TOP_N: int = 5
+    WARMUP_GROUP_IDS: str = ""
+    WARMUP_HITS_PATH: str = "warmup_hits.json"
+    WARMUP_HITS_HALF_LIFE: float = 86400.0
+    WARMUP_READY_FRACTION: float = 0.0
+    RECOMMENDATION_DEADLINE_MS: float = 0.0
+    ANYTIME_CHUNK_SIZE: int = 256
+    COHORT_STREAM_BATCH_SIZE: int = 256
+    COHORT_STREAM_MAX_IN_FLIGHT: int = 2
+    TEAM_FORMATION_SIZE: int = 4
+    TEAM_FORMATION_TIME_LIMIT: float = 5.0
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding='utf-8')
 
@@ -1,18 +1,106 @@
+from typing import AsyncIterator, Callable, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from .student_repository import StudentRepository
 from .project_repository import ProjectRepository
 from .company_repository import CompanyRepository
 from .team_repository import TeamRepository
-from .models import Student, Project, Company, Team
+from .recommendation_repository import RecommendationRepository
+from .favorite_repository import FavoriteRepository
+from .models import Student, Project, Company, Team, StudentRecommendation, FavoriteProject
 from .database import db
-from fastapi import Depends
 
 class Repositories:
-    def __init__(self, session: AsyncSession):
-        self.student_repo = StudentRepository(session, Student)
-        self.project_repo = ProjectRepository(session, Project)
-        self.company_repo = CompanyRepository(session, Company)
-        self.team_repo = TeamRepository(session, Team)
+    """Набор репозиториев с ленивой сессией.
+
+    Сессия создается при первом обращении к репозиторию, а соединение из пула
+    AsyncSession берет только при первом запросе, поэтому попадания в кэш
+    не трогают базу данных вовсе. Репозитории студентов, проектов, готовых
+    рекомендаций и избранного читают через read_session_factory (реплики), остальные
+    работают с primary. У репозитория проектов своя сессия, чтобы список проектов
+    читался параллельно с данными студента.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        read_session_factory: Optional[Callable[[], AsyncSession]] = None
+    ):
+        self._session_factory = session_factory
+        self._read_session_factory = read_session_factory or session_factory
+        self._session: Optional[AsyncSession] = None
+        self._read_session: Optional[AsyncSession] = None
+        self._project_session: Optional[AsyncSession] = None
+        self._student_repo: Optional[StudentRepository] = None
+        self._project_repo: Optional[ProjectRepository] = None
+        self._company_repo: Optional[CompanyRepository] = None
+        self._team_repo: Optional[TeamRepository] = None
+        self._recommendation_repo: Optional[RecommendationRepository] = None
+        self._favorite_repo: Optional[FavoriteRepository] = None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._session_factory()
+        return self._session
+
+    @property
+    def read_session(self) -> AsyncSession:
+        if self._read_session is None:
+            self._read_session = self._read_session_factory()
+        return self._read_session
+
+    @property
+    def project_session(self) -> AsyncSession:
+        if self._project_session is None:
+            self._project_session = self._read_session_factory()
+        return self._project_session
+
+    @property
+    def student_repo(self) -> StudentRepository:
+        if self._student_repo is None:
+            self._student_repo = StudentRepository(self.read_session, Student)
+        return self._student_repo
+
+    @property
+    def project_repo(self) -> ProjectRepository:
+        if self._project_repo is None:
+            self._project_repo = ProjectRepository(self.project_session, Project)
+        return self._project_repo
+
+    @property
+    def company_repo(self) -> CompanyRepository:
+        if self._company_repo is None:
+            self._company_repo = CompanyRepository(self.session, Company)
+        return self._company_repo
+
+    @property
+    def team_repo(self) -> TeamRepository:
+        if self._team_repo is None:
+            self._team_repo = TeamRepository(self.session, Team)
+        return self._team_repo
+
+    @property
+    def recommendation_repo(self) -> RecommendationRepository:
+        if self._recommendation_repo is None:
+            self._recommendation_repo = RecommendationRepository(self.read_session, StudentRecommendation)
+        return self._recommendation_repo
+
+    @property
+    def favorite_repo(self) -> FavoriteRepository:
+        if self._favorite_repo is None:
+            self._favorite_repo = FavoriteRepository(self.read_session, FavoriteProject)
+        return self._favorite_repo
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._read_session is not None:
+            await self._read_session.close()
+            self._read_session = None
+        if self._project_session is not None:
+            await self._project_session.close()
+            self._project_session = None
 
 async def get_session() -> AsyncSession:
     """Get database session"""
@@ -20,6 +108,10 @@ async def get_session() -> AsyncSession:
     async with db.async_session() as session:
         yield session
 
-async def get_repositories(session: AsyncSession = Depends(get_session)) -> Repositories:
-    """Dependency that provides repository instances."""
-    return Repositories(session=session)
\ No newline at end of file
+async def get_repositories() -> AsyncIterator[Repositories]:
+    """Dependency that provides repository instances with a lazily opened session."""
+    repos = Repositories(session_factory=db.async_session, read_session_factory=db.read_session)
+    try:
+        yield repos
+    finally:
+        await repos.close()
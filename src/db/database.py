@@ -1,41 +1,106 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+import asyncio
+from typing import Any, Dict, List, Optional
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 from config import settings
+from .pool_metrics import InstrumentedQueuePool, PoolMetrics
+from .replicas import Replica, ReplicaRouter
 
 class Database:
     def __init__(self):
         self.engine = None
-        self.async_session_maker = None
+        self.pool_metrics = PoolMetrics()
+        self.replica_router: Optional[ReplicaRouter] = None
+        self._replica_monitor: Optional[asyncio.Task] = None
 
-    async def connect(self):
-        """Создает движок и сессию для работы с базой данных"""
-        database_url = f"postgresql+asyncpg://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}@{settings.DB_HOST}:{settings.POSTGRES_PORT}/{settings.POSTGRES_DB}"
-        self.engine = create_async_engine(
+    @staticmethod
+    def dsn(host: str = settings.DB_HOST, port: int = settings.POSTGRES_PORT) -> str:
+        """DSN для прямого asyncpg-соединения (например, выделенного под LISTEN)"""
+        return f"postgresql://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}@{host}:{port}/{settings.POSTGRES_DB}"
+
+    def _create_engine(self, host: str, port: int, metrics: PoolMetrics) -> AsyncEngine:
+        database_url = self.dsn(host, port).replace("postgresql://", "postgresql+asyncpg://", 1)
+        engine = create_async_engine(
             database_url,
-            pool_size=10,
-            max_overflow=20,
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
             echo=False
         )
+        engine.pool.metrics = metrics
+        return engine
+
+    async def connect(self):
+        """Создает движок и сессию для работы с базой данных"""
+        self.engine = self._create_engine(settings.DB_HOST, settings.POSTGRES_PORT, self.pool_metrics)
         self.async_session = async_sessionmaker(
             self.engine,
             class_=AsyncSession,
             expire_on_commit=False
         )
+        await self._connect_replicas()
+
+    async def _connect_replicas(self):
+        """Создает движки реплик для чтения и запускает фоновую проверку их отставания"""
+        replicas: List[Replica] = []
+        for address in filter(None, (item.strip() for item in settings.DB_REPLICA_HOSTS.split(","))):
+            host, _, port = address.partition(":")
+            metrics = PoolMetrics()
+            engine = self._create_engine(host, int(port or settings.POSTGRES_PORT), metrics)
+            replicas.append(Replica(address, engine, metrics))
+        if not replicas:
+            return
+
+        self.replica_router = ReplicaRouter(
+            replicas,
+            strategy=settings.DB_REPLICA_STRATEGY,
+            max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS
+        )
+        await self.replica_router.check_all()
+        self._replica_monitor = asyncio.create_task(
+            self.replica_router.monitor(settings.DB_REPLICA_CHECK_INTERVAL))
 
     async def close(self):
         """Закрывает соединение с базой данных"""
-        if self.engine:
-            await self.engine.dispose()
+        await self.disconnect()
 
     async def get_session(self) -> AsyncSession:
         """Возвращает сессию для работы с базой данных"""
         if not self.async_session or self.async_session is None:
             await self.connect()
         return self.async_session()
-    
+
+    def read_session(self) -> AsyncSession:
+        """Возвращает сессию только для чтения: на пригодной реплике или, если таких нет, на primary"""
+        replica = self.replica_router.choose() if self.replica_router else None
+        if replica is None:
+            return self.async_session()
+        return replica.async_session()
+
+    def pool_status(self) -> Dict[str, Any]:
+        """Возвращает текущее состояние пула соединений и накопленные метрики"""
+        return self.pool_metrics.snapshot(self.engine.pool if self.engine else None)
+
+    def replicas_status(self) -> List[Dict[str, Any]]:
+        """Возвращает доступность, отставание и состояние пулов реплик"""
+        if not self.replica_router:
+            return []
+        return [replica.status() for replica in self.replica_router.replicas]
+
     async def disconnect(self):
         """Закрывает соединение с базой данных"""
+        if self._replica_monitor:
+            self._replica_monitor.cancel()
+            self._replica_monitor = None
+        if self.replica_router:
+            for replica in self.replica_router.replicas:
+                await replica.engine.dispose()
+            self.replica_router = None
         if self.engine:
             await self.engine.dispose()
 
 
-db = Database()
\ No newline at end of file
+db = Database()
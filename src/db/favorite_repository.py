@@ -0,0 +1,30 @@
+from typing import Iterable, List, Tuple
+from sqlalchemy import func, select
+from .models import FavoriteProject
+from .repository import BaseRepository
+
+class FavoriteRepository(BaseRepository[FavoriteProject]):
+    async def get_favorites_after(self, last_id: int, limit: int) -> List[Tuple[int, int, int]]:
+        """Чанк (id, student_id, project_id) с id > last_id; keyset-пагинация вместо OFFSET"""
+        result = await self.session.execute(
+            select(FavoriteProject.id, FavoriteProject.student_id, FavoriteProject.project_id)
+            .where(FavoriteProject.id > last_id)
+            .order_by(FavoriteProject.id)
+            .limit(limit))
+        return [tuple(row) for row in result.all()]
+
+    async def get_favorites_of_students(self, student_ids: Iterable[int]) -> List[Tuple[int, int]]:
+        """Все пары (student_id, project_id) избранного переданных студентов"""
+        result = await self.session.execute(
+            select(FavoriteProject.student_id, FavoriteProject.project_id)
+            .where(FavoriteProject.student_id.in_(list(student_ids))))
+        return [tuple(row) for row in result.all()]
+
+    async def get_recent_student_ids(self, limit: int) -> List[int]:
+        """Id студентов по убыванию последнего добавления в избранное"""
+        result = await self.session.execute(
+            select(FavoriteProject.student_id)
+            .group_by(FavoriteProject.student_id)
+            .order_by(func.max(FavoriteProject.id).desc())
+            .limit(limit))
+        return [row[0] for row in result.all()]
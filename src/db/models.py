@@ -1,6 +1,6 @@
 from typing import List, Optional
 
-from sqlalchemy import BigInteger, Boolean, Column, DateTime, ForeignKeyConstraint, Identity, Index, Integer, PrimaryKeyConstraint, String, Table, Text, UniqueConstraint, text
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Double, ForeignKeyConstraint, Identity, Index, Integer, PrimaryKeyConstraint, String, Table, Text, UniqueConstraint, text
 from sqlalchemy.dialects.postgresql import TIMESTAMP
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 import datetime
@@ -128,6 +128,23 @@ class Student(Base):
     team: Mapped[Optional['Team']] = relationship('Team', back_populates='student')
 
 
+class StudentRecommendation(Base):
+    __tablename__ = 'student_recommendation'
+    __table_args__ = (
+        PrimaryKeyConstraint('student_id', 'rank', name='student_recommendation_pkey'),
+    )
+
+    student_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    rank: Mapped[int] = mapped_column(Integer, primary_key=True)
+    project_id: Mapped[int] = mapped_column(BigInteger)
+    final_score: Mapped[float] = mapped_column(Double)
+    base_similarity: Mapped[float] = mapped_column(Double)
+    bonus_score: Mapped[float] = mapped_column(Double)
+    computed_at: Mapped[datetime.datetime] = mapped_column(TIMESTAMP(precision=6))
+    model_version: Mapped[Optional[str]] = mapped_column(String(255))
+    profile_key: Mapped[Optional[str]] = mapped_column(String(32))
+
+
 t_user_roles = Table(
     'user_roles', Base.metadata,
     Column('user_id', BigInteger, nullable=False),
@@ -0,0 +1,64 @@
+from typing import Any, List
+
+CHANNEL = "recsys_changes"
+TABLES = ("project", "student", "favorite_project")
+
+# Уведомление на каждую измененную строку: {"table": ..., "op": ..., "id": ..., "student_id": ...}.
+# Одинаковые payload внутри одной транзакции Postgres доставляет один раз.
+TRIGGER_FUNCTION_SQL = f"""
+CREATE OR REPLACE FUNCTION recsys_notify_change() RETURNS trigger AS $$
+DECLARE
+    row_data jsonb := to_jsonb(CASE WHEN TG_OP = 'DELETE' THEN OLD ELSE NEW END);
+BEGIN
+    PERFORM pg_notify('{CHANNEL}', json_build_object(
+        'table', TG_TABLE_NAME,
+        'op', TG_OP,
+        'id', (row_data ->> 'id')::bigint,
+        'student_id', (row_data ->> 'student_id')::bigint
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def trigger_statements(table: str) -> List[str]:
+    return [
+        f"DROP TRIGGER IF EXISTS recsys_notify_{table}_write ON {table}",
+        f"CREATE TRIGGER recsys_notify_{table}_write AFTER INSERT OR DELETE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION recsys_notify_change()",
+        f"DROP TRIGGER IF EXISTS recsys_notify_{table}_update ON {table}",
+        f"CREATE TRIGGER recsys_notify_{table}_update AFTER UPDATE ON {table} "
+        f"FOR EACH ROW WHEN (OLD IS DISTINCT FROM NEW) EXECUTE FUNCTION recsys_notify_change()",
+    ]
+
+
+def trigger_names() -> List[str]:
+    return [f"recsys_notify_{table}_{kind}" for table in TABLES for kind in ("write", "update")]
+
+
+async def missing_triggers(conn: Any) -> List[str]:
+    """Имена триггеров уведомлений, которых нет (или которые выключены) на видимых через search_path таблицах"""
+    rows = await conn.fetch(
+        "SELECT t.tgname FROM pg_trigger t JOIN pg_class c ON c.oid = t.tgrelid "
+        "WHERE t.tgname LIKE 'recsys\\_notify\\_%' AND NOT t.tgisinternal AND t.tgenabled <> 'D' "
+        "AND pg_catalog.pg_table_is_visible(c.oid)")
+    present = {row["tgname"] for row in rows}
+    return [name for name in trigger_names() if name not in present]
+
+
+async def install_triggers(conn: Any) -> None:
+    """Создает функцию и триггеры уведомлений на project, student и favorite_project (asyncpg-соединение)"""
+    async with conn.transaction():
+        await conn.execute(TRIGGER_FUNCTION_SQL)
+        for table in TABLES:
+            for statement in trigger_statements(table):
+                await conn.execute(statement)
+
+
+async def drop_triggers(conn: Any) -> None:
+    async with conn.transaction():
+        for table in TABLES:
+            await conn.execute(f"DROP TRIGGER IF EXISTS recsys_notify_{table}_write ON {table}")
+            await conn.execute(f"DROP TRIGGER IF EXISTS recsys_notify_{table}_update ON {table}")
+        await conn.execute("DROP FUNCTION IF EXISTS recsys_notify_change()")
@@ -0,0 +1,96 @@
+import time
+from typing import Any, Dict, Optional
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolMetrics:
+    """Счетчики использования пула соединений: выдачи, ожидание, открытие новых соединений, overflow, таймауты"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.connects = 0
+        self.total_connect = 0.0
+        self.max_connect = 0.0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+
+    def record_checkout(self, wait: float, checked_out: int, overflow: int):
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.peak_checked_out = max(self.peak_checked_out, checked_out)
+        self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def record_connect(self, elapsed: float):
+        self.connects += 1
+        self.total_connect += elapsed
+        self.max_connect = max(self.max_connect, elapsed)
+
+    def snapshot(self, pool: Optional[AsyncAdaptedQueuePool] = None) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+            "connects": self.connects,
+            "avg_connect_ms": round(self.total_connect / self.connects * 1000, 3) if self.connects else 0.0,
+            "max_connect_ms": round(self.max_connect * 1000, 3),
+            "peak_checked_out": self.peak_checked_out,
+            "peak_overflow": self.peak_overflow,
+        }
+        if pool is not None:
+            data.update({
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+            })
+        return data
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, который замеряет ожидание соединения в очереди пула.
+
+    Открытие нового соединения (TCP, аутентификация, в том числе для overflow)
+    в ожидание не входит и учитывается отдельно: по avg_wait_ms подбирается
+    размер пула, а медленное подключение к базе пулом не лечится.
+    """
+
+    metrics: Optional[PoolMetrics] = None
+
+    def _create_connection(self):
+        start = time.perf_counter()
+        record = super()._create_connection()
+        # Запись соединения — своя у каждой выдачи, поэтому время открытия не смешивается
+        # с параллельными выдачами, переключающимися в других гринлетах
+        record.connect_time = time.perf_counter() - start
+        return record
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.timeouts += 1
+            raise
+        connect_time = record.__dict__.pop("connect_time", 0.0)
+        if self.metrics is not None:
+            if connect_time:
+                self.metrics.record_connect(connect_time)
+            self.metrics.record_checkout(
+                time.perf_counter() - start - connect_time, self.checkedout(), max(self.overflow(), 0))
+        return record
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
@@ -1,4 +1,5 @@
-from typing import List, Optional
+import datetime
+from typing import Iterable, List, Optional
 from sqlalchemy import select, and_, or_
 from .models import Project, Company
 from .repository import BaseRepository
@@ -9,6 +10,23 @@ class ProjectRepository(BaseRepository[Project]):
             select(Project).where(Project.is_active == True))
         return list(result.scalars().all())
 
+    async def get_projects_by_ids(self, project_ids: Iterable[int]) -> List[Project]:
+        """Проекты по id, включая неактивные"""
+        result = await self.session.execute(
+            select(Project).where(Project.id.in_(list(project_ids))))
+        return list(result.scalars().all())
+
+    async def get_projects_updated_since(self, updated_at: datetime.datetime) -> List[Project]:
+        """Проекты (включая неактивные), измененные не раньше updated_at"""
+        result = await self.session.execute(
+            select(Project).where(Project.updated_at >= updated_at))
+        return list(result.scalars().all())
+
+    async def get_active_project_ids(self) -> List[int]:
+        result = await self.session.execute(
+            select(Project.id).where(Project.is_active == True))
+        return list(result.scalars().all())
+
     async def get_projects_by_company(self, company_id: int) -> List[Project]:
         result = await self.session.execute(
             select(Project).where(Project.company_id == company_id))
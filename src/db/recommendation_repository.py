@@ -0,0 +1,39 @@
+from typing import Iterable, List, Tuple
+from sqlalchemy import select, delete, text
+from .models import StudentRecommendation, Project, Student
+from .repository import BaseRepository
+
+RECOMMENDATION_COLUMNS = ["student_id", "rank", "project_id", "final_score", "base_similarity", "bonus_score", "computed_at",
+                          "model_version", "profile_key"]
+
+class RecommendationRepository(BaseRepository[StudentRecommendation]):
+    async def get_for_student(self, student_id: int, top_n: int) -> List[Tuple[StudentRecommendation, Project, Student]]:
+        """Готовые рекомендации по активным проектам вместе с текущим профилем студента для проверки свежести"""
+        result = await self.session.execute(
+            select(StudentRecommendation, Project, Student)
+            .join(Project, Project.id == StudentRecommendation.project_id)
+            .join(Student, Student.id == StudentRecommendation.student_id)
+            .where(StudentRecommendation.student_id == student_id, Project.is_active == True)
+            .order_by(StudentRecommendation.rank)
+            .limit(top_n))
+        return [tuple(row) for row in result.all()]
+
+    async def create_table(self) -> None:
+        conn = await self.session.connection()
+        await conn.run_sync(lambda sync_conn: StudentRecommendation.__table__.create(sync_conn, checkfirst=True))
+        # Таблицы, созданные до появления проверки свежести
+        await conn.execute(text(
+            "ALTER TABLE student_recommendation "
+            "ADD COLUMN IF NOT EXISTS model_version varchar(255), ADD COLUMN IF NOT EXISTS profile_key varchar(32)"))
+        await self.session.commit()
+
+    async def replace_all(self, records: Iterable[tuple]) -> None:
+        """Заменяет все рекомендации одной транзакцией (DELETE + COPY): читатели видят старые данные до коммита"""
+        conn = await self.session.connection()
+        await conn.execute(delete(StudentRecommendation))
+        raw_connection = await conn.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            StudentRecommendation.__tablename__,
+            records=records,
+            columns=RECOMMENDATION_COLUMNS)
+        await self.session.commit()
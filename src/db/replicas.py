@@ -0,0 +1,87 @@
+import asyncio
+import itertools
+import time
+from typing import Any, Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from .pool_metrics import PoolMetrics
+
+REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class Replica:
+    def __init__(self, name: str, engine: AsyncEngine, pool_metrics: PoolMetrics):
+        self.name = name
+        self.engine = engine
+        self.pool_metrics = pool_metrics
+        self.async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.last_checked: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def checked_out(self) -> int:
+        return self.engine.pool.checkedout()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "last_checked": self.last_checked,
+            "last_error": self.last_error,
+            "pool": self.pool_metrics.snapshot(self.engine.pool),
+        }
+
+
+class ReplicaRouter:
+    """Выбирает реплику для чтения (round robin или least connections) с защитой от отставания.
+
+    Реплика считается пригодной, пока фоновая проверка видит ее доступной и ее
+    отставание не превышает max_lag. Если пригодных реплик нет, choose()
+    возвращает None и чтение идет на primary.
+    """
+
+    STRATEGIES = ("round_robin", "least_connections")
+
+    def __init__(self, replicas: List[Replica], strategy: str = "round_robin", max_lag: float = 5.0):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown replica strategy: {strategy}")
+        self.replicas = replicas
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self._counter = itertools.count()
+
+    def choose(self) -> Optional[Replica]:
+        candidates = [replica for replica in self.replicas if replica.healthy]
+        if not candidates:
+            return None
+        if self.strategy == "least_connections":
+            return min(candidates, key=lambda replica: replica.checked_out())
+        return candidates[next(self._counter) % len(candidates)]
+
+    async def check(self, replica: Replica) -> None:
+        try:
+            async with replica.engine.connect() as conn:
+                lag = (await conn.execute(REPLICA_LAG_QUERY)).scalar()
+            replica.lag = float(lag or 0.0)
+            replica.healthy = replica.lag <= self.max_lag
+            replica.last_error = None if replica.healthy else f"lag {replica.lag:.1f}s exceeds {self.max_lag:.1f}s"
+        except Exception as e:
+            replica.healthy = False
+            replica.last_error = str(e)
+        replica.last_checked = time.time()
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+
+    async def monitor(self, interval: float) -> None:
+        """Периодически обновляет доступность и отставание реплик"""
+        while True:
+            await self.check_all()
+            await asyncio.sleep(interval)
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import AsyncIterator, Iterable, List, Optional
 from sqlalchemy import select, and_
 from .models import Student, t_student_roles
 from .repository import BaseRepository
@@ -26,7 +26,43 @@ class StudentRepository(BaseRepository[Student]):
             select(Student).where(Student.id == student_id))
         return result.scalars().first()
 
+    async def get_students_by_ids(self, student_ids: Iterable[int]) -> List[Student]:
+        result = await self.session.execute(
+            select(Student).where(Student.id.in_(list(student_ids))))
+        return list(result.scalars().all())
+
     async def get_students_by_team(self, team_id: int) -> List[Student]:
         result = await self.session.execute(
             select(Student).where(Student.team_id == team_id))
-        return list(result.scalars().all())
\ No newline at end of file
+        return list(result.scalars().all())
+
+    async def get_student_ids_by_groups(self, group_ids: Iterable[str]) -> List[int]:
+        result = await self.session.execute(
+            select(Student.id).where(Student.group_id.in_(list(group_ids))).order_by(Student.id))
+        return [row[0] for row in result.all()]
+
+    async def get_students_without_team(self) -> List[Student]:
+        result = await self.session.execute(
+            select(Student).where(Student.team_id.is_(None)))
+        return list(result.scalars().all())
+
+    async def get_students_with_profiles(self) -> List[Student]:
+        result = await self.session.execute(
+            select(Student).where(Student.stack.is_not(None), Student.desired_role.is_not(None)))
+        return list(result.scalars().all())
+
+    async def stream_students_with_profiles(
+        self,
+        batch_size: int,
+        year: Optional[int] = None,
+        group_id: Optional[str] = None
+    ) -> AsyncIterator[List[Student]]:
+        """Студенты с профилем пачками по batch_size через серверный курсор, без загрузки всей выборки"""
+        query = select(Student).where(Student.stack.is_not(None), Student.desired_role.is_not(None))
+        if year is not None:
+            query = query.where(Student.year == year)
+        if group_id is not None:
+            query = query.where(Student.group_id == group_id)
+        result = await self.session.stream_scalars(query.order_by(Student.id).execution_options(yield_per=batch_size))
+        async for partition in result.partitions(batch_size):
+            yield list(partition)
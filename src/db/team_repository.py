@@ -13,6 +13,12 @@ class TeamRepository(BaseRepository[Team]):
             .options(selectinload(Team.student)))
         return result.scalars().first()
 
+    async def get_teams_with_students(self) -> List[Team]:
+        result = await self.session.execute(
+            select(Team)
+            .options(selectinload(Team.student)))
+        return list(result.scalars().all())
+
     async def get_teams_without_projects(self) -> List[Team]:
         result = await self.session.execute(
             select(Team)
@@ -0,0 +1,39 @@
+"""Установка триггеров LISTEN/NOTIFY для CHANGE_LISTENER_ENABLED=true.
+
+Создает функцию recsys_notify_change() и триггеры на project, student и
+favorite_project, которые отправляют id измененных строк в канал
+recsys_changes. Схема принадлежит основному бэкенду, поэтому триггеры
+ставятся отдельной командой пользователем с правами на DDL.
+
+Запуск:
+    python src/install_notify_triggers.py
+    python src/install_notify_triggers.py --drop
+"""
+import argparse
+import asyncio
+import asyncpg
+from db.database import Database
+from db.notifications import drop_triggers, install_triggers
+
+
+async def main(args: argparse.Namespace) -> None:
+    conn = await asyncpg.connect(Database.dsn())
+    try:
+        if args.drop:
+            await drop_triggers(conn)
+            print("Notification triggers dropped.")
+        else:
+            await install_triggers(conn)
+            print("Notification triggers installed.")
+    finally:
+        await conn.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drop", action="store_true", help="Удалить триггеры и функцию")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -1,9 +1,20 @@
 from fastapi import FastAPI
-from api.endpoints.recommendations import recommendation_router
+from api.endpoints.recommendations import cached_recommendations, recommendation_router, recommendations_cache
+from api.endpoints.health import health_router
+from api.endpoints.distribution import distribution_router
+from api.endpoints.admin import admin_router
 from db.database import db
 from contextlib import asynccontextmanager
-from services.recommendation_service import RecommendationService
-from services.recommendation_engine import RecommendationEngine
+import asyncio
+import os
+import time
+from services.load_shedding import InferenceLimiter
+from services.collaborative import CoOccurrenceModel
+from services.model_manager import ModelManager
+from services.change_listener import ChangeListener
+from services.distribution import DistributionService
+from services.cache_warmer import CacheWarmer
+from db import Repositories
 from config import settings
 from pathlib import Path
 from fastapi.middleware.cors import CORSMiddleware
@@ -14,15 +25,88 @@ async def lifespan(app: FastAPI):
     await db.connect()
     print("Database connected.")
 
+    collaborative = None
+    refresh_task = None
+    if settings.COLLABORATIVE_WEIGHT > 0:
+        print("Building favorites co-occurrence matrix...")
+        collaborative = CoOccurrenceModel()
+        repos = Repositories(session_factory=db.async_session)
+        try:
+            await collaborative.load(repos.favorite_repo, settings.COLLABORATIVE_CHUNK_SIZE)
+            print(f"Co-occurrence matrix built from {len(collaborative)} favorites.")
+        finally:
+            await repos.close()
+        refresh_task = asyncio.create_task(collaborative.refresh_periodically(
+            db.async_session, settings.COLLABORATIVE_REFRESH_INTERVAL, settings.COLLABORATIVE_CHUNK_SIZE))
+
     print("Initializing recommendation model...")
-    model_dir_path = Path(__file__).parent / settings.MODEL_DIR
-    model_service = RecommendationService(model_dir=str(model_dir_path))
-    engine = RecommendationEngine(model_service=model_service)
-    app.state.recommendation_engine = engine
-    print("Recommendation model initialized.")
+    inference_limiter = InferenceLimiter(settings.INFERENCE_MAX_CONCURRENCY, settings.INFERENCE_MAX_QUEUE)
+    model_manager = ModelManager(
+        state=app.state,
+        model_dir=str(Path(__file__).parent / settings.MODEL_DIR),
+        session_factory=db.async_session,
+        inference_limiter=inference_limiter,
+        collaborative=collaborative,
+        result_cache=recommendations_cache,
+        tuning_path=str(Path(__file__).parent / settings.INFERENCE_TUNING_PATH)
+    )
+    app.state.cache_warmer = None
+    if settings.WARMUP_ENABLED:
+        async def prefetch(student_id: int) -> None:
+            repos = Repositories(session_factory=db.async_session)
+            try:
+                await cached_recommendations(student_id, settings.WARMUP_TOP_N, repos, model_manager.engine)
+            finally:
+                await repos.close()
+
+        app.state.cache_warmer = CacheWarmer(
+            prefetch=prefetch,
+            session_factory=db.async_session,
+            inference_limiter=inference_limiter,
+            hits_path=settings.WARMUP_HITS_PATH,
+            group_ids=[g.strip() for g in settings.WARMUP_GROUP_IDS.split(",")],
+            max_students=settings.WARMUP_MAX_STUDENTS,
+            ready_fraction=settings.WARMUP_READY_FRACTION,
+            hits_half_life=settings.WARMUP_HITS_HALF_LIFE
+        )
+
+    started = time.perf_counter()
+    await model_manager.start()
+    app.state.model_manager = model_manager
+    warmup_task = None
+    if app.state.cache_warmer is not None:
+        app.state.cache_warmer.index_ready(time.perf_counter() - started)
+        warmup_task = asyncio.create_task(app.state.cache_warmer.run())
+    app.state.distribution_service = DistributionService(
+        app.state.recommendation_engine.model_service, workers=int(os.environ.get("WEB_CONCURRENCY", "1")))
+    watch_task = None
+    if settings.MODEL_WATCH_INTERVAL > 0:
+        watch_task = asyncio.create_task(model_manager.watch(settings.MODEL_WATCH_INTERVAL))
+
+    app.state.change_listener = None
+    listener_task = None
+    if settings.CHANGE_LISTENER_ENABLED:
+        app.state.change_listener = ChangeListener(
+            dsn=db.dsn(),
+            model_manager=model_manager,
+            session_factory=db.async_session,
+            collaborative=collaborative,
+            result_cache=recommendations_cache,
+            debounce=settings.CHANGE_LISTENER_DEBOUNCE,
+            check_interval=settings.CHANGE_LISTENER_CHECK_INTERVAL
+        )
+        listener_task = asyncio.create_task(app.state.change_listener.run())
 
     yield
 
+    tasks = [task for task in (refresh_task, watch_task, listener_task, warmup_task) if task is not None]
+    for task in tasks:
+        task.cancel()
+    # finally-блоки задач (закрытие LISTEN-соединения, сессии) должны отработать до закрытия пула
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if app.state.cache_warmer is not None:
+        app.state.cache_warmer.save_hits()
+    model_manager.close()
     print("Disconnecting from the database...")
     await db.disconnect()
     print("Database disconnected.")
@@ -38,7 +122,17 @@ app.add_middleware(
 )
 
 app.include_router(recommendation_router)
+app.include_router(health_router)
+app.include_router(distribution_router)
+app.include_router(admin_router)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    from services.model_loader import load_tuning
+    # Число воркеров из autotune.py (WEB_CONCURRENCY его переопределяет): вместе с потоками torch на воркер
+    # оно не превышает число ядер
+    workers = int(os.environ.get("WEB_CONCURRENCY") or
+                  load_tuning(str(Path(__file__).parent / settings.INFERENCE_TUNING_PATH)).get("uvicorn_workers", 1))
+    # Воркеры наследуют окружение: так DistributionService знает, что состояние не общее
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    uvicorn.run("main:app" if workers > 1 else app, host="0.0.0.0", port=8000, workers=workers)
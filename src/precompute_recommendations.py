@@ -0,0 +1,97 @@
+"""Предрасчет рекомендаций для всех студентов в таблицу student_recommendation.
+
+Считает top-K одним батчевым проходом (матрица студентов x матрица проектов),
+распараллеливает ранжирование по чанкам студентов между процессами и пишет
+результат через COPY. API отдает готовые рекомендации при
+SERVE_PRECOMPUTED_RECOMMENDATIONS=true и считает вживую, если их нет.
+
+Запуск:
+    python src/precompute_recommendations.py --top-k 20 --workers 4
+"""
+import argparse
+import asyncio
+import datetime
+import time
+from pathlib import Path
+from sqlalchemy import select
+from config import settings
+from db import Repositories
+from db.database import db
+from db.models import Student, StudentRecommendation
+from db.recommendation_repository import RecommendationRepository
+from services.batch_scoring import build_term_index, multi_hot, normalize_rows, rank_students_parallel
+from services.recommendation_service import RecommendationService, student_profile_key
+
+
+async def precompute(args: argparse.Namespace) -> None:
+    started = time.perf_counter()
+    await db.connect()
+    repos = Repositories(session_factory=db.async_session)
+    try:
+        result = await repos.session.execute(
+            select(Student).where(Student.stack.is_not(None), Student.desired_role.is_not(None)))
+        students = [s for s in result.scalars().all() if s.stack and s.desired_role]
+        all_projects = await repos.project_repo.get_active_projects()
+        projects = [p for p in all_projects if p.stack and p.required_roles and p.description]
+        loaded = time.perf_counter()
+        print(f"Loaded {len(students)} students and {len(projects)} active projects "
+              f"({len(all_projects) - len(projects)} incomplete projects skipped) in {loaded - started:.2f}s")
+        if not students or not projects:
+            print("Nothing to compute.")
+            return
+
+        model_dir_path = Path(__file__).parent / settings.MODEL_DIR
+        model_service = RecommendationService(model_dir=str(model_dir_path))
+        model_ready = time.perf_counter()
+
+        project_embeddings = normalize_rows(model_service.embed_projects(projects).cpu().numpy())
+        student_embeddings = normalize_rows(model_service.embed_students(students).cpu().numpy())
+        term_index = build_term_index(p.stack for p in projects)
+        project_terms = multi_hot([p.stack for p in projects], term_index)
+        student_terms = multi_hot([s.stack for s in students], term_index)
+        embedded = time.perf_counter()
+        print(f"Embedded students and projects in {embedded - model_ready:.2f}s "
+              f"({len(model_service.student_embeddings)} unique student profiles)")
+
+        ranked = rank_students_parallel(
+            student_embeddings, project_embeddings, student_terms, project_terms,
+            top_k=args.top_k, bonus_per_match=args.bonus_per_match,
+            workers=args.workers, chunk_size=args.chunk_size)
+        scored = time.perf_counter()
+        print(f"Ranked {len(students)} students in {scored - embedded:.2f}s "
+              f"({len(students) / max(scored - embedded, 1e-9):.0f} students/s, {args.workers} workers)")
+
+        computed_at = datetime.datetime.now()
+        project_ids = [p.id for p in projects]
+        # Версия модели и хэш профиля: API не отдает строки другой версии или посчитанные до правки профиля
+        records = [
+            (student.id, rank, project_ids[idx], float(final), float(base), float(bonus), computed_at,
+             model_service.version, student_profile_key(student.stack, student.desired_role))
+            for student, row_idx, row_final, row_base, row_bonus in zip(students, *ranked)
+            for rank, (idx, final, base, bonus) in enumerate(zip(row_idx, row_final, row_base, row_bonus))
+        ]
+
+        recommendation_repo = RecommendationRepository(repos.session, StudentRecommendation)
+        await recommendation_repo.create_table()
+        await recommendation_repo.replace_all(records)
+        written = time.perf_counter()
+        print(f"Wrote {len(records)} rows with COPY in {written - scored:.2f}s")
+
+        total = written - started
+        print(f"Total wall time {total:.2f}s, end-to-end throughput {len(students) / total:.0f} students/s")
+    finally:
+        await repos.close()
+        await db.disconnect()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--bonus-per-match", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=1, help="Число процессов для ранжирования")
+    parser.add_argument("--chunk-size", type=int, default=1024, help="Студентов в одном чанке")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(precompute(parse_args()))
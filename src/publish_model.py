@@ -0,0 +1,54 @@
+"""Публикация новой версии модели в MODEL_DIR/<версия>/ с manifest.json.
+
+Копирует recsys_model.pth, stack_vocab.json и roles_vocab.json из каталога
+обучения, записывает контрольные суммы и, с --activate, переключает
+MODEL_DIR/CURRENT. Работающие воркеры подхватывают новую версию без
+перезапуска (см. MODEL_WATCH_INTERVAL и POST /admin/model/reload).
+
+Запуск:
+    python src/publish_model.py path/to/training/output v3 --activate
+"""
+import argparse
+import shutil
+from pathlib import Path
+from config import settings
+from services.model_loader import MODEL_FILES, ModelLoader, set_current_version, write_manifest
+
+
+def publish(args: argparse.Namespace) -> None:
+    model_dir = Path(__file__).parent / settings.MODEL_DIR
+    source = Path(args.source)
+    version_dir = model_dir / args.version
+    if version_dir.exists():
+        raise SystemExit(f"Model version {args.version} already exists in {model_dir}")
+
+    missing = [name for name in MODEL_FILES if not (source / name).exists()]
+    if missing:
+        raise SystemExit(f"Missing model files in {source}: {', '.join(missing)}")
+
+    # Каталог версии собирается рядом и переименовывается целиком: воркеры не увидят его наполовину скопированным
+    tmp_dir = model_dir / f".{args.version}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    for name in MODEL_FILES:
+        shutil.copy2(source / name, tmp_dir / name)
+    manifest = write_manifest(tmp_dir, args.version)
+    tmp_dir.rename(version_dir)
+
+    ModelLoader(str(model_dir), args.version).load_model()
+    print(f"Published model {args.version}: student_dim={manifest['student_dim']}, project_dim={manifest['project_dim']}")
+    if args.activate:
+        set_current_version(model_dir, args.version)
+        print(f"CURRENT -> {args.version}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="Каталог с recsys_model.pth, stack_vocab.json и roles_vocab.json")
+    parser.add_argument("version", help="Имя версии, например v3")
+    parser.add_argument("--activate", action="store_true", help="Сразу переключить CURRENT на эту версию")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    publish(parse_args())
@@ -0,0 +1,273 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+
+class IncrementalAssignment:
+    """Квадратная задача о назначениях минимальной стоимости с сохраненным состоянием решателя.
+
+    Хранит назначение и двойственные переменные (u, v). После изменения строки или
+    столбца матрицы стоимостей оптимум восстанавливается одним кратчайшим
+    увеличивающим путем (динамический венгерский алгоритм) за O(n^2) вместо
+    полного решения за O(n^3).
+    """
+
+    def __init__(self, cost: np.ndarray):
+        self.cost = np.array(cost, dtype=np.float64)
+        _, self.col4row = linear_sum_assignment(self.cost)
+        self.row4col = np.empty_like(self.col4row)
+        self.row4col[self.col4row] = np.arange(len(self.col4row))
+        self.v = self._column_potentials()
+        self.u = self.cost[np.arange(len(self)), self.col4row] - self.v[self.col4row]
+
+    def __len__(self) -> int:
+        return self.cost.shape[0]
+
+    def _column_potentials(self) -> np.ndarray:
+        """Двойственные переменные столбцов для готового оптимального назначения (Беллман-Форд по остаточному графу)"""
+        n = len(self)
+        cols = np.arange(n)
+        # Ребро j -> k: строка, занимающая j, могла бы перейти на k с изменением стоимости weights[j, k]
+        weights = self.cost[self.row4col] - self.cost[self.row4col, cols][:, None]
+        v = np.zeros(n)
+        for _ in range(n):
+            relaxed = np.minimum(v, (v[:, None] + weights).min(axis=0))
+            if np.all(v - relaxed <= 1e-12):
+                break
+            v = relaxed
+        return v
+
+    def copy(self) -> "IncrementalAssignment":
+        clone = IncrementalAssignment.__new__(IncrementalAssignment)
+        clone.cost = self.cost.copy()
+        clone.u, clone.v = self.u.copy(), self.v.copy()
+        clone.col4row, clone.row4col = self.col4row.copy(), self.row4col.copy()
+        return clone
+
+    def total_cost(self) -> float:
+        return float(self.cost[np.arange(len(self)), self.col4row].sum())
+
+    def _augment(self, start_row: int) -> None:
+        """Кратчайший увеличивающий путь из свободной строки до свободного столбца (как в LAPJV)"""
+        n = len(self)
+        shortest = np.full(n, np.inf)
+        path = np.full(n, -1)
+        scanned = np.zeros(n, dtype=bool)
+        scanned_rows = []
+        row, min_val, sink = start_row, 0.0, -1
+
+        while sink == -1:
+            reduced = min_val + self.cost[row] - self.u[row] - self.v
+            improved = ~scanned & (reduced < shortest)
+            path[improved] = row
+            shortest[improved] = reduced[improved]
+
+            candidates = np.where(scanned, np.inf, shortest)
+            col = int(np.argmin(candidates))
+            min_val = candidates[col]
+            free = np.flatnonzero((candidates == min_val) & (self.row4col < 0))
+            if len(free):
+                col = int(free[0])
+            scanned[col] = True
+            if self.row4col[col] < 0:
+                sink = col
+            else:
+                row = int(self.row4col[col])
+                scanned_rows.append(row)
+
+        self.u[start_row] += min_val
+        if scanned_rows:
+            scanned_rows = np.array(scanned_rows)
+            self.u[scanned_rows] += min_val - shortest[self.col4row[scanned_rows]]
+        self.v[scanned] -= min_val - shortest[scanned]
+
+        col = sink
+        while True:
+            row = path[col]
+            self.row4col[col] = row
+            self.col4row[row], col = col, self.col4row[row]
+            if row == start_row:
+                break
+
+    def update_row(self, row: int, costs: np.ndarray) -> None:
+        self.cost[row] = costs
+        self.row4col[self.col4row[row]] = -1
+        self.col4row[row] = -1
+        self._augment(row)
+
+    def update_column(self, col: int, costs: np.ndarray) -> None:
+        self.cost[:, col] = costs
+        row = self.row4col[col]
+        self.row4col[col] = -1
+        self.col4row[row] = -1
+        others = np.arange(len(self)) != row
+        self.v[col] = (self.cost[others, col] - self.u[others]).min() if others.any() else 0.0
+        self._augment(row)
+
+    def grow(self, row_costs: np.ndarray, column_costs: np.ndarray, corner: float) -> None:
+        """Добавляет строку и столбец: row_costs и column_costs без углового элемента"""
+        n = len(self)
+        cost = np.empty((n + 1, n + 1))
+        cost[:n, :n] = self.cost
+        cost[n, :n] = row_costs
+        cost[:n, n] = column_costs
+        cost[n, n] = corner
+        self.cost = cost
+        self.v = np.append(self.v, (column_costs - self.u).min() if n else 0.0)
+        self.u = np.append(self.u, 0.0)
+        self.col4row = np.append(self.col4row, -1)
+        self.row4col = np.append(self.row4col, -1)
+        self._augment(n)
+
+
+class Distribution:
+    """Распределение команд по проектам с вместимостью teams_amount поверх IncrementalAssignment.
+
+    Строки — команды и фиктивные строки «место осталось пустым», столбцы — места
+    проектов и столбцы «команда без проекта». Полезность utility[команда, проект]
+    максимизируется; изменения команд и проектов применяются инкрементально.
+    """
+
+    UNASSIGNED_COST = 100.0
+    FORBIDDEN_COST = 1e6
+
+    def __init__(self, team_ids: List[int], project_ids: List[int], capacities: List[int], utilities: np.ndarray):
+        self.team_index: Dict[int, int] = {team_id: i for i, team_id in enumerate(team_ids)}
+        self.project_index: Dict[int, int] = {project_id: i for i, project_id in enumerate(project_ids)}
+        self.team_ids = list(team_ids)
+        self.project_ids = list(project_ids)
+        self.utilities = np.array(utilities, dtype=np.float64).reshape(len(team_ids), len(project_ids))
+        self.capacities = np.array(capacities, dtype=np.int64)
+
+        slots = np.repeat(np.arange(len(project_ids)), self.capacities)
+        self.col_project = np.concatenate([slots, np.full(len(team_ids), -1)])
+        self.col_enabled = np.ones(len(self.col_project), dtype=bool)
+        self.row_team = np.concatenate([np.arange(len(team_ids)), np.full(len(slots), -1)])
+        self.solver = IncrementalAssignment(self._cost_matrix(self.row_team, self.col_project, self.col_enabled))
+
+    def _cost_matrix(self, row_team: np.ndarray, col_project: np.ndarray, col_enabled: np.ndarray) -> np.ndarray:
+        cost = np.zeros((len(row_team), len(col_project)))
+        agents = row_team >= 0
+        slot_cols = col_project >= 0
+        agent_rows = np.flatnonzero(agents)
+        cost[np.ix_(agent_rows, np.flatnonzero(slot_cols))] = -self.utilities[np.ix_(row_team[agents], col_project[slot_cols])]
+        cost[np.ix_(agent_rows, np.flatnonzero(slot_cols & ~col_enabled))] = self.FORBIDDEN_COST
+        cost[np.ix_(agent_rows, np.flatnonzero(~slot_cols))] = self.UNASSIGNED_COST
+        return cost
+
+    def _row_costs(self, row: int) -> np.ndarray:
+        return self._cost_matrix(self.row_team[row:row + 1], self.col_project, self.col_enabled)[0]
+
+    def _column_costs(self, col: int) -> np.ndarray:
+        return self._cost_matrix(self.row_team, self.col_project[col:col + 1], self.col_enabled[col:col + 1])[:, 0]
+
+    def _grow(self, team: int, project: int) -> None:
+        """Добавляет строку (команда или пустое место) и столбец (место проекта или «без проекта»)"""
+        self.row_team = np.append(self.row_team, team)
+        self.col_project = np.append(self.col_project, project)
+        self.col_enabled = np.append(self.col_enabled, True)
+        n = len(self.row_team) - 1
+        row_costs = self._row_costs(n)
+        column_costs = self._column_costs(n)
+        self.solver.grow(row_costs[:n], column_costs[:n], row_costs[n])
+
+    def assignment(self) -> Dict[int, Optional[int]]:
+        """id команды -> id проекта (None, если команде не хватило места)"""
+        agents = np.flatnonzero(self.row_team >= 0)
+        projects = self.col_project[self.solver.col4row[agents]]
+        return {
+            self.team_ids[team]: self.project_ids[project] if project >= 0 else None
+            for team, project in zip(self.row_team[agents].tolist(), projects.tolist())
+        }
+
+    def objective(self) -> float:
+        """Суммарная полезность назначенных команд"""
+        agents = np.flatnonzero(self.row_team >= 0)
+        projects = self.col_project[self.solver.col4row[agents]]
+        assigned = projects >= 0
+        return float(self.utilities[self.row_team[agents][assigned], projects[assigned]].sum())
+
+    def update_team(self, team_id: int, utilities: np.ndarray) -> None:
+        """Новая или изменившаяся команда: полезности по всем проектам в порядке project_ids"""
+        team = self.team_index.get(team_id)
+        if team is None:
+            team = self.team_index[team_id] = len(self.team_ids)
+            self.team_ids.append(team_id)
+            self.utilities = np.vstack([self.utilities, utilities])
+            self._grow(team, -1)
+            return
+
+        self.utilities[team] = utilities
+        rows = np.flatnonzero(self.row_team == team)
+        if len(rows):
+            self.solver.update_row(rows[0], self._row_costs(rows[0]))
+        else:
+            # Команда была удалена из распределения и вернулась
+            self._grow(team, -1)
+
+    def remove_team(self, team_id: int) -> None:
+        team = self.team_index.get(team_id)
+        rows = np.flatnonzero(self.row_team == team) if team is not None else []
+        if len(rows):
+            self.row_team[rows[0]] = -1
+            self.solver.update_row(rows[0], self._row_costs(rows[0]))
+
+    def update_project(self, project_id: int, capacity: int, utilities: Optional[np.ndarray] = None) -> None:
+        """Новая вместимость проекта и, при необходимости, новые полезности команд для него (в порядке team_ids)"""
+        project = self.project_index.get(project_id)
+        if project is None:
+            if utilities is None:
+                raise ValueError(f"Utilities are required for new project {project_id}")
+            project = self.project_index[project_id] = len(self.project_ids)
+            self.project_ids.append(project_id)
+            self.utilities = np.hstack([self.utilities, np.asarray(utilities, dtype=np.float64).reshape(-1, 1)])
+            self.capacities = np.append(self.capacities, 0)
+
+        changed = set()
+        if utilities is not None and project < self.utilities.shape[1]:
+            self.utilities[:, project] = utilities
+            changed.update(np.flatnonzero(self.col_project == project).tolist())
+
+        slots = np.flatnonzero(self.col_project == project)
+        for i, col in enumerate(slots):
+            enabled = i < capacity
+            if self.col_enabled[col] != enabled:
+                self.col_enabled[col] = enabled
+                changed.add(int(col))
+        for col in sorted(changed):
+            self.solver.update_column(col, self._column_costs(col))
+        for _ in range(capacity - len(slots)):
+            self._grow(-1, project)
+        self.capacities[project] = capacity
+
+    def copy(self) -> "Distribution":
+        clone = Distribution.__new__(Distribution)
+        clone.__dict__.update({
+            key: value.copy() if isinstance(value, (np.ndarray, dict, list)) else value
+            for key, value in self.__dict__.items() if key != "solver"
+        })
+        clone.solver = self.solver.copy()
+        return clone
+
+    def what_if(
+        self,
+        capacities: Optional[Dict[int, int]] = None,
+        removed_teams: Iterable[int] = (),
+        team_utilities: Optional[Dict[int, np.ndarray]] = None
+    ) -> Tuple["Distribution", Dict[int, Tuple[Optional[int], Optional[int]]]]:
+        """Применяет изменения к копии состояния; возвращает копию и изменившиеся назначения (было, стало)"""
+        scenario = self.copy()
+        for team_id in removed_teams:
+            scenario.remove_team(team_id)
+        for team_id, utilities in (team_utilities or {}).items():
+            scenario.update_team(team_id, utilities)
+        for project_id, capacity in (capacities or {}).items():
+            scenario.update_project(project_id, capacity)
+
+        before, after = self.assignment(), scenario.assignment()
+        changes = {
+            team_id: (before.get(team_id), after.get(team_id))
+            for team_id in before.keys() | after.keys()
+            if before.get(team_id) != after.get(team_id)
+        }
+        return scenario, changes
@@ -0,0 +1,220 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import numpy as np
+from scipy import sparse
+from .recommendation_service import parse_string
+
+
+class RankedBatch(NamedTuple):
+    """Top-K для группы студентов: индексы проектов и оценки, все массивы n x k"""
+    project_idx: np.ndarray
+    final_score: np.ndarray
+    base_similarity: np.ndarray
+    bonus_score: np.ndarray
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Нормирует строки, чтобы косинусное сходство считалось скалярным произведением"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-8)
+
+
+def build_term_index(stacks: Iterable[Optional[str]]) -> Dict[str, int]:
+    """Словарь всех терминов стека, встречающихся в проектах"""
+    index: Dict[str, int] = {}
+    for stack in stacks:
+        if not stack:
+            continue
+        for term in parse_string(stack):
+            index.setdefault(term, len(index))
+    return index
+
+
+def multi_hot(stacks: List[Optional[str]], term_index: Dict[str, int]) -> np.ndarray:
+    """Multi-hot матрица стеков (строка на элемент); термины вне словаря игнорируются"""
+    matrix = np.zeros((len(stacks), len(term_index)), dtype=np.float32)
+    for row, stack in enumerate(stacks):
+        if not stack:
+            continue
+        for term in parse_string(stack):
+            col = term_index.get(term)
+            if col is not None:
+                matrix[row, col] = 1.0
+    return matrix
+
+
+def rank_students(
+    student_embeddings: np.ndarray,
+    project_embeddings: np.ndarray,
+    student_terms: np.ndarray,
+    project_terms: np.ndarray,
+    top_k: int,
+    bonus_per_match: float = 0.05,
+    candidate_factor: int = 3
+) -> RankedBatch:
+    """Векторная версия ранжирования RecommendationEngine для группы студентов.
+
+    Эмбеддинги должны быть нормированы. Как и в движке, берутся top_k * candidate_factor
+    кандидатов по базовому сходству, к ним добавляется бонус за совпадения стека и
+    выбираются top_k по итоговой оценке.
+    """
+    n_students, n_projects = len(student_embeddings), len(project_embeddings)
+    k = min(top_k, n_projects)
+    n_candidates = min(top_k * candidate_factor, n_projects)
+    if n_students == 0 or k == 0:
+        empty = np.empty((n_students, 0))
+        return RankedBatch(empty.astype(np.int64), empty, empty, empty)
+
+    base = student_embeddings @ project_embeddings.T
+    if n_candidates < n_projects:
+        candidates = np.argpartition(-base, n_candidates - 1, axis=1)[:, :n_candidates]
+    else:
+        candidates = np.broadcast_to(np.arange(n_projects), (n_students, n_projects))
+
+    rows = np.arange(n_students)[:, None]
+    candidate_base = base[rows, candidates]
+    overlap = student_terms @ project_terms.T
+    candidate_bonus = overlap[rows, candidates] * bonus_per_match
+    candidate_final = candidate_base + candidate_bonus
+
+    order = np.argsort(-candidate_final, axis=1, kind="stable")[:, :k]
+    return RankedBatch(
+        project_idx=candidates[rows, order],
+        final_score=candidate_final[rows, order],
+        base_similarity=candidate_base[rows, order],
+        bonus_score=candidate_bonus[rows, order],
+    )
+
+
+def mmr(relevance: np.ndarray, embeddings: np.ndarray, k: int, diversity: float) -> np.ndarray:
+    """Индексы k элементов пула в порядке maximal marginal relevance.
+
+    На каждом шаге выбирается максимум (1 - diversity) * relevance - diversity * (наибольшее
+    сходство с уже выбранными). Эмбеддинги должны быть нормированы; сходства пула считаются
+    одним умножением матриц, дальше k векторных шагов по пулу без попарных циклов.
+    """
+    n = len(relevance)
+    k = min(k, n)
+    selected = np.empty(k, dtype=np.int64)
+    if k == 0:
+        return selected
+
+    similarity = embeddings @ embeddings.T
+    available = np.ones(n, dtype=bool)
+    max_similarity = np.zeros(n, dtype=similarity.dtype)
+    weighted_relevance = (1.0 - diversity) * relevance
+    score = np.asarray(relevance, dtype=np.float64).copy()
+    for i in range(k):
+        score[~available] = -np.inf
+        chosen = int(np.argmax(score))
+        selected[i] = chosen
+        available[chosen] = False
+        max_similarity = similarity[chosen] if i == 0 else np.maximum(max_similarity, similarity[chosen])
+        score = weighted_relevance - diversity * max_similarity
+    return selected
+
+
+class RankedTeams(NamedTuple):
+    """Top-K для группы команд: RankedBatch и доля закрытых ролей проекта, массивы n x k"""
+    ranked: RankedBatch
+    role_coverage: np.ndarray
+
+
+def aggregate_teams(
+    member_embeddings: np.ndarray,
+    member_roles: np.ndarray,
+    member_team_idx: np.ndarray,
+    n_teams: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Эмбеддинги и роли команд одной разреженной матрицей членства (команды x студенты).
+
+    Эмбеддинг команды — нормированное среднее нормированных эмбеддингов участников,
+    роли команды — объединение ролей участников (multi-hot).
+    """
+    membership = sparse.csr_matrix(
+        (np.ones(len(member_team_idx), dtype=np.float32), (member_team_idx, np.arange(len(member_team_idx)))),
+        shape=(n_teams, len(member_team_idx)))
+    team_embeddings = normalize_rows(np.asarray(membership @ normalize_rows(member_embeddings)))
+    team_roles = (np.asarray(membership @ member_roles) > 0).astype(np.float32)
+    return team_embeddings, team_roles
+
+
+def coverage_terms(project_roles: np.ndarray) -> np.ndarray:
+    """Роли проектов, нормированные на их число: team_roles @ coverage_terms.T — доля закрытых ролей"""
+    role_counts = project_roles.sum(axis=1, keepdims=True)
+    return project_roles / np.maximum(role_counts, 1.0)
+
+
+def rank_teams(
+    team_embeddings: np.ndarray,
+    project_embeddings: np.ndarray,
+    team_roles: np.ndarray,
+    project_roles: np.ndarray,
+    top_k: int,
+    coverage_weight: float = 0.1
+) -> RankedTeams:
+    """Ранжирует проекты для команд: косинусное сходство плюс coverage_weight * доля требуемых ролей проекта,
+    которые закрывает хотя бы один участник"""
+    terms = coverage_terms(project_roles)
+    ranked = rank_students(team_embeddings, project_embeddings, team_roles, terms, top_k, coverage_weight)
+    rows = np.arange(len(team_embeddings))[:, None]
+    coverage = (team_roles @ terms.T)[rows, ranked.project_idx]
+    return RankedTeams(ranked, coverage)
+
+
+_worker_state: Dict[str, object] = {}
+
+
+def _init_worker(project_embeddings: np.ndarray, project_terms: np.ndarray, top_k: int, bonus_per_match: float) -> None:
+    _worker_state.update(
+        project_embeddings=project_embeddings,
+        project_terms=project_terms,
+        top_k=top_k,
+        bonus_per_match=bonus_per_match,
+    )
+
+
+def _rank_chunk(student_embeddings: np.ndarray, student_terms: np.ndarray) -> RankedBatch:
+    return rank_students(
+        student_embeddings,
+        _worker_state["project_embeddings"],
+        student_terms,
+        _worker_state["project_terms"],
+        top_k=_worker_state["top_k"],
+        bonus_per_match=_worker_state["bonus_per_match"],
+    )
+
+
+def rank_students_parallel(
+    student_embeddings: np.ndarray,
+    project_embeddings: np.ndarray,
+    student_terms: np.ndarray,
+    project_terms: np.ndarray,
+    top_k: int,
+    bonus_per_match: float = 0.05,
+    workers: int = 1,
+    chunk_size: int = 1024
+) -> RankedBatch:
+    """rank_students по чанкам студентов; при workers > 1 чанки считаются в отдельных процессах"""
+    starts = range(0, len(student_embeddings), chunk_size)
+    chunks = [
+        (student_embeddings[start:start + chunk_size], student_terms[start:start + chunk_size])
+        for start in starts
+    ]
+
+    if workers <= 1 or len(chunks) <= 1:
+        results = [
+            rank_students(embeddings, project_embeddings, terms, project_terms, top_k, bonus_per_match)
+            for embeddings, terms in chunks
+        ]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(project_embeddings, project_terms, top_k, bonus_per_match)
+        ) as executor:
+            results = list(executor.map(_rank_chunk, *zip(*chunks)))
+
+    if not results:
+        return rank_students(student_embeddings, project_embeddings, student_terms, project_terms, top_k, bonus_per_match)
+    return RankedBatch(*(np.concatenate(parts) for parts in zip(*results)))
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from db import Repositories
+from .load_shedding import InferenceLimiter
+
+try:
+    import fcntl
+except ImportError:  # не POSIX: файл счетчиков пишется без блокировки
+    fcntl = None
+
+
+class CacheWarmer:
+    """Прогрев кэша рекомендаций после старта воркера.
+
+    Индекс навыков и эмбеддинги проектов прогревает ModelManager.start; затем в
+    фоне по одному считаются рекомендации студентов, которых вероятнее всего
+    запросят: самые частые по прошлым запросам (счетчики сохраняются в
+    hits_path при остановке, старые теряют половину веса за hits_half_life
+    секунд), недавно добавлявшие проекты в избранное и студенты из group_ids.
+    Прогрев уступает живому трафику: студент считается только в свободном слоте
+    модели, когда живых запросов в очереди нет, и сам в очередь не встает.
+    """
+
+    def __init__(
+        self,
+        prefetch: Callable[[int], Awaitable[Any]],
+        session_factory: Callable,
+        inference_limiter: Optional[InferenceLimiter] = None,
+        hits_path: Optional[str] = None,
+        group_ids: Iterable[str] = (),
+        max_students: int = 1000,
+        ready_fraction: float = 0.0,
+        idle_delay: float = 0.05,
+        hits_half_life: float = 86400.0
+    ):
+        self.prefetch = prefetch
+        self.session_factory = session_factory
+        self.inference_limiter = inference_limiter
+        self.hits_path = hits_path
+        self.group_ids = [g for g in group_ids if g]
+        self.max_students = max_students
+        self.ready_fraction = ready_fraction
+        self.idle_delay = idle_delay
+        self.hits_half_life = hits_half_life
+        self.hits: Counter = Counter()
+        self.stage = "index"
+        self.index_ms: Optional[float] = None
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.yields = 0
+        self.elapsed_ms: Optional[float] = None
+
+    def record(self, student_id: int) -> None:
+        """Учитывает запрос рекомендаций студента для приоритета следующего прогрева"""
+        self.hits[student_id] += 1
+
+    def index_ready(self, elapsed: float) -> None:
+        self.index_ms = round(elapsed * 1000, 3)
+        self.stage = "prefetch"
+
+    def _read_hits(self) -> Tuple[Counter, Optional[float]]:
+        """Сохраненные счетчики и время сохранения (None у файлов старого формата без него)"""
+        if not self.hits_path or not Path(self.hits_path).exists():
+            return Counter(), None
+        try:
+            with open(self.hits_path, encoding="utf-8") as f:
+                data = json.load(f)
+            saved_at = data.get("saved_at") if isinstance(data.get("hits"), dict) else None
+            hits = data["hits"] if saved_at is not None else data
+            return Counter({int(student_id): count for student_id, count in hits.items()}), saved_at
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Failed to read warm-up hit counts from {self.hits_path}: {e}")
+            return Counter(), None
+
+    def load_hits(self) -> Counter:
+        return self._read_hits()[0]
+
+    def save_hits(self, keep: int = 100_000) -> None:
+        """Добавляет счетчики этого воркера к сохраненным под блокировкой файла и пишет его атомарно.
+
+        Старые счетчики затухают по времени с прошлого сохранения, поэтому
+        воркеры, останавливающиеся вместе, не уменьшают их каждый заново.
+        """
+        if not self.hits_path or not self.hits:
+            return
+        with open(f"{self.hits_path}.lock", "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            saved, saved_at = self._read_hits()
+            now = time.time()
+            decay = 0.5 ** (max(now - saved_at, 0.0) / self.hits_half_life) if saved_at is not None else 0.5
+            merged = Counter({student_id: count * decay for student_id, count in saved.items()})
+            merged.update(self.hits)
+            tmp_path = f"{self.hits_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"saved_at": now, "hits": {str(student_id): count for student_id, count in merged.most_common(keep)}}, f)
+            os.replace(tmp_path, self.hits_path)
+        self.hits.clear()
+
+    async def candidates(self) -> List[int]:
+        """Id студентов в порядке прогрева без повторов: частые запросы, недавняя активность, текущие группы"""
+        ordered = [student_id for student_id, _ in self.load_hits().most_common(self.max_students)]
+        repos = Repositories(session_factory=self.session_factory)
+        try:
+            ordered += await repos.favorite_repo.get_recent_student_ids(self.max_students)
+            if self.group_ids:
+                ordered += await repos.student_repo.get_student_ids_by_groups(self.group_ids)
+        finally:
+            await repos.close()
+        return list(dict.fromkeys(ordered))[:self.max_students]
+
+    async def _prefetch_when_idle(self, student_id: int) -> None:
+        if self.inference_limiter is None:
+            await self.prefetch(student_id)
+            return
+        while True:
+            # Живой запрос, пришедший во время прогрева, получает другой слот или ждет не дольше одного студента
+            async with self.inference_limiter.try_slot() as acquired:
+                if acquired:
+                    await self.prefetch(student_id)
+                    return
+            self.yields += 1
+            await asyncio.sleep(self.idle_delay)
+
+    async def run(self) -> None:
+        """Фоновая задача прогрева; ошибки отдельных студентов не прерывают прогрев"""
+        started = time.perf_counter()
+        try:
+            student_ids = await self.candidates()
+            self.total = len(student_ids)
+            print(f"Warming recommendations for {self.total} students...")
+            for student_id in student_ids:
+                try:
+                    await self._prefetch_when_idle(student_id)
+                    self.done += 1
+                except Exception:
+                    self.failed += 1
+        except Exception as e:
+            print(f"Cache warm-up stopped: {e}")
+        finally:
+            self.stage = "done"
+            self.elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+        print(f"Cache warm-up finished: {self.done} warmed, {self.failed} failed in {self.elapsed_ms / 1000:.1f}s.")
+
+    def ready(self) -> bool:
+        """Готовность воркера: индекс прогрет и прогрета доля ready_fraction выбранных студентов"""
+        if self.stage == "index":
+            return False
+        if self.stage == "done" or self.ready_fraction <= 0:
+            return True
+        return self.total > 0 and (self.done + self.failed) / self.total >= self.ready_fraction
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "stage": self.stage,
+            "index_ms": self.index_ms,
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            "progress": round((self.done + self.failed) / self.total, 4) if self.total else None,
+            "yields": self.yields,
+            "elapsed_ms": self.elapsed_ms,
+        }
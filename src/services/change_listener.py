@@ -0,0 +1,281 @@
+import asyncio
+import datetime
+import json
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+import asyncpg
+from config import settings
+from db import Repositories
+from db.models import Project
+from db.notifications import CHANNEL, missing_triggers
+from .collaborative import CoOccurrenceModel
+from .model_manager import ModelManager
+from .recommendation_engine import RecommendationEngine
+from .result_cache import ResultCache
+
+# Насколько раньше водяного знака перечитываются проекты при догоняющей синхронизации:
+# updated_at ставится до коммита, и долгая транзакция может закоммититься позже следующей
+CATCH_UP_OVERLAP = datetime.timedelta(seconds=60)
+
+
+class Changes:
+    """Id измененных строк из пачки уведомлений"""
+
+    def __init__(self):
+        self.project_ids: Set[int] = set()
+        self.student_ids: Set[int] = set()
+        self.favorite_student_ids: Set[int] = set()
+
+    def __bool__(self) -> bool:
+        return bool(self.project_ids or self.student_ids or self.favorite_student_ids)
+
+    @classmethod
+    def parse(cls, payloads: Iterable[str]) -> "Changes":
+        changes = cls()
+        for payload in payloads:
+            try:
+                data = json.loads(payload)
+            except ValueError:
+                continue
+            table, row_id = data.get("table"), data.get("id")
+            if row_id is None:
+                continue
+            if table == "project":
+                changes.project_ids.add(int(row_id))
+            elif table == "student":
+                changes.student_ids.add(int(row_id))
+            elif table == "favorite_project" and data.get("student_id") is not None:
+                changes.favorite_student_ids.add(int(data["student_id"]))
+        return changes
+
+
+def is_complete(project: Project) -> bool:
+    return bool(project.is_active is not False and project.stack and project.required_roles and project.description)
+
+
+class ChangeListener:
+    """Применяет изменения project, student и favorite_project по LISTEN/NOTIFY вместо опроса.
+
+    Слушает канал на выделенном asyncpg-соединении (не из пула), собирает
+    уведомления в пачки за debounce секунд и точечно обновляет индекс навыков,
+    эмбеддинги проектов, матрицу студентов и коллаборативную модель текущего
+    движка, удаляя из кэша только затронутые ответы. После (пере)подключения
+    догоняет пропущенное: проекты по водяному знаку updated_at, студенты и
+    избранное — инкрементальным refresh (у student нет updated_at).
+
+    Снимок проектов перестает устаревать по PROJECT_SNAPSHOT_MAX_AGE, только пока
+    соединение живо и триггеры уведомлений стоят на всех трех таблицах; наличие
+    триггеров проверяется при подключении и при каждой проверке молчащего соединения.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        model_manager: ModelManager,
+        session_factory: Callable,
+        collaborative: Optional[CoOccurrenceModel] = None,
+        result_cache: Optional[ResultCache] = None,
+        debounce: float = 0.05,
+        check_interval: float = 5.0,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0
+    ):
+        self.dsn = dsn
+        self.model_manager = model_manager
+        self.session_factory = session_factory
+        self.collaborative = collaborative
+        self.result_cache = result_cache
+        self.debounce = debounce
+        self.check_interval = check_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.project_watermark: Optional[datetime.datetime] = None
+        self.connected = False
+        self.triggers_installed: Optional[bool] = None
+        self.notifications = 0
+        self.batches = 0
+        self.reconnects = 0
+        self.last_apply_ms: Optional[float] = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._engine: Optional[RecommendationEngine] = None
+
+    def _on_notification(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        self.notifications += 1
+        self._queue.put_nowait(payload)
+
+    async def _invalidate(self, prefix: str) -> None:
+        if self.result_cache is not None:
+            await self.result_cache.invalidate_prefix(prefix)
+
+    def _mark_live(self, live: bool) -> None:
+        engine = self.model_manager.engine
+        if engine is not None and engine.skill_index is not None:
+            # Без триггеров уведомления не приходят, и снимок должен устаревать как обычно
+            engine.skill_index.live = live and bool(self.triggers_installed)
+
+    async def _check_triggers(self, connection: Any) -> None:
+        missing = await missing_triggers(connection)
+        if missing and self.triggers_installed is not False:
+            print(f"Notification triggers are missing ({', '.join(missing)}), "
+                  "project snapshot keeps expiring; run src/install_notify_triggers.py.")
+        self.triggers_installed = not missing
+
+    def _advance_watermark(self, projects: List[Project]) -> None:
+        stamps = [p.updated_at for p in projects if p.updated_at is not None]
+        if stamps and (self.project_watermark is None or max(stamps) > self.project_watermark):
+            self.project_watermark = max(stamps)
+
+    async def _apply_projects(self, engine: RecommendationEngine, projects: List[Project], removed_ids: Iterable[int]) -> None:
+        if engine.skill_index is not None:
+            engine.skill_index.apply_changes(projects, removed_ids)
+        complete = [p for p in projects if is_complete(p)]
+        if engine.model_service is not None and complete:
+            # Кэш эмбеддингов проектов ключуется по содержимому: пересчитаются только измененные
+            await asyncio.to_thread(engine.model_service.embed_projects, complete)
+        self._advance_watermark(projects)
+
+    async def catch_up(self) -> None:
+        """Догоняющая синхронизация после подключения, переподключения или замены движка"""
+        engine = self.model_manager.engine
+        self._engine = engine
+        if engine is None:
+            return
+
+        repos = Repositories(session_factory=self.session_factory)
+        try:
+            changed = False
+            if self.project_watermark is None:
+                projects = await repos.project_repo.get_active_projects()
+                if engine.skill_index is not None:
+                    version = engine.skill_index.version
+                    engine.skill_index.sync(projects)
+                    changed = engine.skill_index.version != version
+                complete = [p for p in projects if is_complete(p)]
+                if engine.model_service is not None and complete:
+                    await asyncio.to_thread(engine.model_service.embed_projects, complete)
+                self._advance_watermark(projects)
+            else:
+                projects = await repos.project_repo.get_projects_updated_since(self.project_watermark - CATCH_UP_OVERLAP)
+                active_ids = set(await repos.project_repo.get_active_project_ids())
+                indexed_ids = engine.skill_index.projects.keys() if engine.skill_index is not None else ()
+                removed_ids = [project_id for project_id in indexed_ids if project_id not in active_ids]
+                await self._apply_projects(engine, projects, removed_ids)
+                changed = bool(projects or removed_ids)
+
+            if engine.student_matrix is not None and engine.model_service is not None:
+                changed |= await engine.student_matrix.refresh(repos.student_repo, engine.model_service) > 0
+            if self.collaborative is not None:
+                changed |= await self.collaborative.refresh(repos.favorite_repo, settings.COLLABORATIVE_CHUNK_SIZE) > 0
+        finally:
+            await repos.close()
+
+        if changed:
+            await self._invalidate(f"student:{engine.model_version}:")
+
+    async def _follow_engine(self) -> None:
+        if self.model_manager.engine is not self._engine:
+            # Движок заменили: его прогрев мог не увидеть изменения, пришедшие во время загрузки
+            await self.catch_up()
+
+    async def apply(self, changes: Changes) -> None:
+        """Точечно применяет пачку изменений к текущему движку"""
+        started = time.perf_counter()
+        await self._follow_engine()
+        engine = self._engine
+        if engine is None:
+            return
+
+        repos = Repositories(session_factory=self.session_factory)
+        try:
+            if changes.project_ids:
+                projects = await repos.project_repo.get_projects_by_ids(changes.project_ids)
+                found = {p.id for p in projects}
+                await self._apply_projects(engine, projects, [i for i in changes.project_ids if i not in found])
+                # Новый, измененный или снятый проект может войти в выдачу любого студента
+                await self._invalidate(f"student:{engine.model_version}:")
+
+            if changes.student_ids:
+                students = await repos.student_repo.get_students_by_ids(changes.student_ids)
+                if engine.student_matrix is not None and engine.model_service is not None:
+                    found = {s.id for s in students}
+                    await asyncio.to_thread(
+                        engine.student_matrix.update, students,
+                        [i for i in changes.student_ids if i not in found], engine.model_service)
+                for student_id in changes.student_ids:
+                    await self._invalidate(f"student:{engine.model_version}:{student_id}:")
+
+            if changes.favorite_student_ids and self.collaborative is not None:
+                # refresh двигает водяной знак id, а удаленные записи видны только при перечитывании студентов
+                await self.collaborative.refresh(repos.favorite_repo, settings.COLLABORATIVE_CHUNK_SIZE)
+                await self.collaborative.reload_students(repos.favorite_repo, changes.favorite_student_ids)
+                for student_id in changes.favorite_student_ids:
+                    await self._invalidate(f"student:{engine.model_version}:{student_id}:")
+        finally:
+            await repos.close()
+        self.batches += 1
+        self.last_apply_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    async def _drain(self, first: str) -> List[str]:
+        payloads = [first]
+        await asyncio.sleep(self.debounce)
+        while not self._queue.empty():
+            payloads.append(self._queue.get_nowait())
+        return payloads
+
+    async def _consume(self, connection: Any, lost: asyncio.Event) -> None:
+        while not lost.is_set():
+            try:
+                payload = await asyncio.wait_for(self._queue.get(), timeout=self.check_interval)
+            except asyncio.TimeoutError:
+                # Молчащее соединение могло оборваться без уведомления о закрытии, а триггеры — пропасть после миграции
+                await self._check_triggers(connection)
+            else:
+                changes = Changes.parse(await self._drain(payload))
+                if changes:
+                    await self.apply(changes)
+            # Новый движок помечается живым только после догоняющей синхронизации
+            await self._follow_engine()
+            self._mark_live(True)
+        raise ConnectionError("LISTEN connection was closed")
+
+    async def run(self) -> None:
+        """Фоновая задача: LISTEN с переподключением по нарастающей задержке и догоняющей синхронизацией"""
+        delay = self.reconnect_delay
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(CHANNEL, self._on_notification)
+                # Сначала LISTEN, потом догоняющая синхронизация: изменения между ними не теряются
+                await self.catch_up()
+                await self._check_triggers(connection)
+                self.connected = True
+                self._mark_live(True)
+                delay = self.reconnect_delay
+                print("Change listener connected.")
+                await self._consume(connection, lost)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Change listener disconnected, reconnecting in {delay:.1f}s: {e}")
+            finally:
+                self.connected = False
+                self._mark_live(False)
+                if connection is not None and not connection.is_closed():
+                    connection.terminate()
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected": self.connected,
+            "triggers_installed": self.triggers_installed,
+            "notifications": self.notifications,
+            "batches": self.batches,
+            "reconnects": self.reconnects,
+            "last_apply_ms": self.last_apply_ms,
+            "project_watermark": self.project_watermark.isoformat() if self.project_watermark else None,
+        }
@@ -0,0 +1,132 @@
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, TypeVar
+import numpy as np
+from db.models import Project, Student
+from db.project_repository import ProjectRepository
+from .batch_scoring import build_term_index, multi_hot, normalize_rows, rank_students
+from .recommendation_engine import RecommendationEngine
+
+T = TypeVar("T")
+
+
+class _Failure:
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+async def buffered(source: AsyncIterator[T], size: int) -> AsyncIterator[T]:
+    """Читает source в фоновой задаче не больше чем на size элементов вперед.
+
+    Следующие стадии конвейера работают параллельно с предыдущими, а размер
+    очереди ограничивает память. При закрытии генератора задача отменяется.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(size, 1))
+    done = object()
+
+    async def pump() -> None:
+        try:
+            async for item in source:
+                await queue.put(item)
+            await queue.put(done)
+        except Exception as e:
+            await queue.put(_Failure(e))
+        finally:
+            await source.aclose()
+
+    task = asyncio.create_task(pump())
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+class CohortScorer:
+    """Top-N проектов для потока пачек студентов: конвейер чтение из базы -> s_tower -> top-k.
+
+    Эмбеддинги и термины проектов считаются один раз; каждая пачка студентов
+    проходит s_tower и rank_students (та же логика, что в precompute_recommendations:
+    косинус плюс бонус за совпадения стека, без коллаборативного сигнала).
+    Между стадиями не больше max_in_flight пачек, поэтому память не зависит от
+    размера когорты.
+    """
+
+    def __init__(self, engine: RecommendationEngine, top_n: int = 5, bonus_per_match: float = 0.05, max_in_flight: int = 2):
+        if engine.model_service is None:
+            raise RuntimeError("Model not loaded.")
+        self.engine = engine
+        self.top_n = top_n
+        self.bonus_per_match = bonus_per_match
+        self.max_in_flight = max_in_flight
+        self.projects: List[Project] = []
+        self.project_embeddings: Optional[np.ndarray] = None
+        self.project_terms: Optional[np.ndarray] = None
+        self.term_index: Dict[str, int] = {}
+
+    async def prepare(self, project_repo: ProjectRepository) -> None:
+        projects = await self.engine.active_projects(project_repo)
+        self.projects = [p for p in projects if p.stack and p.required_roles and p.description]
+        self.term_index = build_term_index(p.stack for p in self.projects)
+        self.project_terms = multi_hot([p.stack for p in self.projects], self.term_index)
+        embeddings = await asyncio.to_thread(self.engine.model_service.embed_projects, self.projects)
+        self.project_embeddings = normalize_rows(embeddings.cpu().numpy())
+
+    def score_batch(self, students: List[Student]) -> List[Dict]:
+        """Рекомендации для пачки студентов с профилем: {"student_id", "recommendations"}"""
+        students = [s for s in students if s.stack and s.desired_role]
+        if not students:
+            return []
+        student_embeddings = normalize_rows(self.engine.model_service.embed_students(students).cpu().numpy())
+        ranked = rank_students(
+            student_embeddings, self.project_embeddings,
+            multi_hot([s.stack for s in students], self.term_index), self.project_terms,
+            self.top_n, self.bonus_per_match)
+        results = []
+        for student, row_idx, row_final, row_base, row_bonus in zip(students, *ranked):
+            results.append({
+                "student_id": student.id,
+                "recommendations": [
+                    {
+                        "project_id": self.projects[idx].id,
+                        "project_name": self.projects[idx].name,
+                        "final_score": round(float(final), 4),
+                        "base_similarity": round(float(base), 4),
+                        "bonus_score": round(float(bonus), 4),
+                        "required_stack": self.projects[idx].stack,
+                        "required_roles": self.projects[idx].required_roles,
+                    } for idx, final, base, bonus in zip(row_idx, row_final, row_base, row_bonus)
+                ],
+            })
+        return results
+
+    async def _scored_batches(self, student_batches: AsyncIterator[List[Student]]) -> AsyncIterator[List[Dict]]:
+        limiter = self.engine.inference_limiter
+        async for students in student_batches:
+            if limiter is None:
+                yield await asyncio.to_thread(self.score_batch, students)
+                continue
+            # Пачки делят слоты модели с живыми запросами, а не занимают все потоки
+            async with limiter.slot():
+                scored = await asyncio.to_thread(self.score_batch, students)
+            yield scored
+
+    async def stream(self, student_batches: AsyncIterator[List[Student]]) -> AsyncIterator[Dict]:
+        """Рекомендации по одному студенту, как только посчитана его пачка"""
+        if not self.projects:
+            return
+        scored = buffered(self._scored_batches(buffered(student_batches, self.max_in_flight)), self.max_in_flight)
+        try:
+            async for batch in scored:
+                for result in batch:
+                    yield result
+        finally:
+            await scored.aclose()
@@ -0,0 +1,208 @@
+import asyncio
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+from scipy import sparse
+from db import Repositories
+from db.favorite_repository import FavoriteRepository
+
+FavoriteChunk = Tuple[np.ndarray, np.ndarray]
+
+
+class CoOccurrenceModel:
+    """Item-item сходство проектов по таблице избранного (favorite_project).
+
+    X — бинарная разреженная матрица студенты x проекты, C = XᵀX — совместная
+    встречаемость проектов, S — косинусно нормированная C с нулевой диагональю.
+    Коллаборативная оценка студента — одно умножение его разреженной строки X на S,
+    деленное на число его избранных проектов.
+    """
+
+    def __init__(self):
+        self.student_pos: Dict[int, int] = {}
+        self.project_pos: Dict[int, int] = {}
+        self.favorites = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.co_occurrence = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.similarity = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.last_favorite_id = 0
+
+    def __len__(self) -> int:
+        return self.favorites.nnz
+
+    @staticmethod
+    def _positions(ids: np.ndarray, mapping: Dict[int, int]) -> np.ndarray:
+        """Позиции id в матрице; новые id получают следующие позиции. Цикл только по уникальным id чанка"""
+        unique_ids, inverse = np.unique(ids, return_inverse=True)
+        lookup = np.empty(len(unique_ids), dtype=np.int32)
+        for i, item_id in enumerate(unique_ids.tolist()):
+            pos = mapping.get(item_id)
+            if pos is None:
+                pos = mapping[item_id] = len(mapping)
+            lookup[i] = pos
+        return lookup[inverse]
+
+    def _delta(self, student_ids: np.ndarray, project_ids: np.ndarray) -> sparse.csr_matrix:
+        rows = self._positions(student_ids, self.student_pos)
+        cols = self._positions(project_ids, self.project_pos)
+        shape = (len(self.student_pos), len(self.project_pos))
+        delta = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=shape)
+        delta.data[:] = 1.0
+        return delta
+
+    def _resize(self) -> None:
+        n_students, n_projects = len(self.student_pos), len(self.project_pos)
+        self.favorites.resize((n_students, n_projects))
+        self.co_occurrence.resize((n_projects, n_projects))
+
+    def _update_similarity(self) -> None:
+        diagonal = self.co_occurrence.diagonal()
+        inv_norm = np.zeros_like(diagonal)
+        np.divide(1.0, np.sqrt(diagonal), out=inv_norm, where=diagonal > 0)
+        scale = sparse.diags(inv_norm)
+        similarity = (scale @ self.co_occurrence @ scale).tocsr()
+        similarity.setdiag(0)
+        similarity.eliminate_zeros()
+        self.similarity = similarity
+
+    def build(self, chunks: Iterable[FavoriteChunk]) -> None:
+        """Полная сборка из чанков (student_ids, project_ids); в памяти только индексы int32, без объектов на строку"""
+        self.student_pos, self.project_pos = {}, {}
+        rows: List[np.ndarray] = []
+        cols: List[np.ndarray] = []
+        for student_ids, project_ids in chunks:
+            self.add_chunk(student_ids, project_ids, rows, cols)
+        self._build_from_positions(rows, cols)
+
+    def add_chunk(self, student_ids: np.ndarray, project_ids: np.ndarray, rows: List[np.ndarray], cols: List[np.ndarray]) -> None:
+        """Переводит id чанка в позиции int32 и добавляет их к rows и cols; исходные id не сохраняются"""
+        rows.append(self._positions(student_ids, self.student_pos))
+        cols.append(self._positions(project_ids, self.project_pos))
+
+    def _build_from_positions(self, rows: List[np.ndarray], cols: List[np.ndarray]) -> None:
+        shape = (len(self.student_pos), len(self.project_pos))
+        row = np.concatenate(rows) if rows else np.empty(0, dtype=np.int32)
+        col = np.concatenate(cols) if cols else np.empty(0, dtype=np.int32)
+        favorites = sparse.csr_matrix((np.ones(len(row), dtype=np.float32), (row, col)), shape=shape)
+        favorites.data[:] = 1.0
+        self.favorites = favorites
+        self.co_occurrence = (favorites.T @ favorites).tocsr()
+        self._update_similarity()
+
+    def _set_rows(self, affected: np.ndarray, new_rows: sparse.csr_matrix) -> None:
+        """Заменяет строки affected матрицы X на new_rows и поправляет C = XᵀX только на их разность"""
+        old_rows = self.favorites[affected]
+        self.co_occurrence = (self.co_occurrence + new_rows.T @ new_rows - old_rows.T @ old_rows).tocsr()
+        self.co_occurrence.eliminate_zeros()
+
+        n_students = self.favorites.shape[0]
+        keep = np.ones(n_students, dtype=np.float32)
+        keep[affected] = 0.0
+        placement = sparse.csr_matrix(
+            (np.ones(len(affected), dtype=np.float32), (affected, np.arange(len(affected)))), shape=(n_students, len(affected)))
+        favorites = (sparse.diags(keep) @ self.favorites + placement @ new_rows).tocsr()
+        favorites.eliminate_zeros()
+        favorites.data[:] = 1.0
+        self.favorites = favorites
+        self._update_similarity()
+
+    def apply(self, student_ids: np.ndarray, project_ids: np.ndarray) -> None:
+        """Инкрементально добавляет новые записи избранного: пересчитываются только строки затронутых студентов"""
+        if len(student_ids) == 0:
+            return
+        delta = self._delta(student_ids, project_ids)
+        self._resize()
+
+        affected = np.unique(delta.nonzero()[0])
+        new_rows = self.favorites[affected] + delta[affected]
+        new_rows.data[:] = 1.0
+        self._set_rows(affected, new_rows)
+
+    def replace_students(self, student_ids: Iterable[int], favorite_student_ids: np.ndarray, favorite_project_ids: np.ndarray) -> None:
+        """Заменяет избранное студентов student_ids текущими парами из базы, в том числе убирая удаленные записи"""
+        students = np.unique(np.fromiter(student_ids, dtype=np.int64))
+        if len(students) == 0:
+            return
+        own = np.isin(favorite_student_ids, students)
+        favorite_student_ids, favorite_project_ids = favorite_student_ids[own], favorite_project_ids[own]
+        affected = self._positions(students, self.student_pos)
+        rows = self._positions(favorite_student_ids, self.student_pos)
+        cols = self._positions(favorite_project_ids, self.project_pos)
+        self._resize()
+
+        # Строки new_rows идут в порядке affected (students уже отсортированы np.unique)
+        order = np.searchsorted(students, favorite_student_ids)
+        new_rows = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (order, cols)), shape=(len(affected), len(self.project_pos)))
+        new_rows.data[:] = 1.0
+        self._set_rows(affected, new_rows)
+
+    def scores(self, student_id: int, project_ids: List[int]) -> np.ndarray:
+        """Коллаборативные оценки студента в [0, 1] для переданных проектов (0 для неизвестных)"""
+        result = np.zeros(len(project_ids), dtype=np.float32)
+        student = self.student_pos.get(student_id)
+        if student is None:
+            return result
+        row = self.favorites[student]
+        if row.nnz == 0:
+            return result
+
+        student_scores = np.asarray((row @ self.similarity).todense()).ravel() / row.nnz
+        positions = np.fromiter((self.project_pos.get(pid, -1) for pid in project_ids), dtype=np.int64, count=len(project_ids))
+        known = positions >= 0
+        result[known] = student_scores[positions[known]]
+        return result
+
+    async def load(self, favorite_repo: FavoriteRepository, chunk_size: int = 100_000) -> None:
+        """Полная пересборка из базы данных чанками по id; текущая матрица заменяется только в конце"""
+        model = CoOccurrenceModel()
+        row_positions: List[np.ndarray] = []
+        col_positions: List[np.ndarray] = []
+        last_id = 0
+        while True:
+            rows = await favorite_repo.get_favorites_after(last_id, chunk_size)
+            if not rows:
+                break
+            ids, student_ids, project_ids = (np.array(column, dtype=np.int64) for column in zip(*rows))
+            model.add_chunk(student_ids, project_ids, row_positions, col_positions)
+            last_id = int(ids[-1])
+
+        await asyncio.to_thread(model._build_from_positions, row_positions, col_positions)
+        self.student_pos = model.student_pos
+        self.project_pos = model.project_pos
+        self.favorites = model.favorites
+        self.co_occurrence = model.co_occurrence
+        self.similarity = model.similarity
+        self.last_favorite_id = last_id
+
+    async def refresh(self, favorite_repo: FavoriteRepository, chunk_size: int = 100_000) -> int:
+        """Подтягивает записи избранного, добавленные после последней загрузки; возвращает их число"""
+        added = 0
+        while True:
+            rows = await favorite_repo.get_favorites_after(self.last_favorite_id, chunk_size)
+            if not rows:
+                return added
+            ids, student_ids, project_ids = (np.array(column, dtype=np.int64) for column in zip(*rows))
+            self.apply(student_ids, project_ids)
+            self.last_favorite_id = int(ids[-1])
+            added += len(rows)
+
+    async def reload_students(self, favorite_repo: FavoriteRepository, student_ids: Iterable[int]) -> None:
+        """Перечитывает избранное студентов целиком: так учитываются и удаления, которые refresh по id не видит"""
+        student_ids = list(student_ids)
+        rows = await favorite_repo.get_favorites_of_students(student_ids)
+        if rows:
+            favorite_student_ids, favorite_project_ids = (np.array(column, dtype=np.int64) for column in zip(*rows))
+        else:
+            favorite_student_ids = favorite_project_ids = np.empty(0, dtype=np.int64)
+        self.replace_students(student_ids, favorite_student_ids, favorite_project_ids)
+
+    async def refresh_periodically(self, session_factory, interval: float, chunk_size: int = 100_000) -> None:
+        """Фоновая задача: раз в interval секунд подтягивает новое избранное"""
+        while True:
+            await asyncio.sleep(interval)
+            repos = Repositories(session_factory=session_factory)
+            try:
+                await self.refresh(repos.favorite_repo, chunk_size)
+            except Exception as e:
+                print(f"Failed to refresh favorites co-occurrence: {e}")
+            finally:
+                await repos.close()
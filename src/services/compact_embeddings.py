@@ -0,0 +1,114 @@
+from typing import List, Optional
+import numpy as np
+import torch
+from .batch_scoring import normalize_rows
+
+EMBEDDING_DTYPES = ("float32", "float16", "int8")
+
+
+class CompactMatrix:
+    """Матрица нормированных по строкам эмбеддингов в компактном формате хранения.
+
+    float16 хранит строки как есть, int8 — с масштабом на строку (max|x| / 127).
+    Строки нормируются до квантования, поэтому косинус — это скалярное
+    произведение. Одиночные запросы к int8 умножаются целочисленно (int32) на
+    квантованный запрос, в остальных случаях строки деквантуются блоками в
+    float32; полная float32-копия матрицы не создается.
+    """
+
+    BLOCK_ROWS = 8192
+    # Целочисленное умножение быстрее деквантования для одиночных запросов; на больших
+    # пачках запросов выгоднее деквантовать блоки и умножать в float32
+    INT_MM_MAX_QUERIES = 8
+
+    def __init__(self, data: np.ndarray, scale: Optional[np.ndarray] = None):
+        self.data = data
+        self.scale = scale
+
+    @classmethod
+    def from_embeddings(cls, embeddings: np.ndarray, dtype: str = "float32") -> "CompactMatrix":
+        if dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"Unknown embedding storage dtype: {dtype}")
+        normalized = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        if dtype != "int8":
+            return cls(normalized.astype(dtype, copy=False))
+
+        scale = np.abs(normalized).max(axis=1) / 127.0 if normalized.size else np.zeros(len(normalized))
+        scale = np.where(scale > 0, scale, 1.0).astype(np.float32)
+        data = np.rint(normalized / scale[:, None]).astype(np.int8)
+        return cls(data, scale)
+
+    @classmethod
+    def assemble(cls, parts: List["CompactMatrix"], positions: List[np.ndarray], n_rows: int) -> "CompactMatrix":
+        """Собирает матрицу из n_rows строк: строки parts[i] встают на позиции positions[i], без повторного квантования"""
+        template = next((part for part in parts if len(part)), parts[0])
+        data = np.empty((n_rows,) + template.data.shape[1:], dtype=template.data.dtype)
+        scale = np.empty(n_rows, dtype=np.float32) if template.scale is not None else None
+        for part, rows in zip(parts, positions):
+            if not len(rows):
+                continue
+            data[rows] = part.data
+            if scale is not None:
+                scale[rows] = part.scale
+        return cls(data, scale)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, rows) -> "CompactMatrix":
+        return CompactMatrix(self.data[rows], self.scale[rows] if self.scale is not None else None)
+
+    @property
+    def dtype(self) -> str:
+        return self.data.dtype.name
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def dot(self, query: np.ndarray) -> np.ndarray:
+        """Скалярные произведения всех строк с query (d или q x d) в float32: n или n x q"""
+        query = np.asarray(query, dtype=np.float32)
+        if self.data.dtype == np.float32:
+            return self.data @ query.T
+        n_queries = 1 if query.ndim == 1 else len(query)
+        if (self.scale is not None and n_queries <= self.INT_MM_MAX_QUERIES
+                and len(self.data) > 16 and self.data.shape[1] % 8 == 0):
+            scores = self._int8_dot(query.reshape(-1, query.shape[-1]))
+            if scores is not None:
+                return scores[:, 0] if query.ndim == 1 else scores
+
+        result = np.empty((len(self.data),) + query.shape[:-1], dtype=np.float32)
+        query_t = torch.from_numpy(np.ascontiguousarray(query.T))
+        for start in range(0, len(self.data), self.BLOCK_ROWS):
+            # Преобразование float16/int8 -> float32 в torch векторизовано, в numpy для float16 — нет
+            block = torch.from_numpy(self.data[start:start + self.BLOCK_ROWS]).float()
+            scores = (block @ query_t).numpy()
+            if self.scale is not None:
+                scale = self.scale[start:start + self.BLOCK_ROWS]
+                scores *= scale if scores.ndim == 1 else scale[:, None]
+            result[start:start + len(block)] = scores
+        return result
+
+    def _int8_dot(self, queries: np.ndarray) -> Optional[np.ndarray]:
+        """int8 x int8 -> int32 (torch._int_mm) с квантованием запросов; None, если операция недоступна"""
+        int_mm = getattr(torch, "_int_mm", None)
+        if int_mm is None:
+            return None
+        query_scale = np.abs(queries).max(axis=1) / 127.0
+        query_scale = np.where(query_scale > 0, query_scale, 1.0).astype(np.float32)
+        # Число столбцов должно быть кратно 8: недостающие запросы заполняются нулями
+        padded = np.zeros((queries.shape[1], -(-len(queries) // 8) * 8), dtype=np.int8)
+        padded[:, :len(queries)] = np.rint(queries / query_scale[:, None]).T
+        try:
+            products = int_mm(torch.from_numpy(self.data), torch.from_numpy(padded)).numpy()
+        except RuntimeError:
+            return None
+        scores = products[:, :len(queries)].astype(np.float32)
+        scores *= self.scale[:, None]
+        scores *= query_scale
+        return scores
+
+    def to_float32(self) -> np.ndarray:
+        data = self.data.astype(np.float32)
+        return data * self.scale[:, None] if self.scale is not None else data
@@ -0,0 +1,276 @@
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from db.models import Project, Student, Team
+from db.project_repository import ProjectRepository
+from db.student_repository import StudentRepository
+from db.team_repository import TeamRepository
+from .assignment import Distribution
+from .batch_scoring import aggregate_teams, build_term_index, coverage_terms, multi_hot, normalize_rows
+from .recommendation_service import RecommendationService
+from .team_formation import TeamFormation
+
+PRIORITY_WEIGHTS = (1.0, 2 / 3, 1 / 3)
+
+
+def priority_scores(teams: List[Team], project_ids: List[int]) -> np.ndarray:
+    """Средний по участникам вес приоритета (первый 1, второй 2/3, третий 1/3) каждого проекта для каждой команды"""
+    column = {project_id: i for i, project_id in enumerate(project_ids)}
+    scores = np.zeros((len(teams), len(project_ids)))
+    for row, team in enumerate(teams):
+        members = list(team.student)
+        for student in members:
+            priorities = (student.first_priority, student.second_priority, student.third_priority)
+            for weight, project_id in zip(PRIORITY_WEIGHTS, priorities):
+                col = column.get(project_id)
+                if col is not None:
+                    scores[row, col] += weight / len(members)
+    return scores
+
+
+class DistributionService:
+    """Глобальное распределение команд по проектам с сохранением состояния решателя.
+
+    Полезность пары — сходство команды и проекта по модели, доля закрытых ролей
+    и приоритеты участников. После полного решения изменения отдельных команд и
+    проектов применяются инкрементально, а сценарии «что если» считаются на копии.
+    Студентов без команды можно разбить на команды под проекты (form_teams).
+    Полное решение, пересчеты и сценарии выполняются под одной блокировкой:
+    между их await состояние решателя не меняется. Состояние живет в памяти
+    процесса, поэтому при нескольких воркерах uvicorn эти операции отклоняются
+    (form_teams состояния не хранит и работает всегда).
+    """
+
+    def __init__(
+        self,
+        model_service: Optional[RecommendationService],
+        coverage_weight: float = 0.1,
+        priority_weight: float = 1.0,
+        workers: int = 1
+    ):
+        self.model_service = model_service
+        self.coverage_weight = coverage_weight
+        self.priority_weight = priority_weight
+        self.workers = workers
+        self.distribution: Optional[Distribution] = None
+        self.projects: Dict[int, Project] = {}
+        self._lock = asyncio.Lock()
+
+    def utilities(self, teams: List[Team], projects: List[Project]) -> np.ndarray:
+        """Матрица полезностей команды x проекты"""
+        result = np.zeros((len(teams), len(projects)))
+        if not teams or not projects:
+            return result
+
+        role_index = build_term_index(p.required_roles for p in projects)
+        terms = coverage_terms(multi_hot([p.required_roles for p in projects], role_index))
+        members, member_team_idx = [], []
+        for row, team in enumerate(teams):
+            for student in team.student:
+                if student.stack and student.desired_role:
+                    members.append(student)
+                    member_team_idx.append(row)
+
+        if members:
+            if self.model_service is not None:
+                member_embeddings = self.model_service.embed_students(members).cpu().numpy()
+                project_embeddings = normalize_rows(self.model_service.embed_projects(projects).cpu().numpy())
+            else:
+                member_embeddings = np.zeros((len(members), 1), dtype=np.float32)
+                project_embeddings = np.zeros((len(projects), 1), dtype=np.float32)
+            team_embeddings, team_roles = aggregate_teams(
+                member_embeddings,
+                multi_hot([s.desired_role for s in members], role_index),
+                np.array(member_team_idx),
+                len(teams))
+            result += team_embeddings @ project_embeddings.T + self.coverage_weight * (team_roles @ terms.T)
+
+        result += self.priority_weight * priority_scores(teams, [p.id for p in projects])
+        return result
+
+    def _require_single_worker(self) -> None:
+        if self.workers > 1:
+            raise RuntimeError(
+                f"Distribution state is kept in worker memory and needs a single worker, the server runs {self.workers}.")
+
+    def _require_distribution(self) -> Distribution:
+        self._require_single_worker()
+        if self.distribution is None:
+            raise RuntimeError("Distribution has not been solved yet.")
+        return self.distribution
+
+    def _project_list(self) -> List[Project]:
+        return [self.projects[project_id] for project_id in self._require_distribution().project_ids]
+
+    def _summary(self, started: float, changes: Optional[Dict] = None) -> Dict:
+        summary = {"objective": round(self.distribution.objective(), 4), "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)}
+        if changes is not None:
+            summary["changes"] = {team_id: {"before": before, "after": after} for team_id, (before, after) in changes.items()}
+        return summary
+
+    async def solve(self, team_repo: TeamRepository, project_repo: ProjectRepository) -> Dict:
+        """Полное решение по всем командам и активным проектам с заполненным профилем"""
+        async with self._lock:
+            return await self._solve(team_repo, project_repo)
+
+    async def _solve(self, team_repo: TeamRepository, project_repo: ProjectRepository) -> Dict:
+        self._require_single_worker()
+        started = time.perf_counter()
+        teams = await team_repo.get_teams_with_students()
+        projects = [p for p in await project_repo.get_active_projects() if p.stack and p.required_roles and p.description]
+        utilities = await asyncio.to_thread(self.utilities, teams, projects)
+
+        self.projects = {p.id: p for p in projects}
+        self.distribution = await asyncio.to_thread(
+            Distribution, [t.id for t in teams], [p.id for p in projects], [max(p.teams_amount or 0, 0) for p in projects], utilities)
+        summary = self._summary(started)
+        summary["assignments"] = self.distribution.assignment()
+        return summary
+
+    def assignment(self) -> Dict[int, Optional[int]]:
+        return self._require_distribution().assignment()
+
+    async def refresh_team(self, team_id: int, team_repo: TeamRepository) -> Dict:
+        """Перечитывает команду (состав, профили, приоритеты) и пересчитывает распределение инкрементально"""
+        async with self._lock:
+            return await self._refresh_team(team_id, team_repo)
+
+    async def _refresh_team(self, team_id: int, team_repo: TeamRepository) -> Dict:
+        distribution = self._require_distribution()
+        started = time.perf_counter()
+        before = distribution.assignment()
+        team = await team_repo.get_team_with_students(team_id)
+        if team is None:
+            distribution.remove_team(team_id)
+        else:
+            utilities = await asyncio.to_thread(self.utilities, [team], self._project_list())
+            distribution.update_team(team_id, utilities[0])
+        return self._summary(started, self._diff(before, distribution.assignment()))
+
+    async def refresh_project(self, project_id: int, project_repo: ProjectRepository, team_repo: TeamRepository) -> Dict:
+        """Перечитывает проект (активность, teams_amount, профиль) и пересчитывает распределение инкрементально"""
+        async with self._lock:
+            return await self._refresh_project(project_id, project_repo, team_repo)
+
+    async def _refresh_project(self, project_id: int, project_repo: ProjectRepository, team_repo: TeamRepository) -> Dict:
+        distribution = self._require_distribution()
+        started = time.perf_counter()
+        before = distribution.assignment()
+        project = await project_repo.get(project_id)
+        if project is None and project_id not in distribution.project_index:
+            raise ValueError(f"Project {project_id} not found")
+
+        complete = project is not None and project.is_active and project.stack and project.required_roles and project.description
+        if not complete:
+            if project_id in distribution.project_index:
+                distribution.update_project(project_id, 0)
+            return self._summary(started, self._diff(before, distribution.assignment()))
+
+        teams = await team_repo.get_teams_with_students()
+        teams_by_id = {t.id: t for t in teams}
+        ordered = [teams_by_id[team_id] for team_id in distribution.team_ids if team_id in teams_by_id]
+        column = await asyncio.to_thread(self.utilities, ordered, [project]) if ordered else None
+        # Размер вектора — после последнего await, по текущему списку команд
+        utilities = np.zeros(len(distribution.team_ids))
+        if column is not None:
+            utilities[[distribution.team_index[t.id] for t in ordered]] = column[:, 0]
+        self.projects[project_id] = project
+        distribution.update_project(project_id, max(project.teams_amount or 0, 0), utilities)
+        return self._summary(started, self._diff(before, distribution.assignment()))
+
+    async def what_if(self, capacities: Optional[Dict[int, int]] = None, removed_teams: Iterable[int] = ()) -> Dict:
+        """Сценарий без изменения текущего распределения: другие вместимости проектов и/или без части команд"""
+        async with self._lock:
+            return self._what_if(capacities, removed_teams)
+
+    def _what_if(self, capacities: Optional[Dict[int, int]], removed_teams: Iterable[int]) -> Dict:
+        distribution = self._require_distribution()
+        unknown = [project_id for project_id in (capacities or {}) if project_id not in distribution.project_index]
+        if unknown:
+            raise ValueError(f"Projects {unknown} are not part of the distribution")
+
+        started = time.perf_counter()
+        scenario, changes = distribution.what_if(capacities=capacities, removed_teams=removed_teams)
+        return {
+            "objective": round(scenario.objective(), 4),
+            "objective_delta": round(scenario.objective() - distribution.objective(), 4),
+            "changes": {team_id: {"before": before, "after": after} for team_id, (before, after) in changes.items()},
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+
+    def student_affinity(self, students: List[Student], projects: List[Project]) -> np.ndarray:
+        """Косинусное сходство студентов и проектов по модели; у студентов без профиля — нули"""
+        result = np.zeros((len(students), len(projects)))
+        rows = [i for i, s in enumerate(students) if s.stack and s.desired_role]
+        if self.model_service is not None and rows and projects:
+            student_embeddings = normalize_rows(self.model_service.embed_students([students[i] for i in rows]).cpu().numpy())
+            project_embeddings = normalize_rows(self.model_service.embed_projects(projects).cpu().numpy())
+            result[rows] = student_embeddings @ project_embeddings.T
+        return result
+
+    def _form_teams(self, students: List[Student], projects: List[Project], team_size: int, time_limit: float) -> Dict:
+        started = time.perf_counter()
+        role_index = build_term_index(p.required_roles for p in projects)
+        stack_index = build_term_index(p.stack for p in projects)
+        formation = TeamFormation(
+            multi_hot([s.desired_role for s in students], role_index),
+            multi_hot([s.stack for s in students], stack_index),
+            multi_hot([p.required_roles for p in projects], role_index),
+            multi_hot([p.stack for p in projects], stack_index),
+            self.student_affinity(students, projects),
+            np.array([max(p.teams_amount or 0, 0) for p in projects]),
+            team_size)
+        prepared = time.perf_counter()
+        formation.build()
+        greedy_objective = formation.objective()
+        built = time.perf_counter()
+        formation.improve(time_limit=max(time_limit - (built - started), 0.0))
+        finished = time.perf_counter()
+
+        teams = []
+        for team in formation.teams():
+            teams.append({
+                "student_ids": [students[i].id for i in team["students"]],
+                "project_id": projects[team["project"]].id,
+                "value": round(team["value"], 4),
+                "role_coverage": round(team["role_coverage"], 4),
+                "stack_coverage": round(team["stack_coverage"], 4),
+                "mean_score": round(team["mean_score"], 4),
+            })
+        return {
+            "teams": teams,
+            "objective": round(formation.objective(), 4),
+            "greedy_objective": round(greedy_objective, 4),
+            "swaps": formation.swaps,
+            "retargets": formation.retargets,
+            "passes": formation.passes,
+            "elapsed_ms": {
+                "prepare": round((prepared - started) * 1000, 3),
+                "greedy": round((built - prepared) * 1000, 3),
+                "local_search": round((finished - built) * 1000, 3),
+                "total": round((finished - started) * 1000, 3),
+            },
+        }
+
+    async def form_teams(
+        self,
+        student_repo: StudentRepository,
+        project_repo: ProjectRepository,
+        team_size: int,
+        time_limit: float = 5.0
+    ) -> Dict:
+        """Предлагает команды из студентов без команды (в базу ничего не пишется)"""
+        students = await student_repo.get_students_without_team()
+        projects = [p for p in await project_repo.get_active_projects() if p.stack and p.required_roles and p.description]
+        if not projects:
+            raise ValueError("No active projects with a complete profile.")
+        return await asyncio.to_thread(self._form_teams, students, projects, team_size, time_limit)
+
+    @staticmethod
+    def _diff(before: Dict[int, Optional[int]], after: Dict[int, Optional[int]]) -> Dict:
+        return {
+            team_id: (before.get(team_id), after.get(team_id))
+            for team_id in before.keys() | after.keys()
+            if before.get(team_id) != after.get(team_id)
+        }
@@ -0,0 +1,71 @@
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict
+
+# Слот уже занят текущей задачей (через try_slot): вложенный slot() не ждет второй
+_slot_held: ContextVar[bool] = ContextVar("inference_slot_held", default=False)
+
+
+class InferenceLimiter:
+    """Ограничивает число одновременных вызовов модели и длину очереди к ней.
+
+    Если все слоты заняты и в очереди уже max_queue запросов, saturated()
+    возвращает True, и движок отвечает в деградированном режиме вместо ожидания.
+    Фоновая работа берет слот через try_slot: только свободный и без очереди, не
+    становясь в очередь перед живыми запросами.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.shed = 0
+
+    def saturated(self) -> bool:
+        return self._semaphore.locked() and self.waiting >= self.max_queue
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        if _slot_held.get():
+            yield
+            return
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        async with self._hold():
+            yield
+
+    @asynccontextmanager
+    async def try_slot(self) -> AsyncIterator[bool]:
+        """Слот без ожидания: True, если свободный слот был и его никто не ждал; иначе False без захвата"""
+        if self._semaphore.locked() or self.waiting:
+            yield False
+            return
+        await self._semaphore.acquire()
+        async with self._hold():
+            yield True
+
+    @asynccontextmanager
+    async def _hold(self) -> AsyncIterator[None]:
+        self.in_flight += 1
+        token = _slot_held.set(True)
+        try:
+            yield
+        finally:
+            _slot_held.reset(token)
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "shed": self.shed,
+        }
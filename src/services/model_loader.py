@@ -1,15 +1,121 @@
 # services/model_loader.py
 import torch
 import json
+import hashlib
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .recommendation_model import TwoTowerModel
 
+MODEL_FILES = ("recsys_model.pth", "stack_vocab.json", "roles_vocab.json")
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+
+def file_checksum(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def write_manifest(version_dir: Path, version: Optional[str] = None) -> Dict[str, Any]:
+    """Создает manifest.json с версией, размерностями и sha256 файлов модели"""
+    with open(version_dir / "stack_vocab.json", 'r') as f:
+        stack_size = len(json.load(f))
+    with open(version_dir / "roles_vocab.json", 'r') as f:
+        roles_size = len(json.load(f))
+
+    manifest = {
+        "version": version or version_dir.name,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "student_dim": stack_size + roles_size,
+        "project_dim": stack_size + roles_size + 384,
+        "files": {name: file_checksum(version_dir / name) for name in MODEL_FILES},
+    }
+    with open(version_dir / MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def current_version(model_dir: Path) -> Optional[str]:
+    """Активная версия из файла CURRENT в каталоге моделей"""
+    current_path = Path(model_dir) / CURRENT_FILE
+    if not current_path.exists():
+        return None
+    return current_path.read_text().strip() or None
+
+def check_version(model_dir: Path, version: str) -> None:
+    """ValueError для недопустимого имени версии, FileNotFoundError, если версия не опубликована"""
+    if not version or Path(version).name != version or version.startswith("."):
+        raise ValueError(f"Invalid model version name: {version!r}")
+    if not (Path(model_dir) / version / MANIFEST_FILE).exists():
+        raise FileNotFoundError(f"Model version {version} not found in {model_dir}")
+
+def set_current_version(model_dir: Path, version: str) -> None:
+    """Атомарно переключает CURRENT на version (запись во временный файл и rename)"""
+    model_dir = Path(model_dir)
+    check_version(model_dir, version)
+    tmp_path = model_dir / f".{CURRENT_FILE}.tmp"
+    tmp_path.write_text(version + "\n")
+    tmp_path.replace(model_dir / CURRENT_FILE)
+
+def load_tuning(path: Optional[str]) -> Dict[str, Any]:
+    """Настройки инференса, подобранные autotune.py; пустой словарь, если файла нет"""
+    if not path or not Path(path).exists():
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Failed to read inference tuning from {path}, using defaults: {e}")
+        return {}
+
+def save_tuning(path: str, tuning: Dict[str, Any]) -> None:
+    tmp_path = Path(f"{path}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(tuning, f, indent=2)
+    tmp_path.replace(path)
+
+def apply_torch_tuning(tuning: Dict[str, Any]) -> None:
+    """Число потоков torch из настроек autotune; interop-потоки задаются только до первой параллельной операции"""
+    if tuning.get("torch_num_threads"):
+        torch.set_num_threads(int(tuning["torch_num_threads"]))
+    if tuning.get("torch_interop_threads") and torch.get_num_interop_threads() != int(tuning["torch_interop_threads"]):
+        try:
+            torch.set_num_interop_threads(int(tuning["torch_interop_threads"]))
+        except RuntimeError as e:
+            print(f"Interop threads are already fixed at {torch.get_num_interop_threads()}: {e}")
+
 class ModelLoader:
-    def __init__(self, model_dir: str):
-        self.model_dir = Path(model_dir)
+    """Загружает версию модели из MODEL_DIR/<версия>/ с проверкой контрольных сумм по manifest.json.
+
+    Без явной версии берется версия из MODEL_DIR/CURRENT; каталог с файлами модели
+    без подкаталогов версий читается как раньше, без проверки. Если передан
+    tuning_path, до загрузки применяются подобранные autotune.py потоки torch.
+    """
+
+    def __init__(self, model_dir: str, version: Optional[str] = None, tuning_path: Optional[str] = None):
+        self.base_dir = Path(model_dir)
+        self.version = version or current_version(self.base_dir)
+        self.model_dir = self.base_dir / self.version if self.version else self.base_dir
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        
+        self.tuning = load_tuning(tuning_path)
+        if self.device.type == "cpu":
+            apply_torch_tuning(self.tuning)
+
+    def _verify_manifest(self) -> Optional[Dict[str, Any]]:
+        manifest_path = self.model_dir / MANIFEST_FILE
+        if not manifest_path.exists():
+            if self.version:
+                raise FileNotFoundError(f"Manifest not found for model version {self.version}")
+            return None
+
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        for name, checksum in manifest["files"].items():
+            if file_checksum(self.model_dir / name) != checksum:
+                raise ValueError(f"Checksum mismatch for {name} in model version {manifest['version']}")
+        return manifest
+
     def load_model(self) -> Dict[str, Any]:
         """Загружает модель и словари"""
         model_path = self.model_dir / "recsys_model.pth"
@@ -22,7 +128,9 @@ class ModelLoader:
 
         if not all([model_path.exists(), stack_vocab_path.exists(), roles_vocab_path.exists()]):
             raise FileNotFoundError("Не все файлы модели найдены")
-        
+
+        manifest = self._verify_manifest()
+
         with open(stack_vocab_path, 'r') as f:
             stack_vocab = json.load(f)
             
@@ -41,5 +149,8 @@ class ModelLoader:
             "model": model,
             "stack_vocab": stack_vocab,
             "roles_vocab": roles_vocab,
-            "device": self.device
-        }
\ No newline at end of file
+            "device": self.device,
+            "version": manifest["version"] if manifest else "unversioned",
+            "manifest": manifest,
+            "tuning": self.tuning
+        }
@@ -0,0 +1,207 @@
+import asyncio
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+from config import settings
+from db import Repositories
+from .collaborative import CoOccurrenceModel
+from .load_shedding import InferenceLimiter
+from .model_loader import current_version, set_current_version
+from .recommendation_engine import RecommendationEngine
+from .recommendation_service import RecommendationService
+from .result_cache import ResultCache
+from .skill_index import SkillIndex
+from .student_matrix import StudentMatrix
+
+
+class ModelManager:
+    """Загрузка и горячая замена версии модели без перезапуска воркера.
+
+    Новая версия загружается и прогревается в фоне (эмбеддинги активных проектов,
+    индекс навыков, матрица студентов), пока запросы обслуживает старый движок;
+    затем app.state.recommendation_engine заменяется одним присваиванием.
+    SentenceTransformer переиспользуется, из кэша ответов удаляются только ключи
+    старой версии.
+    """
+
+    def __init__(
+        self,
+        state: Any,
+        model_dir: str,
+        session_factory: Callable,
+        inference_limiter: Optional[InferenceLimiter] = None,
+        collaborative: Optional[CoOccurrenceModel] = None,
+        result_cache: Optional[ResultCache] = None,
+        tuning_path: Optional[str] = None
+    ):
+        self.state = state
+        self.model_dir = Path(model_dir)
+        self.tuning_path = tuning_path
+        self.session_factory = session_factory
+        self.inference_limiter = inference_limiter
+        self.collaborative = collaborative
+        self.result_cache = result_cache
+        self.status = "idle"
+        self.error: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        self.failed_version: Optional[str] = None
+        self._lock = asyncio.Lock()
+        self._reload_task: Optional[asyncio.Task] = None
+        self._student_refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def engine(self) -> Optional[RecommendationEngine]:
+        return getattr(self.state, "recommendation_engine", None)
+
+    @property
+    def version(self) -> str:
+        return self.engine.model_version if self.engine is not None else "none"
+
+    @property
+    def reloading(self) -> bool:
+        return self._lock.locked() or (self._reload_task is not None and not self._reload_task.done())
+
+    def _build_service(self, version: Optional[str], text_model: Any) -> RecommendationService:
+        return RecommendationService(
+            model_dir=str(self.model_dir),
+            student_cache_size=settings.STUDENT_EMBEDDING_CACHE_SIZE,
+            project_cache_size=settings.PROJECT_EMBEDDING_CACHE_SIZE,
+            version=version,
+            text_model=text_model,
+            tuning_path=self.tuning_path
+        )
+
+    async def _build_engine(self, model_service: Optional[RecommendationService]) -> RecommendationEngine:
+        """Движок для model_service с прогретыми индексом навыков, эмбеддингами проектов и матрицей студентов"""
+        if model_service is None:
+            skill_index = SkillIndex({}, {})
+        else:
+            skill_index = SkillIndex(model_service.stack_vocab, model_service.roles_vocab)
+        student_matrix = StudentMatrix(settings.EMBEDDING_STORAGE_DTYPE) if model_service is not None else None
+
+        if model_service is not None:
+            repos = Repositories(session_factory=self.session_factory)
+            try:
+                projects = await repos.project_repo.get_active_projects()
+                skill_index.sync(projects)
+                complete = [p for p in projects if p.stack and p.required_roles and p.description]
+                if complete:
+                    await asyncio.to_thread(model_service.embed_projects, complete)
+                await student_matrix.refresh(repos.student_repo, model_service)
+                print(f"Model {model_service.version} warmed: {len(complete)} projects, {len(student_matrix)} students.")
+            except Exception as e:
+                print(f"Failed to warm model {model_service.version}, caches will be filled on first requests: {e}")
+            finally:
+                await repos.close()
+
+        return RecommendationEngine(
+            model_service=model_service,
+            skill_index=skill_index,
+            shortlist_size=settings.SHORTLIST_SIZE,
+            inference_limiter=self.inference_limiter,
+            collaborative=self.collaborative,
+            collaborative_weight=settings.COLLABORATIVE_WEIGHT,
+            student_matrix=student_matrix,
+            project_snapshot_max_age=settings.PROJECT_SNAPSHOT_MAX_AGE,
+            anytime_chunk_size=settings.ANYTIME_CHUNK_SIZE
+        )
+
+    async def _swap(self, engine: RecommendationEngine) -> None:
+        old_version = self.version if self.engine is not None else None
+        self.state.recommendation_engine = engine
+        distribution_service = getattr(self.state, "distribution_service", None)
+        if distribution_service is not None:
+            distribution_service.model_service = engine.model_service
+        self.loaded_at = time.time()
+
+        if self._student_refresh_task is not None:
+            self._student_refresh_task.cancel()
+            self._student_refresh_task = None
+        if engine.student_matrix is not None:
+            self._student_refresh_task = asyncio.create_task(engine.student_matrix.refresh_periodically(
+                self.session_factory, engine.model_service, settings.STUDENT_MATRIX_REFRESH_INTERVAL))
+
+        if self.result_cache is not None and old_version is not None and old_version != engine.model_version:
+            removed = await self.result_cache.invalidate_prefix(f"student:{old_version}:")
+            print(f"Removed {removed} cached responses of model {old_version}.")
+
+    async def start(self) -> None:
+        """Первая загрузка при старте воркера: без модели движок работает в деградированном режиме"""
+        try:
+            model_service = await asyncio.to_thread(self._build_service, None, None)
+            print(f"Recommendation model {model_service.version} initialized.")
+        except Exception as e:
+            model_service = None
+            print(f"Failed to load recommendation model, serving degraded recommendations: {e}")
+        await self._swap(await self._build_engine(model_service))
+
+    async def reload(self, version: Optional[str] = None, activate: bool = False) -> str:
+        """Загружает версию (по умолчанию из CURRENT), прогревает и подменяет движок; при ошибке остается старая версия.
+
+        С activate CURRENT переключается только после успешной замены, чтобы
+        остальные воркеры не подхватили версию, которая не загружается.
+        """
+        if self._lock.locked():
+            raise RuntimeError("Model reload is already in progress.")
+        async with self._lock:
+            old = self.engine
+            text_model = old.model_service.text_model if old is not None and old.model_service is not None else None
+            self.status, self.error = "loading", None
+            try:
+                model_service = await asyncio.to_thread(self._build_service, version, text_model)
+                self.status = "warming"
+                engine = await self._build_engine(model_service)
+            except Exception as e:
+                self.status, self.error = "failed", str(e)
+                self.failed_version = version or current_version(self.model_dir)
+                raise
+
+            await self._swap(engine)
+            if activate:
+                try:
+                    set_current_version(self.model_dir, engine.model_version)
+                except Exception as e:
+                    if old is not None:
+                        await self._swap(old)
+                    self.status, self.error = "failed", f"Failed to switch CURRENT: {e}"
+                    raise
+            self.status, self.failed_version = "idle", None
+            print(f"Switched recommendation model from {old.model_version if old else 'none'} to {engine.model_version}.")
+            return engine.model_version
+
+    def start_reload(self, version: Optional[str] = None, activate: bool = False) -> None:
+        """Запускает reload в фоне; RuntimeError, если перезагрузка уже идет"""
+        if self.reloading:
+            raise RuntimeError("Model reload is already in progress.")
+        self._reload_task = asyncio.create_task(self._reload_logged(version, activate))
+
+    async def _reload_logged(self, version: Optional[str], activate: bool = False) -> None:
+        try:
+            await self.reload(version, activate)
+        except Exception as e:
+            print(f"Model reload failed, keeping version {self.version}: {e}")
+
+    async def watch(self, interval: float) -> None:
+        """Следит за CURRENT: другие воркеры переключаются, когда версию сменили через админку или publish_model"""
+        while True:
+            await asyncio.sleep(interval)
+            version = current_version(self.model_dir)
+            if version is None or version == self.version or version == self.failed_version or self.reloading:
+                continue
+            await self._reload_logged(version)
+
+    def stats(self) -> Dict[str, Any]:
+        engine = self.engine
+        return {
+            "version": self.version,
+            "current": current_version(self.model_dir),
+            "status": self.status,
+            "error": self.error,
+            "loaded_at": self.loaded_at,
+            "manifest": engine.model_service.manifest if engine is not None and engine.model_service is not None else None,
+        }
+
+    def close(self) -> None:
+        for task in (self._reload_task, self._student_refresh_task):
+            if task is not None:
+                task.cancel()
@@ -1,12 +1,181 @@
-from typing import Dict, List, Union # Or just List, Dict if Python 3.9+
-from .recommendation_service import RecommendationService, parse_string
+import asyncio
+import time
+import numpy as np
+from typing import Dict, List, Optional, Tuple, Union # Or just List, Dict if Python 3.9+
+from .recommendation_service import RecommendationService, parse_string, student_profile_key
+from .skill_index import SkillIndex
+from .load_shedding import InferenceLimiter
+from .collaborative import CoOccurrenceModel
+from .student_matrix import StudentMatrix
+from .batch_scoring import aggregate_teams, build_term_index, mmr, multi_hot, normalize_rows, rank_teams
 from db.project_repository import ProjectRepository
 from db.student_repository import StudentRepository
-from db.models import Student, Project # For type hinting
+from db.recommendation_repository import RecommendationRepository
+from db.team_repository import TeamRepository
+from db.models import Student, Project, Team # For type hinting
 
 class RecommendationEngine:
-    def __init__(self, model_service: RecommendationService):
+    def __init__(
+        self,
+        model_service: Optional[RecommendationService],
+        skill_index: Optional[SkillIndex] = None,
+        shortlist_size: int = 0,
+        inference_limiter: Optional[InferenceLimiter] = None,
+        collaborative: Optional[CoOccurrenceModel] = None,
+        collaborative_weight: float = 0.0,
+        student_matrix: Optional[StudentMatrix] = None,
+        project_snapshot_max_age: float = 0.0,
+        anytime_chunk_size: int = 256
+    ):
         self.model_service = model_service
+        self.skill_index = skill_index
+        self.shortlist_size = shortlist_size
+        self.inference_limiter = inference_limiter
+        self.collaborative = collaborative
+        self.collaborative_weight = collaborative_weight
+        self.student_matrix = student_matrix
+        self.project_snapshot_max_age = project_snapshot_max_age
+        self.anytime_chunk_size = anytime_chunk_size
+        self.deadline_misses = 0
+        self.model_failures = 0
+        # Нормированные эмбеддинги проектов для MMR: id -> (объект проекта, вектор).
+        # Объекты снимка индекса живут между запросами, измененный проект приходит новым объектом
+        self._project_vectors: Dict[int, Tuple[Project, np.ndarray]] = {}
+
+    @property
+    def model_version(self) -> str:
+        return self.model_service.version if self.model_service is not None else "none"
+
+    async def active_projects(self, project_repo: ProjectRepository) -> List[Project]:
+        """Активные проекты из снимка индекса навыков, если он моложе project_snapshot_max_age, иначе из базы"""
+        if self.skill_index is not None:
+            snapshot = self.skill_index.fresh_snapshot(self.project_snapshot_max_age)
+            if snapshot is not None:
+                return snapshot
+
+        projects = await project_repo.get_active_projects()
+        if self.skill_index is not None:
+            self.skill_index.sync(projects)
+        return projects
+
+    async def _fetch_student_and_projects(
+        self,
+        student_id: int,
+        student_repo: StudentRepository,
+        project_repo: ProjectRepository
+    ) -> Tuple[Optional[Student], List[Project]]:
+        """Студент и активные проекты; запросы идут параллельно, если у репозиториев разные сессии"""
+        student_session = getattr(student_repo, "session", None)
+        if student_session is not None and student_session is getattr(project_repo, "session", None):
+            # Одна AsyncSession не выполняет запросы параллельно
+            student = await student_repo.get_student_by_id(student_id=student_id)
+            return student, await self.active_projects(project_repo)
+
+        student, projects = await asyncio.gather(
+            student_repo.get_student_by_id(student_id=student_id),
+            self.active_projects(project_repo))
+        return student, projects
+
+    def _shortlist_projects(self, student: Student, projects: List[Project]) -> List[Project]:
+        """Первый этап: оставляет shortlist_size проектов с наибольшим пересечением стека и ролей.
+
+        Если индекс выключен, проектов и так не больше shortlist_size или ни один
+        проект не пересекается со студентом, модель оценивает все проекты.
+        """
+        if self.skill_index is None or self.shortlist_size <= 0 or len(projects) <= self.shortlist_size:
+            return projects
+
+        shortlisted_ids = self.skill_index.shortlist(student.stack, student.desired_role, self.shortlist_size)
+        if not shortlisted_ids:
+            return projects
+        return [self.skill_index.projects[project_id] for project_id in shortlisted_ids]
+
+    async def _predict_scores(self, student: Student, projects: List[Project]) -> Optional[Dict[int, float]]:
+        """Оценки модели или None, если модель недоступна, упала или очередь к ней переполнена.
+
+        Без индекса навыков деградировать некуда, поэтому ошибки модели пробрасываются.
+        """
+        can_degrade = self.skill_index is not None
+        if self.model_service is None:
+            if can_degrade:
+                return None
+            raise RuntimeError("Model not loaded.")
+
+        if self.inference_limiter is None:
+            return await self.model_service.predict_for_student(student, projects)
+
+        if can_degrade and self.inference_limiter.saturated():
+            self.inference_limiter.shed += 1
+            return None
+
+        try:
+            async with self.inference_limiter.slot():
+                return await self.model_service.predict_for_student(student, projects)
+        except ValueError:
+            raise
+        except Exception as e:
+            if not can_degrade:
+                raise
+            self.model_failures += 1
+            print(f"Model inference failed, serving degraded recommendations: {e}")
+            return None
+
+    def _priority_order(self, student: Student, projects: List[Project]) -> List[Project]:
+        """Проекты по убыванию пересечения стека и ролей со студентом (дешевый этап индекса навыков)"""
+        if self.skill_index is None:
+            return projects
+        counts = self.skill_index.overlap_counts(student.stack, student.desired_role)
+        return sorted(projects, key=lambda p: -counts.get(p.id, 0))
+
+    async def _predict_scores_until(
+        self,
+        student: Student,
+        projects: List[Project],
+        deadline: float
+    ) -> Tuple[Optional[Dict[int, float]], bool]:
+        """Оценки модели пачками по anytime_chunk_size в порядке приоритета до дедлайна (time.monotonic()).
+
+        Возвращает оценки и признак, что оценены все проекты. Первая пачка
+        оценивается всегда, если без модели ранжировать нечем; если время вышло до
+        нее, а индекс навыков есть, возвращается None (ранжирование по совпадениям).
+        """
+        ordered = self._priority_order(student, projects)
+        chunk_size = max(self.anytime_chunk_size, 1)
+        scores: Dict[int, float] = {}
+        for start in range(0, len(ordered), chunk_size):
+            if time.monotonic() >= deadline and (scores or self.skill_index is not None):
+                self.deadline_misses += 1
+                return scores or None, False
+            chunk_scores = await self._predict_scores(student, ordered[start:start + chunk_size])
+            if chunk_scores is None:
+                return scores or None, not scores
+            scores.update(chunk_scores)
+        return scores, True
+
+    def _collaborative_scores(self, student: Student, projects: List[Project]) -> Dict[int, float]:
+        """collaborative_weight * item-item сходство по избранному студента; пусто, если сигнал выключен"""
+        if self.collaborative is None or self.collaborative_weight <= 0:
+            return {}
+        collaborative_scores = self.collaborative.scores(student.id, [p.id for p in projects])
+        return {p.id: self.collaborative_weight * float(c) for p, c in zip(projects, collaborative_scores)}
+
+    def _degraded_recommendations(self, student: Student, top_n: int, bonus_per_match: float) -> List[Dict]:
+        """Ранжирование без модели только по совпадениям стека и ролей"""
+        recommendations = []
+        for project_id, matches in self.skill_index.rank_by_overlap(student.stack, student.desired_role, top_n):
+            project = self.skill_index.projects[project_id]
+            bonus = round(matches * bonus_per_match, 4)
+            recommendations.append({
+                "project_id": project.id,
+                "project_name": project.name,
+                "final_score": bonus,
+                "base_similarity": 0.0,
+                "bonus_score": bonus,
+                "required_stack": project.stack if project.stack else "",
+                "required_roles": project.required_roles if project.required_roles else "",
+                "degraded": True,
+            })
+        return recommendations
 
     async def get_recommendations(
         self,
@@ -14,9 +183,14 @@ class RecommendationEngine:
         student_repo: StudentRepository,
         project_repo: ProjectRepository,
         top_n: int = 5,
-        bonus_per_match: float = 0.05
+        bonus_per_match: float = 0.05,
+        diversity: float = 0.0,
+        deadline: Optional[float] = None
     ) -> List[Dict]:
-        student = await student_repo.get_student_by_id(student_id=student_id)
+        """Рекомендации студенту. С deadline (момент time.monotonic()) проекты оцениваются пачками
+        в порядке приоритета, и по истечении времени ранжируется уже оцененное; такие
+        ответы помечаются complete=False."""
+        student, projects = await self._fetch_student_and_projects(student_id, student_repo, project_repo)
         if not student:
             raise ValueError(f"Student {student_id} not found")
 
@@ -27,11 +201,19 @@ class RecommendationEngine:
         student_stack_list = parse_string(student.stack)
         student_stack_set = set(student_stack_list)
 
-        projects = await project_repo.get_active_projects()
         if not projects:
             return []
 
-        scores = await self.model_service.predict_for_student(student, projects)
+        projects = self._shortlist_projects(student, projects)
+        complete = True
+        if deadline is None:
+            scores = await self._predict_scores(student, projects)
+        else:
+            scores, complete = await self._predict_scores_until(student, projects, deadline)
+        if scores is None:
+            recommendations = self._degraded_recommendations(student, top_n, bonus_per_match)
+            return recommendations if complete else [dict(rec, complete=False) for rec in recommendations]
+        collaborative_scores = self._collaborative_scores(student, projects)
 
         project_score_pairs = []
         for p in projects:
@@ -45,7 +227,7 @@ class RecommendationEngine:
 
         sorted_initial_candidates = sorted(
             project_score_pairs,
-            key=lambda x: x[1],
+            key=lambda x: x[1] + collaborative_scores.get(x[0].id, 0.0),
             reverse=True
         )[:candidate_count]
 
@@ -58,7 +240,8 @@ class RecommendationEngine:
 
             matches = student_stack_set.intersection(project_stack_set)
             bonus = len(matches) * bonus_per_match
-            final_s = base_similarity + bonus
+            collaborative = collaborative_scores.get(project_obj.id, 0.0)
+            final_s = base_similarity + bonus + collaborative
 
             processed_candidates.append({
                 "project_id": project_obj.id,
@@ -66,24 +249,222 @@ class RecommendationEngine:
                 "final_score": final_s,
                 "base_similarity": base_similarity,
                 "bonus_score": bonus,
+                "collaborative_score": collaborative,
                 "required_stack": project_obj.stack if project_obj.stack else "",
                 "required_roles": project_obj.required_roles if project_obj.required_roles else ""
             })
 
-        final_recommendations_sorted = sorted(
-            processed_candidates,
-            key=lambda x: x["final_score"],
-            reverse=True
-        )[:top_n]
+        if diversity > 0 and len(processed_candidates) > 1:
+            final_recommendations_sorted = await asyncio.to_thread(
+                self._diversify, processed_candidates, [p for p, _ in sorted_initial_candidates], top_n, diversity)
+        else:
+            final_recommendations_sorted = sorted(
+                processed_candidates,
+                key=lambda x: x["final_score"],
+                reverse=True
+            )[:top_n]
 
-        return [
+        recommendations = [
             {
                 "project_id": rec["project_id"],
                 "project_name": rec["project_name"],
                 "final_score": round(rec["final_score"], 4),
                 "base_similarity": round(rec["base_similarity"], 4),
                 "bonus_score": round(rec["bonus_score"], 4),
+                "collaborative_score": round(rec["collaborative_score"], 4),
                 "required_stack": rec["required_stack"],
                 "required_roles": rec["required_roles"],
             } for rec in final_recommendations_sorted
-        ]
\ No newline at end of file
+        ]
+        return recommendations if complete else [dict(rec, complete=False) for rec in recommendations]
+
+    def _project_vector_matrix(self, projects: List[Project]) -> np.ndarray:
+        """Нормированные эмбеддинги проектов (m x d); для проектов снимка — без повторного хэширования содержимого"""
+        # Вызывается из пула потоков: словарь не меняется на месте, а заменяется новым одним присваиванием
+        known = self._project_vectors
+        missing = [p for p in projects if known.get(p.id, (None,))[0] is not p]
+        if not missing:
+            return np.stack([known[p.id][1] for p in projects])
+
+        vectors = normalize_rows(self.model_service.embed_projects(missing).cpu().numpy())
+        computed = {project.id: (project, vector) for project, vector in zip(missing, vectors)}
+        overflow = len(known) + len(computed) > self.model_service.project_embeddings.max_size
+        self._project_vectors = computed if overflow else {**known, **computed}
+        return np.stack([(computed.get(p.id) or known[p.id])[1] for p in projects])
+
+    def _diversify(self, candidates: List[Dict], projects: List[Project], top_n: int, diversity: float) -> List[Dict]:
+        """MMR по пулу кандидатов: похожие друг на друга проекты уступают место менее похожим"""
+        embeddings = self._project_vector_matrix(projects)
+        relevance = np.array([c["final_score"] for c in candidates])
+        return [candidates[i] for i in mmr(relevance, embeddings, top_n, diversity)]
+
+    async def get_precomputed_recommendations(
+        self,
+        student_id: int,
+        recommendation_repo: RecommendationRepository,
+        top_n: int = 5
+    ) -> Optional[List[Dict]]:
+        """Возвращает рекомендации, заранее посчитанные precompute_recommendations.py.
+
+        None означает, что нужно считать вживую: готовых рекомендаций нет или их
+        меньше top_n (например, часть проектов с тех пор деактивирована), они
+        посчитаны другой версией модели, до правки профиля студента или проекта,
+        или включен коллаборативный сигнал, которого в предрасчете нет.
+        """
+        if self.collaborative is not None and self.collaborative_weight > 0:
+            return None
+        rows = await recommendation_repo.get_for_student(student_id, top_n)
+        if len(rows) < top_n:
+            return None
+        student = rows[0][2]
+        profile_key = student_profile_key(student.stack, student.desired_role)
+        for rec, project, _ in rows:
+            if rec.model_version != self.model_version or rec.profile_key != profile_key:
+                return None
+            if project.updated_at is not None and project.updated_at > rec.computed_at:
+                return None
+
+        return [
+            {
+                "project_id": project.id,
+                "project_name": project.name,
+                "final_score": round(rec.final_score, 4),
+                "base_similarity": round(rec.base_similarity, 4),
+                "bonus_score": round(rec.bonus_score, 4),
+                "required_stack": project.stack if project.stack else "",
+                "required_roles": project.required_roles if project.required_roles else "",
+            } for rec, project, _ in rows
+        ]
+
+    def _rank_teams(self, teams: List[Team], projects: List[Project], top_n: int, coverage_weight: float) -> Dict[int, List[Dict]]:
+        """Один батч s_tower по всем участникам всех команд и одно матричное ранжирование для всех команд"""
+        members, member_team_idx, ranked_teams = [], [], []
+        for team in teams:
+            team_members = [s for s in team.student if s.stack and s.desired_role]
+            if not team_members:
+                continue
+            members.extend(team_members)
+            member_team_idx.extend([len(ranked_teams)] * len(team_members))
+            ranked_teams.append(team)
+
+        recommendations: Dict[int, List[Dict]] = {team.id: [] for team in teams}
+        if not ranked_teams or not projects:
+            return recommendations
+
+        member_embeddings = self.model_service.embed_students(members).cpu().numpy()
+        project_embeddings = normalize_rows(self.model_service.embed_projects(projects).cpu().numpy())
+        role_index = build_term_index(p.required_roles for p in projects)
+        team_embeddings, team_roles = aggregate_teams(
+            member_embeddings,
+            multi_hot([s.desired_role for s in members], role_index),
+            np.array(member_team_idx),
+            len(ranked_teams))
+
+        result = rank_teams(
+            team_embeddings, project_embeddings, team_roles,
+            multi_hot([p.required_roles for p in projects], role_index),
+            top_n, coverage_weight)
+        ranked = result.ranked
+        for row, team in enumerate(ranked_teams):
+            recommendations[team.id] = [
+                {
+                    "project_id": projects[idx].id,
+                    "project_name": projects[idx].name,
+                    "final_score": round(float(ranked.final_score[row, col]), 4),
+                    "base_similarity": round(float(ranked.base_similarity[row, col]), 4),
+                    "bonus_score": round(float(ranked.bonus_score[row, col]), 4),
+                    "role_coverage": round(float(result.role_coverage[row, col]), 4),
+                    "required_stack": projects[idx].stack,
+                    "required_roles": projects[idx].required_roles,
+                } for col, idx in enumerate(ranked.project_idx[row])
+            ]
+        return recommendations
+
+    async def _team_recommendations(
+        self,
+        teams: List[Team],
+        project_repo: ProjectRepository,
+        top_n: int,
+        coverage_weight: float
+    ) -> Dict[int, List[Dict]]:
+        if self.model_service is None:
+            raise RuntimeError("Model not loaded.")
+
+        projects = [p for p in await self.active_projects(project_repo) if p.stack and p.required_roles and p.description]
+        if self.inference_limiter is None:
+            return await asyncio.to_thread(self._rank_teams, teams, projects, top_n, coverage_weight)
+        async with self.inference_limiter.slot():
+            return await asyncio.to_thread(self._rank_teams, teams, projects, top_n, coverage_weight)
+
+    async def get_team_recommendations(
+        self,
+        team_id: int,
+        team_repo: TeamRepository,
+        project_repo: ProjectRepository,
+        top_n: int = 5,
+        coverage_weight: float = 0.1
+    ) -> List[Dict]:
+        """Рекомендации проектов для команды по усредненному эмбеддингу участников и покрытию ролей проекта"""
+        team = await team_repo.get_team_with_students(team_id)
+        if not team:
+            raise ValueError(f"Team {team_id} not found")
+        if not any(s.stack and s.desired_role for s in team.student):
+            raise ValueError(f"Team {team_id} has no members with stack and role information.")
+
+        recommendations = await self._team_recommendations([team], project_repo, top_n, coverage_weight)
+        return recommendations[team.id]
+
+    async def get_all_team_recommendations(
+        self,
+        team_repo: TeamRepository,
+        project_repo: ProjectRepository,
+        top_n: int = 5,
+        coverage_weight: float = 0.1
+    ) -> Dict[int, List[Dict]]:
+        """Рекомендации для всех команд сразу; команды без заполненных профилей участников получают пустой список"""
+        teams = await team_repo.get_teams_with_students()
+        return await self._team_recommendations(teams, project_repo, top_n, coverage_weight)
+
+    async def get_students_for_project(
+        self,
+        project_id: int,
+        project_repo: ProjectRepository,
+        student_repo: StudentRepository,
+        top_n: int = 5,
+        bonus_per_match: float = 0.05,
+        year: Optional[int] = None,
+        group_id: Optional[str] = None,
+        unassigned_only: bool = False
+    ) -> List[Dict]:
+        """Обратные рекомендации: лучшие студенты для проекта (один проход p_tower и одно умножение матрицы на вектор)"""
+        if self.model_service is None or self.student_matrix is None:
+            raise RuntimeError("Model not loaded.")
+
+        project = await project_repo.get(project_id)
+        if not project:
+            raise ValueError(f"Project {project_id} not found")
+        if not (project.stack and project.required_roles and project.description):
+            raise ValueError(f"Project {project_id} has incomplete stack, roles or description.")
+
+        if len(self.student_matrix) == 0:
+            await self.student_matrix.refresh(student_repo, self.model_service)
+
+        project_embedding = await asyncio.to_thread(self.model_service.embed_projects, [project])
+        candidates = self.student_matrix.top_k(
+            project_embedding[0].cpu().numpy(), project.stack, top_n, bonus_per_match,
+            year=year, group_id=group_id, unassigned_only=unassigned_only)
+
+        return [
+            {
+                "student_id": candidate.student.id,
+                "username": candidate.student.username,
+                "final_score": round(candidate.final_score, 4),
+                "base_similarity": round(candidate.base_similarity, 4),
+                "bonus_score": round(candidate.bonus_score, 4),
+                "stack": candidate.student.stack,
+                "desired_role": candidate.student.desired_role,
+                "year": candidate.student.year,
+                "group_id": candidate.student.group_id,
+                "team_id": candidate.student.team_id,
+            } for candidate in candidates
+        ]
@@ -1,9 +1,12 @@
+import asyncio
+import hashlib
 import numpy as np
 import torch
 import torch.nn.functional as F
-from typing import Dict, List
+from typing import Dict, List, Optional
 from sentence_transformers import SentenceTransformer
 from db.models import Student, Project
+from .embedding_cache import EmbeddingCache
 from .model_loader import ModelLoader
 from .recommendation_model import TwoTowerModel
 
@@ -14,23 +17,50 @@ def parse_string(string: str | List[str]) -> List[str]:
     
     return string.lower().split(', ')
 
+def student_profile_key(stack: Optional[str], desired_role: Optional[str]) -> str:
+    """Хэш профиля студента: одинаковые наборы стека и ролей дают один ключ, правка профиля — новый"""
+    stack_terms = sorted(set(parse_string(stack))) if stack else []
+    role_terms = sorted(set(parse_string(desired_role))) if desired_role else []
+    payload = "\x1f".join(stack_terms) + "\x1e" + "\x1f".join(role_terms)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+def project_profile_key(project: Project) -> str:
+    """Хэш содержимого проекта, от которого зависит его эмбеддинг (стек, роли, описание)"""
+    payload = "\x1e".join([project.stack or "", project.required_roles or "", project.description or ""])
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
 class RecommendationService:
-    def __init__(self, model_dir: str):
-        self.model_loader = ModelLoader(model_dir)
+    def __init__(
+        self,
+        model_dir: str,
+        student_cache_size: int = 10_000,
+        project_cache_size: int = 10_000,
+        version: Optional[str] = None,
+        text_model: Optional[SentenceTransformer] = None,
+        tuning_path: Optional[str] = None
+    ):
+        self.model_loader = ModelLoader(model_dir, version, tuning_path)
         model_data = self.model_loader.load_model()
 
         self.model: TwoTowerModel = model_data["model"]
         self.stack_vocab: Dict[str, int] = model_data["stack_vocab"]
         self.roles_vocab: Dict[str, int] = model_data["roles_vocab"]
         self.device = model_data["device"]
+        self.version: str = model_data["version"]
+        self.manifest: Optional[Dict] = model_data["manifest"]
+        self.text_batch_size: int = int(model_data["tuning"].get("text_batch_size", 64))
 
-        self.text_model = SentenceTransformer(
+        # SentenceTransformer не зависит от версии two-tower модели, при горячей замене он переиспользуется
+        self.text_model = text_model or SentenceTransformer(
             'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2',
             device=str(self.device))
 
+        self.student_embeddings: EmbeddingCache[torch.Tensor] = EmbeddingCache(student_cache_size)
+        self.project_embeddings: EmbeddingCache[torch.Tensor] = EmbeddingCache(project_cache_size)
+
     def _vectorize(self, items: List[str], vocab: Dict[str, int]) -> np.ndarray:
         """Преобразует список элементов в вектор с использованием словаря"""
-        vec = np.zeros(len(vocab))
+        vec = np.zeros(len(vocab), dtype=np.float32)
         for item in items:
             if item in vocab:
                 vec[vocab[item]] = 1
@@ -59,24 +89,101 @@ class RecommendationService:
         text_embedding = text_model.encode(project.description, convert_to_numpy=True)
         return np.concatenate([stack_vec, roles_vec, text_embedding])
 
-    async def predict_for_student(self, student: Student, projects: List[Project]) -> Dict[int, float]:
-        """Предсказывает релевантность проектов для студента"""
+    def embed_students(self, students: List[Student]) -> torch.Tensor:
+        """Возвращает эмбеддинги s_tower для студентов (n x embedding_dim).
+
+        Эмбеддинги кэшируются по хэшу (stack, desired_role): студенты с одинаковым
+        профилем делят один эмбеддинг, а отсутствующие в кэше уникальные профили
+        считаются одним батчем.
+        """
         if not self.model:
             raise RuntimeError("Model not loaded.")
 
-        student_features = self._vectorize_student(student, self.stack_vocab, self.roles_vocab)
-        student_features_tensor = torch.tensor(student_features, dtype=torch.float32).unsqueeze(0).to(self.device)
+        keys = [student_profile_key(student.stack, student.desired_role) for student in students]
+        embeddings = self.student_embeddings.get_many(set(keys))
 
-        scores: Dict[int, float] = {}
-        for project in projects:
-            project_features = self._vectorize_project(project, self.stack_vocab, self.roles_vocab, self.text_model)
-            project_features_tensor = torch.tensor(project_features, dtype=torch.float32).unsqueeze(0).to(self.device)
+        missing: Dict[str, Student] = {}
+        for key, student in zip(keys, students):
+            if key not in embeddings and key not in missing:
+                missing[key] = student
 
+        if missing:
+            features = np.stack([
+                self._vectorize_student(student, self.stack_vocab, self.roles_vocab)
+                for student in missing.values()
+            ])
+            features_tensor = torch.tensor(features, dtype=torch.float32).to(self.device)
             with torch.no_grad():
-                student_embedding = self.model.s_tower(student_features_tensor)
-                project_embedding = self.model.p_tower(project_features_tensor)
-                similarity = F.cosine_similarity(student_embedding, project_embedding, dim=1).item()
+                computed = self.model.s_tower(features_tensor)
+            for key, embedding in zip(missing, computed):
+                embedding = embedding.clone()
+                self.student_embeddings.put(key, embedding)
+                embeddings[key] = embedding
+
+        if not keys:
+            return torch.empty((0, self.model.s_tower[-1].out_features), device=self.device)
+        return torch.stack([embeddings[key] for key in keys])
+
+    def embed_student(self, student: Student) -> torch.Tensor:
+        """Возвращает эмбеддинг s_tower одного студента (1 x embedding_dim)"""
+        return self.embed_students([student])
+
+    def embed_projects(self, projects: List[Project], batch_size: Optional[int] = None) -> torch.Tensor:
+        """Возвращает эмбеддинги p_tower для проектов (m x embedding_dim).
+
+        Эмбеддинги кэшируются по хэшу содержимого проекта; описания отсутствующих
+        в кэше проектов кодируются SentenceTransformer одним батчем.
+        """
+        if not self.model:
+            raise RuntimeError("Model not loaded.")
+
+        keys = [project_profile_key(project) for project in projects]
+        embeddings = self.project_embeddings.get_many(set(keys))
+
+        missing: Dict[str, Project] = {}
+        for key, project in zip(keys, projects):
+            if key not in embeddings and key not in missing:
+                missing[key] = project
+
+        if missing:
+            for project in missing.values():
+                if not project.stack or not project.required_roles or not project.description:
+                    raise ValueError("Project stack, required roles, or description is missing.")
+
+            text_embeddings = self.text_model.encode(
+                [project.description for project in missing.values()],
+                batch_size=batch_size or self.text_batch_size,
+                convert_to_numpy=True)
+            features = np.stack([
+                np.concatenate([
+                    self._vectorize(parse_string(project.stack), self.stack_vocab),
+                    self._vectorize(parse_string(project.required_roles), self.roles_vocab),
+                    text_embedding
+                ])
+                for project, text_embedding in zip(missing.values(), text_embeddings)
+            ])
+            features_tensor = torch.tensor(features, dtype=torch.float32).to(self.device)
+            with torch.no_grad():
+                computed = self.model.p_tower(features_tensor)
+            for key, embedding in zip(missing, computed):
+                embedding = embedding.clone()
+                self.project_embeddings.put(key, embedding)
+                embeddings[key] = embedding
+
+        if not keys:
+            return torch.empty((0, self.model.p_tower[-1].out_features), device=self.device)
+        return torch.stack([embeddings[key] for key in keys])
+
+    async def predict_for_student(self, student: Student, projects: List[Project]) -> Dict[int, float]:
+        """Предсказывает релевантность проектов для студента (в пуле потоков, не блокируя event loop)"""
+        return await asyncio.to_thread(self._predict_for_student, student, projects)
+
+    def _predict_for_student(self, student: Student, projects: List[Project]) -> Dict[int, float]:
+        if not self.model:
+            raise RuntimeError("Model not loaded.")
 
-            scores[project.id] = similarity
+        student_embedding = self.embed_student(student)
+        project_embeddings = self.embed_projects(projects)
+        similarities = F.cosine_similarity(student_embedding, project_embeddings, dim=1).tolist()
 
-        return scores
\ No newline at end of file
+        return {project.id: similarity for project, similarity in zip(projects, similarities)}
\ No newline at end of file
@@ -0,0 +1,271 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+class CacheBackend(ABC):
+    """Хранилище готовых ответов: ключ -> байты. Реализации должны поддерживать multi-get и блокировку ключа.
+
+    blocking = True означает, что вызовы ходят в файл или сеть и ResultCache
+    выполняет их в пуле потоков, а не в event loop.
+    """
+
+    blocking = False
+
+    @abstractmethod
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        ...
+
+    @abstractmethod
+    def set_many(self, items: Dict[str, bytes], ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def try_lock(self, key: str, ttl: float) -> bool:
+        """Захватывает блокировку вычисления ключа; истекшие блокировки упавших воркеров перехватываются"""
+
+    @abstractmethod
+    def unlock(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def is_locked(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str) -> int:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+class InProcessBackend(CacheBackend):
+    """Словарь в памяти процесса: у каждого воркера uvicorn свой кэш"""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._locks: Dict[str, float] = {}
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        now = time.time()
+        found = {}
+        for key in keys:
+            item = self._data.get(key)
+            if item is not None and (item[1] is None or item[1] > now):
+                found[key] = item[0]
+        return found
+
+    def set_many(self, items: Dict[str, bytes], ttl: float) -> None:
+        expires_at = time.time() + ttl if ttl > 0 else None
+        for key, value in items.items():
+            self._data[key] = (value, expires_at)
+
+    def try_lock(self, key: str, ttl: float) -> bool:
+        now = time.time()
+        if self._locks.get(key, 0.0) > now:
+            return False
+        self._locks[key] = now + ttl
+        return True
+
+    def unlock(self, key: str) -> None:
+        self._locks.pop(key, None)
+
+    def is_locked(self, key: str) -> bool:
+        return self._locks.get(key, 0.0) > time.time()
+
+    def delete_prefix(self, prefix: str) -> int:
+        keys = [key for key in self._data if key.startswith(prefix)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._locks.clear()
+
+
+class SQLiteBackend(CacheBackend):
+    """Общий для всех воркеров на хосте кэш в файле SQLite (WAL): один воркер считает, остальные читают"""
+
+    MAX_VARIABLES = 500
+    # Запись ждет чужую транзакцию до timeout соединения, поэтому вызовы уходят в пул потоков
+    blocking = True
+
+    def __init__(self, path: str, purge_every: int = 1000):
+        self.path = path
+        # Истекшие строки сами не удаляются: раз в purge_every записанных ключей их чистит set_many
+        self.purge_every = purge_every
+        self._written = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        # Вызовы идут из пула потоков, а транзакции на одном соединении не должны перемежаться
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Соединение открывается лениво, уже внутри процесса воркера
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        with self._lock:
+            now = time.time()
+            found = {}
+            for start in range(0, len(keys), self.MAX_VARIABLES):
+                chunk = keys[start:start + self.MAX_VARIABLES]
+                rows = self.conn.execute(
+                    f"SELECT key, value FROM cache WHERE key IN ({','.join('?' * len(chunk))}) "
+                    "AND (expires_at IS NULL OR expires_at > ?)",
+                    (*chunk, now))
+                found.update(rows)
+            return found
+
+    def set_many(self, items: Dict[str, bytes], ttl: float) -> None:
+        with self._lock:
+            expires_at = time.time() + ttl if ttl > 0 else None
+            with self.conn:
+                self.conn.execute("BEGIN")
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    [(key, value, expires_at) for key, value in items.items()])
+                self._written += len(items)
+                if self.purge_every > 0 and self._written >= self.purge_every:
+                    self._written = 0
+                    self._purge_expired()
+
+    def _purge_expired(self) -> int:
+        now = time.time()
+        self.conn.execute("DELETE FROM locks WHERE expires_at <= ?", (now,))
+        return self.conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)).rowcount
+
+    def try_lock(self, key: str, ttl: float) -> bool:
+        with self._lock:
+            now = time.time()
+            with self.conn:
+                self.conn.execute("BEGIN IMMEDIATE")
+                self.conn.execute("DELETE FROM locks WHERE key = ? AND expires_at <= ?", (key, now))
+                cursor = self.conn.execute("INSERT OR IGNORE INTO locks (key, expires_at) VALUES (?, ?)", (key, now + ttl))
+                return cursor.rowcount == 1
+
+    def unlock(self, key: str) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM locks WHERE key = ?", (key,))
+
+    def is_locked(self, key: str) -> bool:
+        with self._lock:
+            row = self.conn.execute("SELECT 1 FROM locks WHERE key = ? AND expires_at > ?", (key, time.time())).fetchone()
+            return row is not None
+
+    def delete_prefix(self, prefix: str) -> int:
+        with self._lock:
+            escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            return self.conn.execute("DELETE FROM cache WHERE key LIKE ? ESCAPE '\\'", (escaped + "%",)).rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            with self.conn:
+                self.conn.execute("BEGIN")
+                self.conn.execute("DELETE FROM cache")
+                self.conn.execute("DELETE FROM locks")
+
+
+def create_backend(kind: str, path: str, purge_every: int = 1000) -> CacheBackend:
+    if kind == "memory":
+        return InProcessBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(path, purge_every)
+    raise ValueError(f"Unknown result cache backend: {kind}")
+
+
+class ResultCache:
+    """Кэш готовых ответов поверх CacheBackend с защитой от stampede.
+
+    Отсутствующий ключ вычисляет только тот, кто захватил его блокировку; остальные
+    ждут появления значения не дольше lock_timeout, после чего считают сами.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float = 0.0, lock_timeout: float = 5.0, poll_interval: float = 0.01):
+        self.backend = backend
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self._local_locks: Set[str] = set()
+
+    async def _call(self, method: Callable, *args: Any) -> Any:
+        if self.backend.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return (await self.get_many([key])).get(key)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        keys = list(keys)
+        found = await self._call(self.backend.get_many, keys)
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def set(self, key: str, value: bytes) -> None:
+        await self._call(self.backend.set_many, {key: value}, self.ttl)
+
+    async def set_many(self, items: Dict[str, bytes]) -> None:
+        if items:
+            await self._call(self.backend.set_many, items, self.ttl)
+
+    async def invalidate_prefix(self, prefix: str) -> int:
+        """Удаляет все записи с ключами, начинающимися с prefix; возвращает их число"""
+        return await self._call(self.backend.delete_prefix, prefix)
+
+    async def _wait_for(self, key: str) -> Optional[bytes]:
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            value = (await self._call(self.backend.get_many, [key])).get(key)
+            if value is not None:
+                return value
+            if key not in self._local_locks and not await self._call(self.backend.is_locked, key):
+                # Между двумя чтениями владелец мог записать значение и снять блокировку
+                return (await self._call(self.backend.get_many, [key])).get(key)
+        return None
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Tuple[bytes, bool]]], lookup: bool = True) -> bytes:
+        """Значение из кэша или результат compute() -> (байты, можно ли кэшировать);
+        lookup=False, если вызывающий уже не нашел ключ через get_many"""
+        if lookup:
+            value = await self.get(key)
+            if value is not None:
+                return value
+
+        if key in self._local_locks or not await self._call(self.backend.try_lock, key, self.lock_timeout):
+            self.waits += 1
+            value = await self._wait_for(key)
+            if value is not None:
+                return value
+            return (await compute())[0]
+
+        self._local_locks.add(key)
+        try:
+            value, cacheable = await compute()
+            if cacheable:
+                await self.set(key, value)
+            return value
+        finally:
+            self._local_locks.discard(key)
+            await self._call(self.backend.unlock, key)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "waits": self.waits}
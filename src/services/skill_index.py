@@ -0,0 +1,198 @@
+import heapq
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from scipy import sparse
+from db.models import Project
+from .recommendation_service import parse_string
+
+
+class SkillIndex:
+    """Инвертированный индекс: id термина стека/роли -> id активных проектов.
+
+    Id терминов берутся из stack_vocab/roles_vocab модели; термины вне словаря
+    получают новые id, чтобы совпадения по ним тоже учитывались. Индекс служит
+    дешевым первым этапом отбора кандидатов перед two-tower моделью.
+    """
+
+    def __init__(self, stack_vocab: Dict[str, int], roles_vocab: Dict[str, int]):
+        self.stack_ids: Dict[str, int] = dict(stack_vocab)
+        self.role_ids: Dict[str, int] = dict(roles_vocab)
+        self.stack_postings: Dict[int, Set[int]] = {}
+        self.role_postings: Dict[int, Set[int]] = {}
+        self.projects: Dict[int, Project] = {}
+        self.snapshot: List[Project] = []
+        self.synced_at: Optional[float] = None
+        self.live = False
+        self._project_terms: Dict[int, Tuple[Tuple[int, ...], Tuple[int, ...]]] = {}
+        self._project_sources: Dict[int, Tuple[Optional[str], Optional[str]]] = {}
+        self.version = 0
+        self._matrix: Optional[sparse.csr_matrix] = None
+        self._matrix_project_ids = np.empty(0, dtype=np.int64)
+        self._matrix_stack_size = 0
+        self._matrix_version = -1
+
+    def __len__(self) -> int:
+        return len(self.projects)
+
+    @staticmethod
+    def _term_ids(value: Optional[str], ids: Dict[str, int], create: bool) -> Tuple[int, ...]:
+        if not value:
+            return ()
+        result = []
+        for term in set(parse_string(value)):
+            term_id = ids.get(term)
+            if term_id is None and create:
+                term_id = ids[term] = len(ids)
+            if term_id is not None:
+                result.append(term_id)
+        return tuple(sorted(result))
+
+    def upsert(self, project: Project) -> None:
+        """Добавляет или обновляет проект; неактивные проекты удаляются из индекса"""
+        if project.is_active is False:
+            self.remove(project.id)
+            return
+
+        self.projects[project.id] = project
+        source = (project.stack, project.required_roles)
+        if self._project_sources.get(project.id) == source:
+            return
+
+        terms = (
+            self._term_ids(project.stack, self.stack_ids, create=True),
+            self._term_ids(project.required_roles, self.role_ids, create=True),
+        )
+        self.remove(project.id)
+        self.projects[project.id] = project
+        self._project_sources[project.id] = source
+        self._project_terms[project.id] = terms
+        stack_terms, role_terms = terms
+        for term_id in stack_terms:
+            self.stack_postings.setdefault(term_id, set()).add(project.id)
+        for term_id in role_terms:
+            self.role_postings.setdefault(term_id, set()).add(project.id)
+        self.version += 1
+
+    def remove(self, project_id: int) -> None:
+        self.projects.pop(project_id, None)
+        self._project_sources.pop(project_id, None)
+        terms = self._project_terms.pop(project_id, None)
+        if terms is None:
+            return
+        stack_terms, role_terms = terms
+        for postings, term_ids in ((self.stack_postings, stack_terms), (self.role_postings, role_terms)):
+            for term_id in term_ids:
+                posting = postings.get(term_id)
+                if posting is not None:
+                    posting.discard(project_id)
+                    if not posting:
+                        del postings[term_id]
+        self.version += 1
+
+    def sync(self, projects: Iterable[Project]) -> None:
+        """Приводит индекс к переданному набору активных проектов, переиндексируя только изменившиеся"""
+        projects = list(projects)
+        seen = set()
+        for project in projects:
+            seen.add(project.id)
+            self.upsert(project)
+        for project_id in list(self.projects.keys() - seen):
+            self.remove(project_id)
+        self.snapshot = projects
+        self.synced_at = time.monotonic()
+
+    def apply_changes(self, projects: Iterable[Project], removed_ids: Iterable[int] = ()) -> None:
+        """Точечное обновление по уведомлению об изменениях: снимок остается актуальным без полного перечитывания"""
+        for project in projects:
+            self.upsert(project)
+        for project_id in removed_ids:
+            self.remove(project_id)
+        self.snapshot = list(self.projects.values())
+        self.synced_at = time.monotonic()
+
+    def fresh_snapshot(self, max_age: float) -> Optional[List[Project]]:
+        """Активные проекты последней синхронизации, если она была не раньше max_age секунд назад.
+
+        Пока live (изменения приходят через LISTEN/NOTIFY), снимок не устаревает.
+        """
+        if max_age <= 0 or self.synced_at is None:
+            return None
+        if not self.live and time.monotonic() - self.synced_at > max_age:
+            return None
+        return self.snapshot
+
+    def overlap_counts(self, stack: Optional[str], desired_role: Optional[str]) -> Counter:
+        """Число общих терминов стека и ролей студента с каждым проектом (только проекты с пересечением)"""
+        counts: Counter = Counter()
+        for term_id in self._term_ids(stack, self.stack_ids, create=False):
+            counts.update(self.stack_postings.get(term_id, ()))
+        for term_id in self._term_ids(desired_role, self.role_ids, create=False):
+            counts.update(self.role_postings.get(term_id, ()))
+        return counts
+
+    def shortlist(self, stack: Optional[str], desired_role: Optional[str], size: int) -> List[int]:
+        """Id не более size проектов с наибольшим пересечением; проекты без пересечений не попадают"""
+        counts = self.overlap_counts(stack, desired_role)
+        return [project_id for project_id, _ in heapq.nlargest(size, counts.items(), key=lambda item: (item[1], -item[0]))]
+
+    def _project_matrix(self) -> sparse.csr_matrix:
+        """Разреженная матрица проекты x (термины стека + роли), пересобирается только после изменений индекса"""
+        if self._matrix_version == self.version and self._matrix is not None:
+            return self._matrix
+
+        project_ids = sorted(self._project_terms)
+        stack_size = len(self.stack_ids)
+        rows, cols = [], []
+        for row, project_id in enumerate(project_ids):
+            stack_terms, role_terms = self._project_terms[project_id]
+            cols.extend(stack_terms)
+            cols.extend(stack_size + term_id for term_id in role_terms)
+            rows.extend([row] * (len(stack_terms) + len(role_terms)))
+        self._matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(len(project_ids), stack_size + len(self.role_ids)))
+        self._matrix_project_ids = np.array(project_ids, dtype=np.int64)
+        self._matrix_stack_size = stack_size
+        self._matrix_version = self.version
+        return self._matrix
+
+    def rank_by_overlap(self, stack: Optional[str], desired_role: Optional[str], top_n: int) -> List[Tuple[int, int]]:
+        """Ранжирование без модели: (id проекта, число совпадений) для top_n проектов.
+
+        Одно умножение разреженной матрицы проектов на вектор студента; при равном
+        числе совпадений выше проект с меньшим id. Проекты без совпадений не
+        возвращаются, поэтому результат может быть короче top_n.
+        """
+        matrix = self._project_matrix()
+        if matrix.shape[0] == 0 or top_n <= 0:
+            return []
+
+        student_vector = np.zeros(matrix.shape[1], dtype=np.float32)
+        stack_terms = [t for t in self._term_ids(stack, self.stack_ids, create=False) if t < self._matrix_stack_size]
+        role_terms = [t for t in self._term_ids(desired_role, self.role_ids, create=False)
+                      if self._matrix_stack_size + t < matrix.shape[1]]
+        student_vector[stack_terms] = 1.0
+        student_vector[[self._matrix_stack_size + t for t in role_terms]] = 1.0
+        overlap = matrix @ student_vector
+
+        candidates = np.flatnonzero(overlap > 0)
+        if len(candidates) > top_n:
+            # Порог — top_n-е по величине число совпадений; все равные ему проекты остаются кандидатами,
+            # чтобы порядок по id выбирал среди них, а не argpartition
+            kth = np.partition(overlap[candidates], len(candidates) - top_n)[len(candidates) - top_n]
+            candidates = candidates[overlap[candidates] >= kth]
+        top = candidates[np.lexsort((self._matrix_project_ids[candidates], -overlap[candidates]))][:top_n]
+        return [(int(self._matrix_project_ids[i]), int(overlap[i])) for i in top]
+
+
+def shortlist_recall(full_ranking: List[List[int]], shortlist_ranking: List[List[int]]) -> float:
+    """Средняя доля проектов из полного top-N, сохранившихся в top-N после отбора по индексу"""
+    if not full_ranking:
+        return 1.0
+    recalls = [
+        len(set(full) & set(short)) / len(full) if full else 1.0
+        for full, short in zip(full_ranking, shortlist_ranking)
+    ]
+    return sum(recalls) / len(recalls)
@@ -0,0 +1,172 @@
+import asyncio
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import numpy as np
+from scipy import sparse
+from db import Repositories
+from db.models import Student
+from db.student_repository import StudentRepository
+from .batch_scoring import normalize_rows
+from .compact_embeddings import CompactMatrix
+from .recommendation_service import RecommendationService, parse_string, student_profile_key
+
+
+class StudentCandidate(NamedTuple):
+    student: Student
+    final_score: float
+    base_similarity: float
+    bonus_score: float
+
+
+class _Snapshot(NamedTuple):
+    students: List[Student]
+    embeddings: CompactMatrix
+    terms: sparse.csr_matrix
+    years: np.ndarray
+    group_ids: np.ndarray
+    assigned: np.ndarray
+
+
+class StudentMatrix:
+    """Матрица нормированных эмбеддингов s_tower всех студентов с профилем для поиска проект -> студенты.
+
+    Как и эмбеддинги проектов, строки пересчитываются только для студентов с
+    изменившимся (stack, desired_role); остальные берутся из прошлой синхронизации.
+    Запрос стоит одного умножения матрицы на вектор проекта; dtype задает формат
+    хранения матрицы (float32, float16 или int8, см. CompactMatrix). sync и
+    update сериализуются блокировкой: их вызывают и периодическое обновление, и
+    уведомления об изменениях, каждое в своем потоке.
+    """
+
+    def __init__(self, dtype: str = "float32"):
+        self.dtype = dtype
+        self._lock = threading.Lock()
+        self.term_ids: Dict[str, int] = {}
+        # id студента -> (ключ профиля, строка в матрице текущего снимка)
+        self._rows: Dict[int, Tuple[str, int]] = {}
+        self._snapshot = _Snapshot([], CompactMatrix.from_embeddings(np.empty((0, 0), dtype=np.float32), dtype),
+                                   sparse.csr_matrix((0, 0)), np.empty(0, dtype=np.int64),
+                                   np.empty(0, dtype=object), np.empty(0, dtype=bool))
+
+    def __len__(self) -> int:
+        return len(self._snapshot.students)
+
+    @property
+    def nbytes(self) -> int:
+        return self._snapshot.embeddings.nbytes
+
+    def sync(self, students: List[Student], model_service: RecommendationService) -> int:
+        """Приводит матрицу к переданным студентам; возвращает число пересчитанных эмбеддингов"""
+        with self._lock:
+            return self._sync(students, model_service)
+
+    def _sync(self, students: List[Student], model_service: RecommendationService) -> int:
+        # Номера строк в _rows относятся к матрице именно этого снимка
+        previous_rows, previous_snapshot = self._rows, self._snapshot
+        students = [s for s in students if s.stack and s.desired_role]
+        keys = [student_profile_key(s.stack, s.desired_role) for s in students]
+        kept, old_rows, changed = [], [], []
+        for i, (student, key) in enumerate(zip(students, keys)):
+            previous = previous_rows.get(student.id)
+            if previous is not None and previous[0] == key:
+                kept.append(i)
+                old_rows.append(previous[1])
+            else:
+                changed.append(i)
+
+        embedding_dim = model_service.model.s_tower[-1].out_features
+        computed = CompactMatrix.from_embeddings(
+            model_service.embed_students([students[i] for i in changed]).cpu().numpy() if changed
+            else np.empty((0, embedding_dim), dtype=np.float32),
+            self.dtype)
+        embeddings = CompactMatrix.assemble(
+            [previous_snapshot.embeddings[np.array(old_rows, dtype=np.int64)], computed],
+            [np.array(kept, dtype=np.int64), np.array(changed, dtype=np.int64)],
+            len(students))
+        self._rows = {student.id: (key, i) for i, (student, key) in enumerate(zip(students, keys))}
+
+        rows, cols = [], []
+        for row, student in enumerate(students):
+            for term in set(parse_string(student.stack)):
+                cols.append(self.term_ids.setdefault(term, len(self.term_ids)))
+                rows.append(row)
+        terms = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                                  shape=(len(students), len(self.term_ids)))
+
+        self._snapshot = _Snapshot(
+            students=students,
+            embeddings=embeddings,
+            terms=terms,
+            years=np.array([s.year if s.year is not None else -1 for s in students], dtype=np.int64),
+            group_ids=np.array([s.group_id for s in students], dtype=object),
+            assigned=np.array([s.team_id is not None for s in students], dtype=bool),
+        )
+        return len(changed)
+
+    def update(self, students: List[Student], removed_ids: Iterable[int], model_service: RecommendationService) -> int:
+        """Точечное обновление по уведомлению об изменениях: студенты без профиля и removed_ids удаляются"""
+        with self._lock:
+            current = {s.id: s for s in self._snapshot.students}
+            for student_id in removed_ids:
+                current.pop(student_id, None)
+            for student in students:
+                current[student.id] = student
+            return self._sync(list(current.values()), model_service)
+
+    async def refresh(self, student_repo: StudentRepository, model_service: RecommendationService) -> int:
+        students = await student_repo.get_students_with_profiles()
+        return await asyncio.to_thread(self.sync, students, model_service)
+
+    async def refresh_periodically(self, session_factory, model_service: RecommendationService, interval: float) -> None:
+        """Фоновая задача: раз в interval секунд подтягивает новых и изменившихся студентов"""
+        while True:
+            await asyncio.sleep(interval)
+            repos = Repositories(session_factory=session_factory)
+            try:
+                await self.refresh(repos.student_repo, model_service)
+            except Exception as e:
+                print(f"Failed to refresh student embedding matrix: {e}")
+            finally:
+                await repos.close()
+
+    def top_k(
+        self,
+        project_embedding: np.ndarray,
+        project_stack: Optional[str],
+        k: int,
+        bonus_per_match: float = 0.05,
+        year: Optional[int] = None,
+        group_id: Optional[str] = None,
+        unassigned_only: bool = False,
+        candidate_factor: int = 3
+    ) -> List[StudentCandidate]:
+        """Top-k студентов для проекта с той же логикой, что и в RecommendationEngine, с фильтрами по году,
+        группе и отсутствию команды"""
+        snapshot = self._snapshot
+        mask = np.ones(len(snapshot.students), dtype=bool)
+        if year is not None:
+            mask &= snapshot.years == year
+        if group_id is not None:
+            mask &= snapshot.group_ids == group_id
+        if unassigned_only:
+            mask &= ~snapshot.assigned
+        idx = np.flatnonzero(mask)
+        if len(idx) == 0 or k <= 0:
+            return []
+
+        project_vector = normalize_rows(project_embedding.reshape(1, -1))[0]
+        base = snapshot.embeddings.dot(project_vector)[idx]
+        n_candidates = min(k * candidate_factor, len(idx))
+        candidates = np.argpartition(-base, n_candidates - 1)[:n_candidates] if n_candidates < len(idx) else np.arange(len(idx))
+
+        project_terms = sorted({self.term_ids[t] for t in parse_string(project_stack or "") if t in self.term_ids})
+        project_terms = [t for t in project_terms if t < snapshot.terms.shape[1]]
+        matches = np.asarray(snapshot.terms[idx[candidates]][:, project_terms].sum(axis=1)).ravel()
+        bonus = matches * bonus_per_match
+        final = base[candidates] + bonus
+
+        order = np.argsort(-final, kind="stable")[:k]
+        return [
+            StudentCandidate(snapshot.students[idx[candidates[i]]], float(final[i]), float(base[candidates[i]]), float(bonus[i]))
+            for i in order
+        ]
@@ -0,0 +1,224 @@
+import time
+from typing import Dict, List, Tuple
+import numpy as np
+from .batch_scoring import coverage_terms
+
+
+class TeamFormation:
+    """Формирование команд из студентов без команды под целевые проекты.
+
+    Каждой команде назначается целевой проект; ценность команды — доля закрытых
+    ролей проекта (role_weight), доля закрытого стека (stack_weight) и средняя
+    оценка рекомендации участников для этого проекта (score_weight). Покрытие
+    считается по счетчикам терминов команды (команды x термины) и multi-hot
+    матрицам, поэтому кандидаты на место и обмены оцениваются векторно.
+
+    Сначала команды заполняются жадно, затем локальный поиск обменивает
+    участников между командами и переназначает целевые проекты, пока есть
+    улучшение и не вышло время.
+    """
+
+    def __init__(
+        self,
+        student_roles: np.ndarray,
+        student_stack: np.ndarray,
+        project_roles: np.ndarray,
+        project_stack: np.ndarray,
+        affinity: np.ndarray,
+        capacities: np.ndarray,
+        team_size: int,
+        role_weight: float = 1.0,
+        stack_weight: float = 0.5,
+        score_weight: float = 1.0,
+        seed: int = 0
+    ):
+        if team_size < 1:
+            raise ValueError("Team size must be positive.")
+        self.student_roles = np.asarray(student_roles, dtype=np.float32)
+        self.student_stack = np.asarray(student_stack, dtype=np.float32)
+        self.role_terms = coverage_terms(np.asarray(project_roles, dtype=np.float32))
+        self.stack_terms = coverage_terms(np.asarray(project_stack, dtype=np.float32))
+        self.affinity = np.asarray(affinity, dtype=np.float64)
+        self.capacities = np.maximum(np.asarray(capacities, dtype=np.int64), 0)
+        self.weights = (role_weight, stack_weight, score_weight)
+        self.rng = np.random.default_rng(seed)
+
+        n_students = len(self.affinity)
+        n_teams = -(-n_students // team_size)
+        # Размеры команд отличаются не больше чем на одного человека
+        self.sizes = np.full(n_teams, n_students // n_teams if n_teams else 0, dtype=np.int64)
+        self.sizes[:n_students - self.sizes.sum()] += 1
+        self.members: List[List[int]] = [[] for _ in range(n_teams)]
+        self.team_of = np.full(n_students, -1, dtype=np.int64)
+        self.target = np.full(n_teams, -1, dtype=np.int64)
+        self.load = np.zeros(len(self.capacities), dtype=np.int64)
+        self.role_counts = np.zeros((n_teams, self.student_roles.shape[1]), dtype=np.float32)
+        self.stack_counts = np.zeros((n_teams, self.student_stack.shape[1]), dtype=np.float32)
+        self.affinity_sum = np.zeros(n_teams)
+        self.swaps = 0
+        self.retargets = 0
+        self.passes = 0
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def _values(self, role_counts: np.ndarray, stack_counts: np.ndarray, affinity_sum: np.ndarray,
+                sizes: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """Ценности команд по счетчикам терминов (... x термины) и сумме оценок участников"""
+        role_weight, stack_weight, score_weight = self.weights
+        roles = ((role_counts > 0) * self.role_terms[targets]).sum(axis=-1)
+        stack = ((stack_counts > 0) * self.stack_terms[targets]).sum(axis=-1)
+        return role_weight * roles + stack_weight * stack + score_weight * affinity_sum / np.maximum(sizes, 1)
+
+    def team_values(self) -> np.ndarray:
+        return self._values(self.role_counts, self.stack_counts, self.affinity_sum, self.sizes, self.target)
+
+    def objective(self) -> float:
+        return float(self.team_values().sum()) if len(self) else 0.0
+
+    def _open_projects(self) -> np.ndarray:
+        """Проекты со свободными местами; если мест не осталось, подходит любой"""
+        open_ = self.load < self.capacities
+        return open_ if open_.any() else np.ones_like(open_)
+
+    def _add(self, team: int, student: int) -> None:
+        self.members[team].append(student)
+        self.team_of[student] = team
+        self.role_counts[team] += self.student_roles[student]
+        self.stack_counts[team] += self.student_stack[student]
+        self.affinity_sum[team] += self.affinity[student, self.target[team]]
+
+    def _remove(self, team: int, student: int) -> None:
+        self.members[team].remove(student)
+        self.role_counts[team] -= self.student_roles[student]
+        self.stack_counts[team] -= self.student_stack[student]
+        self.affinity_sum[team] -= self.affinity[student, self.target[team]]
+
+    def build(self) -> None:
+        """Жадное заполнение: затравка — свободный студент с лучшей оценкой среди открытых проектов,
+        дальше на каждое место берется студент с наибольшим приростом ценности команды"""
+        role_weight, stack_weight, score_weight = self.weights
+        available = np.ones(len(self.affinity), dtype=bool)
+        open_, best = None, None
+        for team in range(len(self)):
+            if open_ is None:
+                # Лучшая оценка по открытым проектам пересчитывается, только когда закрывается проект
+                open_ = self._open_projects()
+                best = np.where(open_[None, :], self.affinity, -np.inf).max(axis=1)
+            seed = int(np.argmax(np.where(available, best, -np.inf)))
+            target = int(np.argmax(np.where(open_, self.affinity[seed], -np.inf)))
+            self.target[team] = target
+            self.load[target] += 1
+            if self.load[target] == self.capacities[target]:
+                open_ = None
+            self._add(team, seed)
+            available[seed] = False
+
+            for _ in range(1, self.sizes[team]):
+                missing_roles = self.role_terms[target] * (self.role_counts[team] == 0)
+                missing_stack = self.stack_terms[target] * (self.stack_counts[team] == 0)
+                gain = (role_weight * (self.student_roles @ missing_roles)
+                        + stack_weight * (self.student_stack @ missing_stack)
+                        + score_weight * self.affinity[:, target] / self.sizes[team])
+                student = int(np.argmax(np.where(available, gain, -np.inf)))
+                self._add(team, student)
+                available[student] = False
+
+    def _best_swap(self, team: int, partners: np.ndarray, values: np.ndarray) -> Tuple[float, int, int]:
+        """Лучший обмен участника team с участником одной из partners: (прирост, студент, студент)"""
+        own = np.array(self.members[team])
+        others = np.concatenate([self.members[p] for p in partners])
+        other_teams = self.team_of[others]
+        target, other_targets = self.target[team], self.target[other_teams]
+
+        role_delta = self.student_roles[others][None, :, :] - self.student_roles[own][:, None, :]
+        stack_delta = self.student_stack[others][None, :, :] - self.student_stack[own][:, None, :]
+        new_own = self._values(
+            self.role_counts[team] + role_delta, self.stack_counts[team] + stack_delta,
+            self.affinity_sum[team] - self.affinity[own, target][:, None] + self.affinity[others, target][None, :],
+            self.sizes[team], target)
+        new_other = self._values(
+            self.role_counts[other_teams][None] - role_delta, self.stack_counts[other_teams][None] - stack_delta,
+            self.affinity_sum[other_teams][None] - self.affinity[others, other_targets][None, :]
+            + self.affinity[own[:, None], other_targets[None, :]],
+            self.sizes[other_teams][None], other_targets[None, :])
+        gain = new_own + new_other - values[team] - values[other_teams][None, :]
+
+        i, j = np.unravel_index(int(np.argmax(gain)), gain.shape)
+        return float(gain[i, j]), int(own[i]), int(others[j])
+
+    def _swap(self, student: int, other: int) -> None:
+        team, other_team = self.team_of[student], self.team_of[other]
+        self._remove(team, student)
+        self._remove(other_team, other)
+        self._add(other_team, student)
+        self._add(team, other)
+        self.swaps += 1
+
+    def _retarget(self) -> int:
+        """Переводит команды на проекты со свободными местами, если там их ценность выше"""
+        role_weight, stack_weight, score_weight = self.weights
+        membership = np.zeros((len(self), len(self.affinity)))
+        membership[self.team_of, np.arange(len(self.affinity))] = 1.0
+        team_affinity = (membership @ self.affinity) / self.sizes[:, None]
+        values = (role_weight * ((self.role_counts > 0) @ self.role_terms.T)
+                  + stack_weight * ((self.stack_counts > 0) @ self.stack_terms.T)
+                  + score_weight * team_affinity)
+        gains = values - values[np.arange(len(self)), self.target][:, None]
+        moved = 0
+        for team in np.argsort(-gains.max(axis=1)):
+            free = self.load < self.capacities
+            candidates = np.where(free, gains[team], -np.inf)
+            project = int(np.argmax(candidates))
+            if candidates[project] <= 1e-9:
+                continue
+            self.load[self.target[team]] -= 1
+            self.load[project] += 1
+            self.target[team] = project
+            self.affinity_sum[team] = team_affinity[team, project] * self.sizes[team]
+            gains[team] -= gains[team, project]
+            moved += 1
+        self.retargets += moved
+        return moved
+
+    def improve(self, time_limit: float = 5.0, max_passes: int = 20, partners: int = 16) -> None:
+        """Локальный поиск: обмены с partners случайными командами для каждой команды и переназначение проектов"""
+        started = time.perf_counter()
+        if len(self) < 2:
+            return
+        for _ in range(max_passes):
+            self.passes += 1
+            improved = self._retarget()
+            values = self.team_values()
+            for team in self.rng.permutation(len(self)):
+                others = np.delete(np.arange(len(self)), team)
+                sample = self.rng.choice(others, size=min(partners, len(others)), replace=False)
+                gain, student, other = self._best_swap(team, sample, values)
+                if gain > 1e-9:
+                    other_team = self.team_of[other]
+                    self._swap(student, other)
+                    changed = [team, other_team]
+                    values[changed] = self._values(
+                        self.role_counts[changed], self.stack_counts[changed], self.affinity_sum[changed],
+                        self.sizes[changed], self.target[changed])
+                    improved += 1
+                if time.perf_counter() - started > time_limit:
+                    return
+            if not improved:
+                return
+
+    def teams(self) -> List[Dict]:
+        """Состав (индексы студентов), целевой проект (индекс) и метрики каждой команды"""
+        values = self.team_values()
+        result = []
+        for team, members in enumerate(self.members):
+            target = self.target[team]
+            result.append({
+                "students": list(members),
+                "project": int(target),
+                "value": float(values[team]),
+                "role_coverage": float(((self.role_counts[team] > 0) * self.role_terms[target]).sum()),
+                "stack_coverage": float(((self.stack_counts[team] > 0) * self.stack_terms[target]).sum()),
+                "mean_score": float(self.affinity_sum[team] / max(self.sizes[team], 1)),
+            })
+        return result
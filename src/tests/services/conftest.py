@@ -0,0 +1,32 @@
+import types
+import pytest
+import torch
+from unittest.mock import AsyncMock
+
+from src.services.embedding_cache import EmbeddingCache
+from src.services.recommendation_model import TwoTowerModel
+from src.services.recommendation_service import RecommendationService
+
+
+@pytest.fixture
+def model_service() -> RecommendationService:
+    # Сервис без загрузки файлов модели и SentenceTransformer: s_tower достаточно для эмбеддингов студентов
+    service = RecommendationService.__new__(RecommendationService)
+    service.stack_vocab = {"python": 0, "fastapi": 1, "docker": 2, "react": 3}
+    service.roles_vocab = {"backend": 0, "frontend": 1}
+    service.device = torch.device("cpu")
+    student_dim = len(service.stack_vocab) + len(service.roles_vocab)
+    service.model = TwoTowerModel(student_dim, student_dim + 384).eval()
+    service.student_embeddings = EmbeddingCache(max_size=16)
+    return service
+
+
+@pytest.fixture
+def patch_repositories(monkeypatch):
+    """Подменяет Repositories в модуле набором AsyncMock-репозиториев и возвращает этот набор"""
+    def patch(module):
+        fake = types.SimpleNamespace(
+            project_repo=AsyncMock(), student_repo=AsyncMock(), favorite_repo=AsyncMock(), close=AsyncMock())
+        monkeypatch.setattr(module, "Repositories", lambda session_factory: fake)
+        return fake
+    return patch
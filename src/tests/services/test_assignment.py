@@ -0,0 +1,129 @@
+import asyncio
+import time
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock
+from scipy.optimize import linear_sum_assignment
+
+from src.services.assignment import Distribution, IncrementalAssignment
+from src.services.distribution import DistributionService
+from src.db.models import Project, Student, Team
+
+
+def optimal_cost(cost: np.ndarray) -> float:
+    rows, cols = linear_sum_assignment(cost)
+    return cost[rows, cols].sum()
+
+
+def test_incremental_updates_stay_optimal():
+    rng = np.random.default_rng(0)
+    solver = IncrementalAssignment(rng.normal(size=(12, 12)))
+    for step in range(40):
+        if step % 3 == 0:
+            solver.update_column(int(rng.integers(len(solver))), rng.normal(size=len(solver)))
+        elif step % 3 == 1:
+            solver.update_row(int(rng.integers(len(solver))), rng.normal(size=len(solver)))
+        else:
+            n = len(solver)
+            solver.grow(rng.normal(size=n), rng.normal(size=n), rng.normal())
+
+        assert solver.total_cost() == pytest.approx(optimal_cost(solver.cost))
+        assert (solver.cost - solver.u[:, None] - solver.v[None, :]).min() > -1e-9
+
+
+def test_distribution_updates_match_full_resolve():
+    rng = np.random.default_rng(1)
+    team_ids, project_ids = list(range(20)), [100, 101, 102, 103, 104, 105]
+    distribution = Distribution(team_ids, project_ids, [2, 1, 3, 1, 2, 1], rng.random((20, 6)))
+
+    distribution.update_team(3, rng.random(6))
+    distribution.update_team(50, rng.random(6))
+    distribution.remove_team(7)
+    distribution.update_project(101, 4)
+    distribution.update_project(102, 0)
+    distribution.update_project(106, 2, rng.random(len(distribution.team_ids)))
+
+    teams = [t for t in distribution.team_ids if t != 7]
+    fresh = Distribution(teams, distribution.project_ids, distribution.capacities,
+                         distribution.utilities[[distribution.team_index[t] for t in teams]])
+    assert distribution.objective() == pytest.approx(fresh.objective())
+
+    assignment = distribution.assignment()
+    assert 7 not in assignment and 102 not in assignment.values()
+    counts = {p: list(assignment.values()).count(p) for p in distribution.project_ids}
+    assert all(counts[p] <= c for p, c in zip(distribution.project_ids, distribution.capacities))
+
+
+def test_what_if_leaves_current_distribution_untouched():
+    distribution = Distribution([1, 2, 3], [10, 20], [1, 1], np.array([[1.0, 0.5], [0.9, 0.2], [0.1, 0.8]]))
+    before = distribution.assignment()
+    assert before == {1: 10, 2: None, 3: 20}
+
+    scenario, changes = distribution.what_if(capacities={10: 2})
+    assert changes == {2: (None, 10)}
+    assert scenario.objective() == pytest.approx(distribution.objective() + 0.9)
+    assert distribution.assignment() == before
+
+
+def test_priorities_drive_utilities_without_model():
+    team = Team(id=1, name="t")
+    team.student = [
+        Student(id=1, username="a", first_priority=20, second_priority=10),
+        Student(id=2, username="b", first_priority=20),
+    ]
+    service = DistributionService(model_service=None)
+    projects = [Project(id=pid, name=f"Proj {pid}", stack="python", required_roles="backend", description="Desc")
+                for pid in (10, 20)]
+    utilities = service.utilities([team], projects)
+    np.testing.assert_allclose(utilities, [[1 / 3, 1.0]])
+
+
+def make_team(team_id, priority):
+    team = Team(id=team_id, name=f"t{team_id}")
+    team.student = [Student(id=team_id, username=f"s{team_id}", first_priority=priority)]
+    return team
+
+
+@pytest.mark.asyncio
+async def test_concurrent_refreshes_see_a_consistent_distribution():
+    projects = [Project(id=pid, name=f"Proj {pid}", stack="python", required_roles="backend", description="Desc",
+                        is_active=True, teams_amount=2) for pid in (10, 20)]
+    teams = [make_team(1, 10), make_team(2, 20)]
+
+    async def get_teams_with_students():
+        return list(teams)
+
+    async def get_team_with_students(team_id):
+        await asyncio.sleep(0.02)
+        return next(t for t in teams if t.id == team_id)
+
+    team_repo, project_repo = AsyncMock(), AsyncMock()
+    team_repo.get_teams_with_students.side_effect = get_teams_with_students
+    team_repo.get_team_with_students.side_effect = get_team_with_students
+    project_repo.get_active_projects.return_value = projects
+    project_repo.get.return_value = projects[0]
+    service = DistributionService(model_service=None)
+    await service.solve(team_repo, project_repo)
+
+    # Столбец проекта считается долго: за это время успевает прийти пересчет новой команды
+    utilities = service.utilities
+
+    def slow_utilities(teams_, projects_):
+        if len(projects_) == 1:
+            time.sleep(0.1)
+        return utilities(teams_, projects_)
+
+    service.utilities = slow_utilities
+    teams.append(make_team(3, 10))
+    await asyncio.gather(service.refresh_project(10, project_repo, team_repo), service.refresh_team(3, team_repo))
+    assert service.assignment() == {1: 10, 2: 20, 3: 10}
+    assert (await service.what_if(capacities={10: 1}))["objective_delta"] < 0
+
+
+@pytest.mark.asyncio
+async def test_stateful_operations_need_a_single_worker():
+    service = DistributionService(model_service=None, workers=2)
+    with pytest.raises(RuntimeError, match="single worker"):
+        await service.solve(AsyncMock(), AsyncMock())
+    with pytest.raises(RuntimeError, match="single worker"):
+        service.assignment()
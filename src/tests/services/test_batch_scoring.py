@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+
+from src.services.batch_scoring import (
+    aggregate_teams, build_term_index, mmr, multi_hot, normalize_rows, rank_students, rank_students_parallel, rank_teams
+)
+from src.services.recommendation_service import parse_string
+
+TERMS = ["python", "fastapi", "docker", "react", "java", "go", "sql", "kotlin"]
+
+
+def random_stacks(rng: np.random.Generator, count: int) -> list[str]:
+    return [", ".join(rng.choice(TERMS, size=rng.integers(1, 4), replace=False)) for _ in range(count)]
+
+
+def reference_ranking(base_row, student_stack, project_stacks, top_k, bonus_per_match):
+    # Та же логика, что в RecommendationEngine.get_recommendations
+    candidates = sorted(range(len(base_row)), key=lambda j: base_row[j], reverse=True)[:top_k * 3]
+    student_terms = set(parse_string(student_stack))
+    scored = []
+    for j in candidates:
+        bonus = len(student_terms & set(parse_string(project_stacks[j]))) * bonus_per_match
+        scored.append((j, base_row[j] + bonus, base_row[j], bonus))
+    return sorted(scored, key=lambda x: x[1], reverse=True)[:top_k]
+
+
+@pytest.fixture
+def batch():
+    rng = np.random.default_rng(0)
+    student_stacks = random_stacks(rng, 40)
+    project_stacks = random_stacks(rng, 25)
+    term_index = build_term_index(project_stacks)
+    return {
+        "student_stacks": student_stacks,
+        "project_stacks": project_stacks,
+        "student_embeddings": normalize_rows(rng.normal(size=(40, 16))),
+        "project_embeddings": normalize_rows(rng.normal(size=(25, 16))),
+        "student_terms": multi_hot(student_stacks, term_index),
+        "project_terms": multi_hot(project_stacks, term_index),
+    }
+
+
+def test_rank_students_matches_engine_logic(batch):
+    ranked = rank_students(
+        batch["student_embeddings"], batch["project_embeddings"],
+        batch["student_terms"], batch["project_terms"], top_k=5, bonus_per_match=0.05)
+
+    base = batch["student_embeddings"] @ batch["project_embeddings"].T
+    for i, student_stack in enumerate(batch["student_stacks"]):
+        expected = reference_ranking(base[i], student_stack, batch["project_stacks"], 5, 0.05)
+        assert list(ranked.project_idx[i]) == [j for j, *_ in expected]
+        np.testing.assert_allclose(ranked.final_score[i], [final for _, final, _, _ in expected], rtol=1e-5)
+        np.testing.assert_allclose(ranked.bonus_score[i], [bonus for *_, bonus in expected], rtol=1e-5)
+
+
+def test_top_k_larger_than_catalog(batch):
+    ranked = rank_students(
+        batch["student_embeddings"][:3], batch["project_embeddings"][:4],
+        batch["student_terms"][:3], batch["project_terms"][:4], top_k=10)
+
+    assert ranked.project_idx.shape == (3, 4)
+    assert sorted(ranked.project_idx[0]) == [0, 1, 2, 3]
+
+
+def test_parallel_chunks_match_single_pass(batch):
+    args = (batch["student_embeddings"], batch["project_embeddings"], batch["student_terms"], batch["project_terms"])
+    single = rank_students(*args, top_k=5)
+    parallel = rank_students_parallel(*args, top_k=5, workers=2, chunk_size=7)
+
+    np.testing.assert_array_equal(parallel.project_idx, single.project_idx)
+    np.testing.assert_allclose(parallel.final_score, single.final_score)
+
+
+def test_bulk_team_ranking_matches_per_team():
+    rng = np.random.default_rng(7)
+    roles = ["backend", "frontend", "devops", "qa"]
+    member_embeddings = rng.normal(size=(9, 16)).astype(np.float32)
+    member_roles = [", ".join(rng.choice(roles, size=1)) for _ in range(9)]
+    member_team_idx = np.array([0, 0, 0, 1, 1, 2, 2, 2, 2])
+    project_embeddings = normalize_rows(rng.normal(size=(12, 16)).astype(np.float32))
+    project_roles = [", ".join(rng.choice(roles, size=rng.integers(1, 3), replace=False)) for _ in range(12)]
+    role_index = build_term_index(project_roles + member_roles)
+    project_role_matrix = multi_hot(project_roles, role_index)
+
+    teams, team_roles = aggregate_teams(member_embeddings, multi_hot(member_roles, role_index), member_team_idx, 3)
+    bulk = rank_teams(teams, project_embeddings, team_roles, project_role_matrix, top_k=4, coverage_weight=0.2)
+
+    for team in range(3):
+        members = member_team_idx == team
+        centroid = normalize_rows(normalize_rows(member_embeddings[members]).mean(axis=0, keepdims=True))
+        covered = {role for i in np.flatnonzero(members) for role in parse_string(member_roles[i])}
+        coverage = np.array([len(covered & set(parse_string(r))) / len(set(parse_string(r))) for r in project_roles])
+        base = (centroid @ project_embeddings.T)[0]
+        candidates = np.argsort(-base, kind="stable")[:12]
+        final = base[candidates] + 0.2 * coverage[candidates]
+        expected = candidates[np.argsort(-final, kind="stable")[:4]]
+
+        np.testing.assert_array_equal(bulk.ranked.project_idx[team], expected)
+        np.testing.assert_allclose(bulk.role_coverage[team], coverage[expected], atol=1e-6)
+
+
+def test_mmr_matches_pairwise_reference():
+    rng = np.random.default_rng(3)
+    embeddings = normalize_rows(rng.normal(size=(40, 16)).astype(np.float32))
+    relevance = rng.random(40)
+
+    def reference(k, diversity):
+        selected = [int(np.argmax(relevance))]
+        while len(selected) < k:
+            best, best_score = None, -np.inf
+            for i in range(len(relevance)):
+                if i in selected:
+                    continue
+                redundancy = max(float(embeddings[i] @ embeddings[j]) for j in selected)
+                score = (1 - diversity) * relevance[i] - diversity * redundancy
+                if score > best_score:
+                    best, best_score = i, score
+            selected.append(best)
+        return selected
+
+    for diversity in (0.3, 0.7):
+        assert mmr(relevance, embeddings, 10, diversity).tolist() == reference(10, diversity)
+    assert mmr(relevance, embeddings, 10, 0.0).tolist() == np.argsort(-relevance)[:10].tolist()
+    assert len(mmr(relevance, embeddings, 100, 0.5)) == 40
+
+
+def test_mmr_pushes_near_duplicates_down():
+    base = normalize_rows(np.eye(4, dtype=np.float32))
+    embeddings = np.vstack([base[0], base[0], base[0], base[1], base[2]])
+    relevance = np.array([0.9, 0.89, 0.88, 0.7, 0.6])
+
+    assert mmr(relevance, embeddings, 3, 0.0).tolist() == [0, 1, 2]
+    assert mmr(relevance, embeddings, 3, 0.5).tolist() == [0, 3, 4]
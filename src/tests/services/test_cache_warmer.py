@@ -0,0 +1,99 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock
+
+from src.services import cache_warmer
+from src.services.cache_warmer import CacheWarmer
+from src.services.load_shedding import InferenceLimiter
+
+
+@pytest.fixture
+def repos(patch_repositories):
+    fake = patch_repositories(cache_warmer)
+    fake.favorite_repo.get_recent_student_ids.return_value = [3, 7]
+    fake.student_repo.get_student_ids_by_groups.return_value = [7, 8, 9]
+    return fake
+
+
+@pytest.mark.asyncio
+async def test_candidates_ordered_by_hits_then_activity_then_groups(repos, tmp_path):
+    hits_path = tmp_path / "hits.json"
+    hits_path.write_text(json.dumps({"5": 1, "3": 10}))
+    warmer = CacheWarmer(AsyncMock(), None, hits_path=str(hits_path), group_ids=["ИВТ-21", ""], max_students=5)
+
+    assert await warmer.candidates() == [3, 5, 7, 8, 9]
+    repos.student_repo.get_student_ids_by_groups.assert_awaited_once_with(["ИВТ-21"])
+
+
+def test_save_hits_merges_with_decay(tmp_path):
+    hits_path = tmp_path / "hits.json"
+    # Файл старого формата без времени сохранения затухает вдвое
+    hits_path.write_text(json.dumps({"1": 4, "2": 2}))
+    warmer = CacheWarmer(AsyncMock(), None, hits_path=str(hits_path))
+    warmer.record(2)
+    warmer.record(3)
+    warmer.save_hits()
+    assert json.loads(hits_path.read_text())["hits"] == {"1": 2.0, "2": 2.0, "3": 1}
+
+    # Воркеры, останавливающиеся вместе, складывают счетчики, не уменьшая их каждый заново
+    for student_id in (1, 3):
+        other = CacheWarmer(AsyncMock(), None, hits_path=str(hits_path))
+        other.record(student_id)
+        other.save_hits()
+    assert other.load_hits() == pytest.approx({1: 3.0, 2: 2.0, 3: 2.0}, rel=1e-3)
+
+
+@pytest.mark.asyncio
+async def test_try_slot_never_queues_ahead_of_live_requests():
+    limiter = InferenceLimiter(max_concurrency=2, max_queue=4)
+    async with limiter.try_slot() as acquired:
+        assert acquired and limiter.in_flight == 1 and limiter.waiting == 0
+        # Вложенный вызов модели внутри фоновой работы не занимает второй слот
+        async with limiter.slot():
+            assert limiter.in_flight == 1
+
+    busy, release = asyncio.Event(), asyncio.Event()
+
+    async def live_request():
+        async with limiter.slot():
+            busy.set()
+            await release.wait()
+
+    tasks = [asyncio.create_task(live_request()) for _ in range(2)]
+    await busy.wait()
+    await asyncio.sleep(0)
+    async with limiter.try_slot() as acquired:
+        assert not acquired and limiter.in_flight == 2 and limiter.waiting == 0
+    release.set()
+    await asyncio.gather(*tasks)
+    assert limiter.in_flight == 0 and not limiter._semaphore.locked()
+
+
+@pytest.mark.asyncio
+async def test_prefetch_yields_to_live_traffic(repos):
+    limiter = InferenceLimiter(max_concurrency=1, max_queue=4)
+    prefetched = []
+
+    async def prefetch(student_id):
+        if student_id == 7:
+            raise ValueError("Student 7 has no stack information.")
+        prefetched.append(student_id)
+
+    warmer = CacheWarmer(prefetch, None, inference_limiter=limiter, ready_fraction=0.5, idle_delay=0.01)
+    assert not warmer.ready()
+    warmer.index_ready(0.2)
+    assert not warmer.ready()
+
+    async with limiter.slot():
+        task = asyncio.create_task(warmer.run())
+        await asyncio.sleep(0.05)
+        # Пока модель занята живым запросом, прогрев не начинается
+        assert prefetched == [] and warmer.yields > 0 and warmer.total == 2
+    await task
+
+    assert prefetched == [3]
+    assert warmer.ready()
+    assert warmer.stats() | {"yields": 0} == {
+        "stage": "done", "index_ms": 200.0, "total": 2, "done": 1, "failed": 1,
+        "progress": 1.0, "yields": 0, "elapsed_ms": warmer.elapsed_ms}
@@ -0,0 +1,165 @@
+import asyncio
+import datetime
+import json
+import os
+import types
+import pytest
+from unittest.mock import AsyncMock
+
+from src.services import change_listener
+from src.services.change_listener import ChangeListener, Changes
+from src.services.recommendation_engine import RecommendationEngine
+from src.services.result_cache import InProcessBackend, ResultCache
+from src.services.skill_index import SkillIndex
+from src.db.models import Project
+from src.db.notifications import CHANNEL, install_triggers, missing_triggers
+
+
+def project(project_id, is_active=True, minute=0):
+    return Project(id=project_id, is_active=is_active, stack="python, docker", required_roles="backend",
+                   description="d", updated_at=datetime.datetime(2025, 1, 1, 12, minute))
+
+
+@pytest.fixture
+def repos(patch_repositories):
+    return patch_repositories(change_listener)
+
+
+def test_parse_groups_ids_by_table():
+    changes = Changes.parse([
+        json.dumps({"table": "project", "op": "UPDATE", "id": 1, "student_id": None}),
+        json.dumps({"table": "project", "op": "DELETE", "id": 2, "student_id": None}),
+        json.dumps({"table": "student", "op": "UPDATE", "id": 7, "student_id": None}),
+        json.dumps({"table": "favorite_project", "op": "INSERT", "id": 100, "student_id": 7}),
+        "not json",
+    ])
+    assert changes.project_ids == {1, 2}
+    assert changes.student_ids == {7}
+    assert changes.favorite_student_ids == {7}
+    assert not Changes.parse([])
+
+
+@pytest.mark.asyncio
+async def test_apply_updates_index_and_invalidates_only_affected_keys(repos):
+    skill_index = SkillIndex({}, {})
+    skill_index.sync([project(1), project(2)])
+    engine = RecommendationEngine(model_service=None, skill_index=skill_index, project_snapshot_max_age=5.0)
+    cache = ResultCache(InProcessBackend())
+    listener = ChangeListener("dsn", types.SimpleNamespace(engine=engine), session_factory=None, result_cache=cache)
+
+    repos.project_repo.get_active_projects.return_value = [project(1), project(2)]
+    repos.student_repo.get_students_by_ids.return_value = []
+    await listener.catch_up()
+    assert listener.project_watermark == datetime.datetime(2025, 1, 1, 12, 0)
+
+    await cache.set_many({"student:none:1:5": b"a", "student:none:2:5": b"b"})
+    await listener.apply(Changes.parse([json.dumps({"table": "student", "id": 1})]))
+    assert await cache.get_many(["student:none:1:5", "student:none:2:5"]) == {"student:none:2:5": b"b"}
+
+    repos.project_repo.get_projects_by_ids.return_value = [project(1, is_active=False, minute=5), project(3, minute=6)]
+    await listener.apply(Changes.parse([json.dumps({"table": "project", "id": i}) for i in (1, 2, 3)]))
+    assert set(skill_index.projects) == {3}
+    assert [p.id for p in skill_index.fresh_snapshot(5.0)] == [3]
+    assert await cache.get("student:none:2:5") is None
+    assert listener.project_watermark == datetime.datetime(2025, 1, 1, 12, 6)
+
+
+@pytest.mark.asyncio
+async def test_catch_up_after_reconnect_uses_watermark(repos):
+    skill_index = SkillIndex({}, {})
+    skill_index.sync([project(1), project(2)])
+    engine = RecommendationEngine(model_service=None, skill_index=skill_index)
+    listener = ChangeListener("dsn", types.SimpleNamespace(engine=engine), session_factory=None)
+    listener.project_watermark = datetime.datetime(2025, 1, 1, 12, 0)
+
+    repos.project_repo.get_projects_updated_since.return_value = [project(4, minute=3)]
+    repos.project_repo.get_active_project_ids.return_value = [1, 4]
+    await listener.catch_up()
+
+    since = repos.project_repo.get_projects_updated_since.await_args.args[0]
+    assert since == datetime.datetime(2025, 1, 1, 12, 0) - change_listener.CATCH_UP_OVERLAP
+    assert set(skill_index.projects) == {1, 4}
+    assert listener.project_watermark == datetime.datetime(2025, 1, 1, 12, 3)
+
+
+@pytest.mark.asyncio
+async def test_snapshot_keeps_expiring_without_triggers():
+    skill_index = SkillIndex({}, {})
+    skill_index.sync([project(1)])
+    listener = ChangeListener("dsn", types.SimpleNamespace(engine=RecommendationEngine(model_service=None, skill_index=skill_index)),
+                              session_factory=None)
+    connection = AsyncMock()
+    connection.fetch.return_value = [{"tgname": "recsys_notify_project_write"}, {"tgname": "recsys_notify_project_update"}]
+
+    await listener._check_triggers(connection)
+    listener._mark_live(True)
+    assert listener.triggers_installed is False and not skill_index.live
+
+    connection.fetch.return_value = [{"tgname": f"recsys_notify_{table}_{kind}"}
+                                     for table in ("project", "student", "favorite_project") for kind in ("write", "update")]
+    await listener._check_triggers(connection)
+    listener._mark_live(True)
+    assert listener.triggers_installed is True and skill_index.live
+
+
+@pytest.mark.asyncio
+async def test_swapped_engine_catches_up_before_going_live(repos):
+    old_index, new_index = SkillIndex({}, {}), SkillIndex({}, {})
+    old_index.sync([project(1)])
+    new_index.sync([project(1)])
+    manager = types.SimpleNamespace(engine=RecommendationEngine(model_service=None, skill_index=old_index))
+    listener = ChangeListener("dsn", manager, session_factory=None, check_interval=0.01)
+    listener.triggers_installed = True
+    listener.project_watermark = datetime.datetime(2025, 1, 1, 12, 0)
+    repos.project_repo.get_projects_updated_since.return_value = []
+    repos.project_repo.get_active_project_ids.return_value = [1]
+    await listener.catch_up()
+
+    # Проект 2 появился, пока новая версия прогревалась, и его уведомление ушло старому движку
+    manager.engine = RecommendationEngine(model_service=None, skill_index=new_index)
+    repos.project_repo.get_projects_updated_since.return_value = [project(2, minute=3)]
+    repos.project_repo.get_active_project_ids.return_value = [1, 2]
+    connection = AsyncMock()
+    connection.fetch.return_value = [{"tgname": f"recsys_notify_{table}_{kind}"}
+                                     for table in ("project", "student", "favorite_project") for kind in ("write", "update")]
+    lost = asyncio.Event()
+    consumer = asyncio.create_task(listener._consume(connection, lost))
+    await asyncio.sleep(0.05)
+    lost.set()
+    with pytest.raises(ConnectionError):
+        await consumer
+
+    assert new_index.live
+    assert set(new_index.projects) == {1, 2}
+
+
+@pytest.mark.skipif("TEST_POSTGRES_DSN" not in os.environ, reason="needs a local Postgres in TEST_POSTGRES_DSN")
+@pytest.mark.asyncio
+async def test_triggers_notify_changed_ids():
+    asyncpg = pytest.importorskip("asyncpg")
+    conn = await asyncpg.connect(os.environ["TEST_POSTGRES_DSN"])
+    listener_conn = await asyncpg.connect(os.environ["TEST_POSTGRES_DSN"])
+    payloads: asyncio.Queue = asyncio.Queue()
+    try:
+        await conn.execute("DROP SCHEMA IF EXISTS recsys_notify_test CASCADE; CREATE SCHEMA recsys_notify_test")
+        await conn.execute("SET search_path TO recsys_notify_test")
+        await conn.execute("CREATE TABLE project (id bigint PRIMARY KEY, stack text)")
+        await conn.execute("CREATE TABLE student (id bigint PRIMARY KEY, stack text)")
+        await conn.execute("CREATE TABLE favorite_project (id bigint PRIMARY KEY, student_id bigint, project_id bigint)")
+        await install_triggers(conn)
+        assert await missing_triggers(conn) == []
+        await listener_conn.add_listener(CHANNEL, lambda *args: payloads.put_nowait(args[-1]))
+
+        await conn.execute("INSERT INTO project VALUES (1, 'python')")
+        await conn.execute("UPDATE project SET stack = 'python' WHERE id = 1")
+        await conn.execute("INSERT INTO student VALUES (7, 'go'); UPDATE student SET stack = 'rust' WHERE id = 7")
+        await conn.execute("INSERT INTO favorite_project VALUES (100, 7, 1)")
+
+        received = [await asyncio.wait_for(payloads.get(), timeout=5) for _ in range(4)]
+        changes = Changes.parse(received)
+        assert changes.project_ids == {1} and changes.student_ids == {7} and changes.favorite_student_ids == {7}
+        assert payloads.empty()
+    finally:
+        await conn.execute("DROP SCHEMA IF EXISTS recsys_notify_test CASCADE")
+        await listener_conn.close()
+        await conn.close()
@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+import torch
+from unittest.mock import AsyncMock, MagicMock
+
+from src.services.cohort_stream import CohortScorer, buffered
+from src.services.recommendation_engine import RecommendationEngine
+from src.services.load_shedding import InferenceLimiter
+from src.db.models import Project, Student
+
+
+async def numbers(n, produced, closed=None):
+    try:
+        for i in range(n):
+            produced.append(i)
+            yield i
+    finally:
+        if closed is not None:
+            closed.set()
+
+
+@pytest.mark.asyncio
+async def test_buffered_reads_ahead_at_most_size_items():
+    produced, consumed = [], []
+    async for item in buffered(numbers(20, produced), 3):
+        consumed.append(item)
+        await asyncio.sleep(0.001)
+        # Очередь (3) плюс элемент, который источник держит в ожидании места в очереди
+        assert len(produced) - len(consumed) <= 4
+    assert consumed == list(range(20))
+
+
+@pytest.mark.asyncio
+async def test_closing_buffered_closes_source():
+    produced, closed = [], asyncio.Event()
+    stream = buffered(numbers(1000, produced, closed), 2)
+    assert await stream.__anext__() == 0
+    await stream.aclose()
+    assert closed.is_set() and len(produced) < 10
+
+
+@pytest.mark.asyncio
+async def test_buffered_propagates_source_errors():
+    async def failing():
+        yield 1
+        raise RuntimeError("connection lost")
+
+    with pytest.raises(RuntimeError, match="connection lost"):
+        async for _ in buffered(failing(), 2):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_cohort_scorer_streams_every_student_in_order():
+    projects = [
+        Project(id=10, name="API", stack="python, fastapi", required_roles="backend", description="d"),
+        Project(id=20, name="UI", stack="react", required_roles="frontend", description="d"),
+        Project(id=30, name="Draft", stack="go", required_roles=None, description="d"),
+    ]
+    vectors = {"backend": [1.0, 0.0], "frontend": [0.0, 1.0]}
+    model_service = MagicMock()
+    model_service.embed_projects.side_effect = lambda ps: torch.tensor([vectors[p.required_roles] for p in ps])
+    model_service.embed_students.side_effect = lambda ss: torch.tensor([vectors[s.desired_role] for s in ss])
+    engine = RecommendationEngine(model_service, inference_limiter=InferenceLimiter(max_concurrency=1, max_queue=4))
+    project_repo = AsyncMock()
+    project_repo.get_active_projects.return_value = projects
+
+    scorer = CohortScorer(engine, top_n=1, max_in_flight=1)
+    await scorer.prepare(project_repo)
+    assert [p.id for p in scorer.projects] == [10, 20]
+
+    async def batches():
+        for start in range(0, 6, 2):
+            yield [Student(id=start + i, username=f"s{start + i}", stack="python",
+                           desired_role="backend" if (start + i) % 2 else "frontend") for i in range(2)]
+        yield [Student(id=99, username="empty")]
+
+    results = [result async for result in scorer.stream(batches())]
+    assert [r["student_id"] for r in results] == list(range(6))
+    assert [r["recommendations"][0]["project_id"] for r in results] == [20, 10] * 3
+    assert results[1]["recommendations"][0]["bonus_score"] == 0.05
@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock
+
+from src.services.collaborative import CoOccurrenceModel
+from src.services.recommendation_engine import RecommendationEngine
+from src.services.recommendation_service import RecommendationService
+from src.db.models import Student, Project
+from src.db.student_repository import StudentRepository
+from src.db.project_repository import ProjectRepository
+
+FAVORITES = [(1, 10), (1, 20), (2, 10), (2, 20), (2, 30), (3, 30), (3, 40), (4, 10)]
+
+
+def as_chunks(favorites, chunk_size):
+    for start in range(0, len(favorites), chunk_size):
+        chunk = np.array(favorites[start:start + chunk_size])
+        yield chunk[:, 0], chunk[:, 1]
+
+
+def brute_force_scores(favorites, student_id, project_ids):
+    by_student = {}
+    for s, p in favorites:
+        by_student.setdefault(s, set()).add(p)
+    counts = {}
+    for items in by_student.values():
+        for a in items:
+            for b in items:
+                counts[(a, b)] = counts.get((a, b), 0) + 1
+    own = by_student.get(student_id, set())
+    result = []
+    for pid in project_ids:
+        total = 0.0
+        for f in own:
+            if f != pid and (f, pid) in counts:
+                total += counts[(f, pid)] / np.sqrt(counts[(f, f)] * counts[(pid, pid)])
+        result.append(total / len(own) if own else 0.0)
+    return np.array(result)
+
+
+def test_build_matches_brute_force():
+    model = CoOccurrenceModel()
+    model.build(as_chunks(FAVORITES, 3))
+    project_ids = [10, 20, 30, 40, 99]
+    for student_id in (1, 2, 3, 4, 5):
+        np.testing.assert_allclose(
+            model.scores(student_id, project_ids), brute_force_scores(FAVORITES, student_id, project_ids), atol=1e-6)
+
+
+def test_incremental_apply_equals_full_rebuild():
+    added = [(1, 30), (5, 40), (5, 50), (4, 20)]
+    incremental = CoOccurrenceModel()
+    incremental.build(as_chunks(FAVORITES, 100))
+    chunk = np.array(added)
+    incremental.apply(chunk[:, 0], chunk[:, 1])
+
+    full = CoOccurrenceModel()
+    full.build(as_chunks(FAVORITES + added, 100))
+
+    project_ids = [10, 20, 30, 40, 50]
+    for student_id in (1, 2, 3, 4, 5):
+        np.testing.assert_allclose(incremental.scores(student_id, project_ids), full.scores(student_id, project_ids), atol=1e-6)
+    assert len(incremental) == len(FAVORITES) + len(added)
+
+
+@pytest.mark.asyncio
+async def test_reload_students_drops_removed_favorites():
+    model = CoOccurrenceModel()
+    model.build(as_chunks(FAVORITES, 100))
+    # Студент 2 убрал проект 20 и добавил 50, студент 4 очистил избранное
+    remaining = [(s, p) for s, p in FAVORITES if (s, p) != (2, 20) and s != 4] + [(2, 50)]
+    favorite_repo = AsyncMock()
+    favorite_repo.get_favorites_of_students.return_value = [(s, p) for s, p in remaining if s in (2, 4)]
+    await model.reload_students(favorite_repo, {2, 4})
+
+    full = CoOccurrenceModel()
+    full.build(as_chunks(remaining, 100))
+    project_ids = [10, 20, 30, 40, 50]
+    for student_id in (1, 2, 3, 4):
+        np.testing.assert_allclose(model.scores(student_id, project_ids), full.scores(student_id, project_ids), atol=1e-6)
+    np.testing.assert_allclose(model.co_occurrence.toarray().sum(), full.co_occurrence.toarray().sum())
+    assert len(model) == len(remaining)
+
+
+@pytest.mark.asyncio
+async def test_load_and_refresh_page_by_id():
+    rows = [(i + 1, s, p) for i, (s, p) in enumerate(FAVORITES)]
+    favorite_repo = AsyncMock()
+    favorite_repo.get_favorites_after.side_effect = lambda last_id, limit: [r for r in rows if r[0] > last_id][:limit]
+
+    model = CoOccurrenceModel()
+    await model.load(favorite_repo, chunk_size=3)
+    assert model.last_favorite_id == len(FAVORITES)
+
+    rows.append((len(rows) + 1, 4, 20))
+    assert await model.refresh(favorite_repo, chunk_size=3) == 1
+    assert model.scores(4, [20])[0] > 0
+
+
+@pytest.mark.asyncio
+async def test_engine_blends_collaborative_scores():
+    student = Student(id=1, username="s1", stack="python", desired_role="backend")
+    projects = [Project(id=pid, name=f"Proj {pid}", stack="java", required_roles="backend", description="Desc", is_active=True)
+                for pid in (10, 20, 30)]
+    model_service = AsyncMock(spec=RecommendationService)
+    model_service.predict_for_student.return_value = {10: 0.5, 20: 0.5, 30: 0.5}
+    student_repo = AsyncMock(spec=StudentRepository)
+    student_repo.get_student_by_id.return_value = student
+    project_repo = AsyncMock(spec=ProjectRepository)
+    project_repo.get_active_projects.return_value = projects
+
+    collaborative = CoOccurrenceModel()
+    collaborative.build(as_chunks([(1, 10), (2, 10), (2, 30)], 10))
+    engine = RecommendationEngine(model_service, collaborative=collaborative, collaborative_weight=0.5)
+
+    recs = await engine.get_recommendations(1, student_repo, project_repo, top_n=3)
+    assert recs[0]["project_id"] == 30
+    assert recs[0]["base_similarity"] == 0.5
+    assert recs[0]["collaborative_score"] == pytest.approx(0.5 * 1 / np.sqrt(2), abs=1e-4)
+    assert recs[0]["final_score"] == pytest.approx(0.5 + 0.5 * 1 / np.sqrt(2), abs=1e-4)
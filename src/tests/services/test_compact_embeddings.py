@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from src.services.compact_embeddings import CompactMatrix
+
+
+@pytest.fixture
+def embeddings() -> np.ndarray:
+    return np.random.default_rng(0).normal(size=(300, 128)).astype(np.float32) * 5
+
+
+@pytest.mark.parametrize("dtype, atol", [("float32", 1e-6), ("float16", 1e-3), ("int8", 1e-2)])
+def test_dot_is_cosine_within_quantization_error(embeddings, dtype, atol):
+    matrix = CompactMatrix.from_embeddings(embeddings, dtype)
+    assert matrix.dtype == dtype
+    ratio = {"float32": 1, "float16": 2, "int8": 4}[dtype]
+    assert matrix.nbytes <= embeddings.nbytes // ratio + 4 * len(embeddings)
+
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    queries = normalized[:20]
+    expected = normalized @ queries.T
+    np.testing.assert_allclose(matrix.dot(queries), expected, atol=atol)
+    np.testing.assert_allclose(matrix.dot(queries[0]), expected[:, 0], atol=atol)
+    np.testing.assert_allclose(matrix.to_float32(), normalized, atol=atol)
+
+
+def test_assemble_reuses_rows_without_requantization(embeddings):
+    old = CompactMatrix.from_embeddings(embeddings[:3], "int8")
+    new = CompactMatrix.from_embeddings(embeddings[3:5], "int8")
+
+    merged = CompactMatrix.assemble([old[np.array([2, 0])], new], [np.array([0, 3]), np.array([1, 2])], 4)
+    np.testing.assert_array_equal(merged.data, np.stack([old.data[2], new.data[0], new.data[1], old.data[0]]))
+    np.testing.assert_array_equal(merged.scale, [old.scale[2], new.scale[0], new.scale[1], old.scale[0]])
@@ -0,0 +1,152 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock
+
+from src.services.load_shedding import InferenceLimiter
+from src.services.recommendation_engine import RecommendationEngine
+from src.services.recommendation_service import RecommendationService
+from src.services.skill_index import SkillIndex
+from src.db.models import Student, Project
+from src.db.student_repository import StudentRepository
+from src.db.project_repository import ProjectRepository
+
+
+@pytest.fixture
+def projects() -> list[Project]:
+    return [
+        Project(id=1, name="Proj A", stack="python, fastapi", required_roles="backend", description="A"),
+        Project(id=2, name="Proj B", stack="react", required_roles="frontend", description="B"),
+        Project(id=3, name="Proj C", stack="python", required_roles="frontend", description="C"),
+    ]
+
+
+@pytest.fixture
+def repos(projects):
+    student_repo = AsyncMock(spec=StudentRepository)
+    student_repo.get_student_by_id.return_value = Student(
+        id=1, username="s1", stack="python, fastapi", desired_role="backend")
+    project_repo = AsyncMock(spec=ProjectRepository)
+    project_repo.get_active_projects.return_value = projects
+    return student_repo, project_repo
+
+
+def make_engine(model_service, limiter=None) -> RecommendationEngine:
+    return RecommendationEngine(
+        model_service=model_service,
+        skill_index=SkillIndex({}, {}),
+        inference_limiter=limiter or InferenceLimiter(max_concurrency=1, max_queue=0))
+
+
+def test_rank_by_overlap(projects):
+    index = SkillIndex({}, {})
+    index.sync(projects)
+
+    # Проект 1: python + fastapi + backend, проект 3: python, проект 2 без совпадений не предлагается
+    assert index.rank_by_overlap("python, fastapi", "backend", 3) == [(1, 3), (3, 1)]
+    assert index.rank_by_overlap("python, fastapi", "backend", 1) == [(1, 3)]
+
+
+def test_rank_by_overlap_breaks_ties_by_id():
+    index = SkillIndex({}, {})
+    index.sync([Project(id=project_id, is_active=True, stack="python", required_roles="backend", description="d")
+                for project_id in (50, 7, 31, 2, 19, 44, 12)])
+
+    assert index.rank_by_overlap("python", None, 3) == [(2, 1), (7, 1), (12, 1)]
+
+
+@pytest.mark.asyncio
+async def test_degraded_when_model_not_loaded(repos):
+    engine = make_engine(model_service=None)
+
+    recommendations = await engine.get_recommendations(1, *repos, top_n=2)
+
+    assert [rec["project_id"] for rec in recommendations] == [1, 3]
+    assert all(rec["degraded"] for rec in recommendations)
+    assert recommendations[0]["final_score"] == recommendations[0]["bonus_score"] == 0.15
+    assert recommendations[0]["base_similarity"] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_degraded_on_model_failure(repos):
+    model_service = AsyncMock(spec=RecommendationService)
+    model_service.predict_for_student.side_effect = RuntimeError("CUDA out of memory")
+    engine = make_engine(model_service)
+
+    recommendations = await engine.get_recommendations(1, *repos, top_n=2)
+
+    assert all(rec["degraded"] for rec in recommendations)
+    assert engine.model_failures == 1
+
+
+@pytest.mark.asyncio
+async def test_data_errors_are_not_masked(repos):
+    model_service = AsyncMock(spec=RecommendationService)
+    model_service.predict_for_student.side_effect = ValueError("Project stack, required roles, or description is missing.")
+    engine = make_engine(model_service)
+
+    with pytest.raises(ValueError):
+        await engine.get_recommendations(1, *repos)
+
+
+@pytest.mark.asyncio
+async def test_load_shedding_when_queue_is_full(repos):
+    release = asyncio.Event()
+
+    async def slow_predict(student, projects):
+        await release.wait()
+        return {p.id: 0.5 for p in projects}
+
+    model_service = AsyncMock(spec=RecommendationService)
+    model_service.predict_for_student.side_effect = slow_predict
+    limiter = InferenceLimiter(max_concurrency=1, max_queue=0)
+    engine = make_engine(model_service, limiter)
+
+    in_flight = asyncio.create_task(engine.get_recommendations(1, *repos, top_n=2))
+    await asyncio.sleep(0)
+    shed = await engine.get_recommendations(1, *repos, top_n=2)
+    release.set()
+    full = await in_flight
+
+    assert all(rec["degraded"] for rec in shed)
+    assert not any(rec.get("degraded") for rec in full)
+    assert limiter.shed == 1
+
+
+@pytest.mark.asyncio
+async def test_deadline_returns_best_partial_ranking(repos):
+    scored = []
+
+    async def slow_predict(student, projects):
+        scored.append([p.id for p in projects])
+        await asyncio.sleep(0.05)
+        return {p.id: 0.5 for p in projects}
+
+    model_service = AsyncMock(spec=RecommendationService)
+    model_service.predict_for_student.side_effect = slow_predict
+    engine = make_engine(model_service, InferenceLimiter(max_concurrency=1, max_queue=4))
+    engine.anytime_chunk_size = 1
+
+    partial = await engine.get_recommendations(1, *repos, top_n=2, deadline=time.monotonic() + 0.03)
+    # Проекты оцениваются по убыванию пересечения со студентом, после дедлайна новые пачки не начинаются
+    assert scored == [[1]]
+    assert [rec["project_id"] for rec in partial] == [1]
+    assert all(rec["complete"] is False for rec in partial)
+    assert engine.deadline_misses == 1
+
+    scored.clear()
+    full = await engine.get_recommendations(1, *repos, top_n=2, deadline=time.monotonic() + 10)
+    assert scored == [[1], [3], [2]]
+    assert len(full) == 2 and not any("complete" in rec for rec in full)
+
+
+@pytest.mark.asyncio
+async def test_expired_deadline_falls_back_to_overlap_ranking(repos):
+    model_service = AsyncMock(spec=RecommendationService)
+    engine = make_engine(model_service)
+
+    recommendations = await engine.get_recommendations(1, *repos, top_n=2, deadline=time.monotonic() - 1)
+
+    model_service.predict_for_student.assert_not_called()
+    assert [rec["project_id"] for rec in recommendations] == [1, 3]
+    assert all(rec["degraded"] and rec["complete"] is False for rec in recommendations)
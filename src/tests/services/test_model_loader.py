@@ -0,0 +1,91 @@
+import json
+import types
+import pytest
+import torch
+
+from src.services.model_loader import (
+    ModelLoader, apply_torch_tuning, current_version, load_tuning, save_tuning, set_current_version, write_manifest)
+from src.services.model_manager import ModelManager
+from src.services.recommendation_model import TwoTowerModel
+
+
+def publish(model_dir, version, stack_terms):
+    version_dir = model_dir / version
+    version_dir.mkdir(parents=True)
+    stack_vocab = {term: i for i, term in enumerate(stack_terms)}
+    roles_vocab = {"backend": 0, "frontend": 1}
+    student_dim = len(stack_vocab) + len(roles_vocab)
+    torch.save(TwoTowerModel(student_dim, student_dim + 384).state_dict(), version_dir / "recsys_model.pth")
+    (version_dir / "stack_vocab.json").write_text(json.dumps(stack_vocab))
+    (version_dir / "roles_vocab.json").write_text(json.dumps(roles_vocab))
+    return write_manifest(version_dir)
+
+
+def test_versions_resolve_through_current(tmp_path):
+    publish(tmp_path, "v1", ["python", "docker"])
+    manifest = publish(tmp_path, "v2", ["python", "docker", "react"])
+    assert manifest["student_dim"] == 5 and manifest["project_dim"] == 389
+
+    set_current_version(tmp_path, "v1")
+    assert current_version(tmp_path) == "v1"
+    assert ModelLoader(str(tmp_path)).load_model()["version"] == "v1"
+
+    set_current_version(tmp_path, "v2")
+    loaded = ModelLoader(str(tmp_path)).load_model()
+    assert loaded["version"] == "v2" and len(loaded["stack_vocab"]) == 3
+    assert ModelLoader(str(tmp_path), "v1").load_model()["version"] == "v1"
+
+    with pytest.raises(FileNotFoundError):
+        set_current_version(tmp_path, "v3")
+    with pytest.raises(ValueError):
+        set_current_version(tmp_path, "../v1")
+    assert current_version(tmp_path) == "v2"
+
+
+def test_checksum_mismatch_is_rejected(tmp_path):
+    publish(tmp_path, "v1", ["python", "docker"])
+    (tmp_path / "v1" / "stack_vocab.json").write_text(json.dumps({"python": 0, "go": 1}))
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        ModelLoader(str(tmp_path), "v1").load_model()
+
+
+def test_flat_directory_without_manifest_is_unversioned(tmp_path):
+    publish(tmp_path, "v1", ["python"])
+    (tmp_path / "v1" / "manifest.json").unlink()
+
+    assert ModelLoader(str(tmp_path / "v1")).load_model()["version"] == "unversioned"
+
+
+def test_tuning_is_applied_on_load(tmp_path):
+    publish(tmp_path, "v1", ["python"])
+    tuning_path = str(tmp_path / "tuning.json")
+    assert load_tuning(tuning_path) == {}
+    (tmp_path / "tuning.json").write_text("{broken")
+    assert load_tuning(tuning_path) == {}
+
+    threads = torch.get_num_threads()
+    try:
+        save_tuning(tuning_path, {"torch_num_threads": 1, "text_batch_size": 16, "uvicorn_workers": 2})
+        loaded = ModelLoader(str(tmp_path), "v1", tuning_path).load_model()
+        assert loaded["tuning"]["text_batch_size"] == 16
+        assert torch.get_num_threads() == 1
+    finally:
+        apply_torch_tuning({"torch_num_threads": threads})
+
+
+@pytest.mark.asyncio
+async def test_failed_reload_does_not_switch_current(tmp_path):
+    publish(tmp_path, "v1", ["python"])
+    publish(tmp_path, "v2", ["python"])
+    set_current_version(tmp_path, "v1")
+    manager = ModelManager(types.SimpleNamespace(), str(tmp_path), session_factory=None)
+
+    def broken(version, text_model):
+        raise ValueError("Checksum mismatch")
+
+    manager._build_service = broken
+    with pytest.raises(ValueError):
+        await manager.reload("v2", activate=True)
+    assert current_version(tmp_path) == "v1"
+    assert manager.status == "failed" and manager.failed_version == "v2"
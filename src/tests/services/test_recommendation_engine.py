@@ -390,6 +390,37 @@ async def test_rounding_of_scores(
     assert str(rec["bonus_score"]).split('.')[-1].length <= 4 if '.' in str(rec["bonus_score"]) else True
     assert str(rec["final_score"]).split('.')[-1].length <= 4 if '.' in str(rec["final_score"]) else True
 
+@pytest.mark.asyncio
+async def test_precomputed_rows_are_skipped_when_stale():
+    import datetime
+    from src.db.models import StudentRecommendation
+    from src.services.recommendation_service import student_profile_key
+
+    computed_at = datetime.datetime(2025, 1, 1, 12, 0)
+    student = Student(id=1, username="s", stack="python", desired_role="backend")
+    project = Project(id=101, name="P", stack="python", required_roles="backend", updated_at=computed_at)
+    rec = StudentRecommendation(student_id=1, rank=0, project_id=101, final_score=0.9, base_similarity=0.8, bonus_score=0.1,
+                                computed_at=computed_at, model_version="none", profile_key=student_profile_key("python", "backend"))
+    recommendation_repo = AsyncMock()
+    recommendation_repo.get_for_student.return_value = [(rec, project, student)]
+    engine = RecommendationEngine(model_service=None)
+
+    assert (await engine.get_precomputed_recommendations(1, recommendation_repo, top_n=1))[0]["project_id"] == 101
+
+    student.stack = "go"
+    assert await engine.get_precomputed_recommendations(1, recommendation_repo, top_n=1) is None
+    student.stack = "python"
+    project.updated_at = computed_at + datetime.timedelta(minutes=1)
+    assert await engine.get_precomputed_recommendations(1, recommendation_repo, top_n=1) is None
+    project.updated_at = computed_at
+    rec.model_version = "v1"
+    assert await engine.get_precomputed_recommendations(1, recommendation_repo, top_n=1) is None
+    rec.model_version = "none"
+
+    engine.collaborative, engine.collaborative_weight = object(), 0.5
+    assert await engine.get_precomputed_recommendations(1, recommendation_repo, top_n=1) is None
+    assert recommendation_repo.get_for_student.await_count == 4
+
 # Ensure all necessary imports are at the top and model instantiations are correct.
 # For Student/Project, if they are SQLAlchemy models, they might need to be instantiated differently
 # or mocked more thoroughly if their __init__ triggers DB calls or requires a session.
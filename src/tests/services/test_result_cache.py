@@ -0,0 +1,90 @@
+import asyncio
+import pytest
+
+from src.services.result_cache import CacheBackend, InProcessBackend, ResultCache, SQLiteBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend_factory(request, tmp_path):
+    if request.param == "memory":
+        backend = InProcessBackend()
+        return lambda: backend
+    return lambda: SQLiteBackend(str(tmp_path / "cache.sqlite3"))
+
+
+@pytest.mark.asyncio
+async def test_multi_get_and_ttl(backend_factory):
+    cache = ResultCache(backend_factory())
+    await cache.set_many({"a": b"1", "b": b"2"})
+    assert await cache.get_many(["a", "b", "c"]) == {"a": b"1", "b": b"2"}
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+    cache.backend.set_many({"x": b"gone"}, ttl=1e-9)
+    assert await cache.get("x") is None
+
+
+@pytest.mark.asyncio
+async def test_stampede_lock_computes_once_across_workers(backend_factory):
+    # Два ResultCache над одним хранилищем имитируют два воркера uvicorn
+    workers = [ResultCache(backend_factory(), poll_interval=0.001) for _ in range(2)]
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return b"value", True
+
+    results = await asyncio.gather(*(workers[i % 2].get_or_compute("key", compute) for i in range(6)))
+
+    assert results == [b"value"] * 6
+    assert calls == 1
+    assert sum(w.stats()["waits"] for w in workers) == 5
+
+
+@pytest.mark.asyncio
+async def test_uncacheable_result_releases_lock(backend_factory):
+    cache = ResultCache(backend_factory(), poll_interval=0.001)
+
+    async def degraded():
+        return b"degraded", False
+
+    assert await cache.get_or_compute("key", degraded) == b"degraded"
+    assert await cache.get("key") is None
+    assert not cache.backend.is_locked("key")
+
+
+@pytest.mark.asyncio
+async def test_invalidate_prefix_keeps_other_versions(backend_factory):
+    cache = ResultCache(backend_factory())
+    await cache.set_many({"student:v1:1:5": b"old", "student:v1:2:5": b"old", "student:v2:1:5": b"new", "student:v1_b:1:5": b"x"})
+
+    assert await cache.invalidate_prefix("student:v1:") == 2
+    assert await cache.get_many(["student:v1:1:5", "student:v2:1:5", "student:v1_b:1:5"]) == {
+        "student:v2:1:5": b"new", "student:v1_b:1:5": b"x"}
+
+
+def test_sqlite_purges_expired_rows(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "cache.sqlite3"), purge_every=3)
+    backend.set_many({"old1": b"1", "old2": b"2"}, ttl=1e-9)
+    backend.set_many({"kept": b"3"}, ttl=0)
+    rows = {key for (key,) in backend.conn.execute("SELECT key FROM cache")}
+    assert rows == {"kept"}
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+    assert SQLiteBackend.blocking and not InProcessBackend.blocking
+
+
+@pytest.mark.asyncio
+async def test_miss_after_multi_get_is_counted_once(backend_factory):
+    cache = ResultCache(backend_factory())
+
+    async def compute():
+        return b"value", True
+
+    assert await cache.get_many(["key"]) == {}
+    assert await cache.get_or_compute("key", compute, lookup=False) == b"value"
+    assert cache.stats()["misses"] == 1
@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+
+from src.services.recommendation_engine import RecommendationEngine
+from src.services.recommendation_service import RecommendationService
+from src.services.skill_index import SkillIndex, shortlist_recall
+from src.db.models import Student, Project
+from src.db.student_repository import StudentRepository
+from src.db.project_repository import ProjectRepository
+
+STACK_VOCAB = {"python": 0, "fastapi": 1, "docker": 2, "react": 3, "java": 4}
+ROLES_VOCAB = {"backend": 0, "frontend": 1}
+
+
+def make_project(project_id: int, stack: str, roles: str = "backend", is_active: bool = True) -> Project:
+    return Project(id=project_id, name=f"Proj {project_id}", stack=stack, required_roles=roles,
+                   description="Desc", is_active=is_active)
+
+
+@pytest.fixture
+def skill_index() -> SkillIndex:
+    index = SkillIndex(STACK_VOCAB, ROLES_VOCAB)
+    index.sync([
+        make_project(1, "python, fastapi, docker"),
+        make_project(2, "python, react", "frontend"),
+        make_project(3, "java"),
+        make_project(4, "react", "frontend"),
+    ])
+    return index
+
+
+def test_shortlist_orders_by_overlap(skill_index: SkillIndex):
+    # Проект 1: python + fastapi + backend = 3, проект 2: python = 1, проект 3: backend = 1
+    assert skill_index.shortlist("python, fastapi", "backend", 10) == [1, 2, 3]
+    assert skill_index.shortlist("python, fastapi", "backend", 2) == [1, 2]
+    assert skill_index.shortlist("kotlin", "designer", 10) == []
+
+
+def test_sync_reindexes_changed_and_drops_missing(skill_index: SkillIndex):
+    skill_index.sync([
+        make_project(1, "java"),
+        make_project(2, "python, react", "frontend"),
+        make_project(4, "react", "frontend", is_active=False),
+    ])
+
+    assert set(skill_index.projects) == {1, 2}
+    assert skill_index.shortlist("java", None, 10) == [1]
+    assert skill_index.shortlist("fastapi", None, 10) == []
+
+
+def test_terms_outside_vocab_are_indexed():
+    index = SkillIndex(STACK_VOCAB, ROLES_VOCAB)
+    index.sync([make_project(1, "rust, python")])
+
+    assert index.shortlist("rust", None, 10) == [1]
+
+
+def test_shortlist_recall():
+    assert shortlist_recall([[1, 2], [3, 4]], [[1, 2], [3, 5]]) == 0.75
+
+
+@pytest.mark.asyncio
+async def test_engine_scores_only_shortlisted_projects(skill_index: SkillIndex):
+    model_service = AsyncMock(spec=RecommendationService)
+    model_service.predict_for_student.return_value = {1: 0.5, 2: 0.4}
+    student_repo = AsyncMock(spec=StudentRepository)
+    project_repo = AsyncMock(spec=ProjectRepository)
+    student = Student(id=1, username="s1", stack="python, fastapi", desired_role="backend")
+    student_repo.get_student_by_id.return_value = student
+    projects = list(skill_index.projects.values())
+    project_repo.get_active_projects.return_value = projects
+
+    engine = RecommendationEngine(model_service=model_service, skill_index=skill_index, shortlist_size=2)
+    recommendations = await engine.get_recommendations(1, student_repo, project_repo, top_n=2)
+
+    scored_projects = model_service.predict_for_student.call_args.args[1]
+    assert [p.id for p in scored_projects] == [1, 2]
+    assert [rec["project_id"] for rec in recommendations] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_warm_snapshot_skips_project_query_and_cold_fetch_is_concurrent(skill_index: SkillIndex):
+    model_service = AsyncMock(spec=RecommendationService)
+    model_service.predict_for_student.return_value = {1: 0.5}
+    student = Student(id=1, username="s1", stack="python", desired_role="backend")
+    both_started = asyncio.Event()
+    started = 0
+
+    async def fetch(result):
+        nonlocal started
+        started += 1
+        if started == 2:
+            both_started.set()
+        await asyncio.wait_for(both_started.wait(), timeout=1)
+        return result
+
+    async def get_student_by_id(student_id):
+        return await fetch(student)
+
+    async def get_active_projects():
+        return await fetch(list(skill_index.projects.values()))
+
+    student_repo = AsyncMock(spec=StudentRepository)
+    student_repo.get_student_by_id.side_effect = get_student_by_id
+    project_repo = AsyncMock(spec=ProjectRepository)
+    project_repo.get_active_projects.side_effect = get_active_projects
+
+    engine = RecommendationEngine(model_service=model_service, skill_index=skill_index, project_snapshot_max_age=60)
+    skill_index.synced_at = None
+    await engine.get_recommendations(1, student_repo, project_repo, top_n=1)
+    assert project_repo.get_active_projects.call_count == 1
+
+    student_repo.get_student_by_id.side_effect = None
+    student_repo.get_student_by_id.return_value = student
+    await engine.get_recommendations(1, student_repo, project_repo, top_n=1)
+    assert project_repo.get_active_projects.call_count == 1
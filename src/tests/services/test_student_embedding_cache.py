@@ -0,0 +1,59 @@
+import pytest
+import torch
+
+from src.services.embedding_cache import EmbeddingCache
+from src.services.recommendation_service import RecommendationService, student_profile_key
+from src.db.models import Student
+
+
+def test_profile_key_ignores_term_order_and_case():
+    assert student_profile_key("Python, Docker", "backend") == student_profile_key("docker, python", "Backend")
+    assert student_profile_key("python, docker", "backend") != student_profile_key("python", "backend")
+    assert student_profile_key("python", "backend") != student_profile_key("python", "frontend")
+
+
+def test_lru_eviction_and_stats():
+    cache = EmbeddingCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # "b" давно не использовался и вытесняется
+
+    assert "b" not in cache
+    assert cache.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+    assert cache.stats() == {"size": 2, "max_size": 2, "hits": 3, "misses": 1}
+
+
+def test_identical_profiles_share_embedding(model_service: RecommendationService):
+    students = [
+        Student(id=1, username="s1", stack="python, docker", desired_role="backend"),
+        Student(id=2, username="s2", stack="docker, python", desired_role="backend"),
+        Student(id=3, username="s3", stack="react", desired_role="frontend"),
+    ]
+
+    embeddings = model_service.embed_students(students)
+
+    assert embeddings.shape == (3, 128)
+    assert torch.equal(embeddings[0], embeddings[1])
+    assert len(model_service.student_embeddings) == 2
+
+
+def test_profile_edit_misses_cache(model_service: RecommendationService):
+    student = Student(id=1, username="s1", stack="python", desired_role="backend")
+    before = model_service.embed_student(student)
+    assert torch.equal(model_service.embed_student(student), before)
+
+    student.stack = "python, fastapi"
+    after = model_service.embed_student(student)
+
+    assert not torch.equal(after, before)
+    assert len(model_service.student_embeddings) == 2
+
+
+def test_batched_embeddings_match_single_pass(model_service: RecommendationService):
+    student = Student(id=1, username="s1", stack="python, fastapi", desired_role="backend")
+    features = model_service._vectorize_student(student, model_service.stack_vocab, model_service.roles_vocab)
+    with torch.no_grad():
+        expected = model_service.model.s_tower(torch.tensor(features, dtype=torch.float32).unsqueeze(0))
+
+    assert torch.allclose(model_service.embed_student(student), expected)
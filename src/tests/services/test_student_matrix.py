@@ -0,0 +1,90 @@
+import threading
+import numpy as np
+import pytest
+
+from src.services.student_matrix import StudentMatrix
+from src.db.models import Student
+
+
+@pytest.fixture
+def students() -> list[Student]:
+    return [
+        Student(id=1, username="s1", stack="python, fastapi", desired_role="backend", year=3, group_id="A", team_id=None),
+        Student(id=2, username="s2", stack="react", desired_role="frontend", year=3, group_id="B", team_id=7),
+        Student(id=3, username="s3", stack="python, docker", desired_role="backend", year=2, group_id="A", team_id=None),
+        Student(id=4, username="s4", stack="docker", desired_role="backend", year=2, group_id="B", team_id=None),
+        Student(id=5, username="s5", stack=None, desired_role="backend", year=2, group_id="B", team_id=None),
+    ]
+
+
+def test_top_k_matches_brute_force_with_filters(model_service, students):
+    matrix = StudentMatrix()
+    assert matrix.sync(students, model_service) == 4
+    project_embedding = np.random.default_rng(0).normal(size=128).astype(np.float32)
+
+    embeddings = model_service.embed_students(students[:4]).numpy()
+    cosine = embeddings @ project_embedding / np.linalg.norm(embeddings, axis=1) / np.linalg.norm(project_embedding)
+    matches = np.array([len({"python", "docker"} & set(s.stack.split(", "))) for s in students[:4]])
+    final = cosine + 0.05 * matches
+
+    ranked = matrix.top_k(project_embedding, "python, docker", k=4)
+    assert [c.student.id for c in ranked] == [students[i].id for i in np.argsort(-final, kind="stable")]
+    np.testing.assert_allclose([c.final_score for c in ranked], np.sort(final)[::-1], atol=1e-5)
+
+    assert {c.student.id for c in matrix.top_k(project_embedding, "python", 4, year=2)} == {3, 4}
+    assert {c.student.id for c in matrix.top_k(project_embedding, "python", 4, group_id="B", unassigned_only=True)} == {4}
+
+
+def test_sync_recomputes_only_changed_profiles(model_service, students):
+    matrix = StudentMatrix()
+    matrix.sync(students, model_service)
+
+    students[0].stack = "python, react"
+    assert matrix.sync(students[:3], model_service) == 1
+    assert len(matrix) == 3
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_compact_storage_keeps_scores(model_service, students, dtype):
+    exact, compact = StudentMatrix(), StudentMatrix(dtype)
+    exact.sync(students, model_service)
+    compact.sync(students, model_service)
+    assert compact.nbytes < exact.nbytes
+
+    students[0].stack = "react"
+    assert compact.sync(students, model_service) == 1
+    exact.sync(students, model_service)
+    project_embedding = np.random.default_rng(1).normal(size=128).astype(np.float32)
+    expected = {c.student.id: c.final_score for c in exact.top_k(project_embedding, "python", k=4)}
+    actual = {c.student.id: c.final_score for c in compact.top_k(project_embedding, "python", k=4)}
+    assert actual.keys() == expected.keys()
+    np.testing.assert_allclose([actual[i] for i in expected], list(expected.values()), atol=1e-2)
+
+
+def test_concurrent_syncs_do_not_mix_rows(model_service, students):
+    matrix = StudentMatrix()
+    matrix.sync(students[:2], model_service)
+    embed_students = model_service.embed_students
+    entered, release = threading.Event(), threading.Event()
+
+    def slow_embed(batch):
+        if not entered.is_set():
+            entered.set()
+            release.wait(5)
+        return embed_students(batch)
+
+    model_service.embed_students = slow_embed
+    # Первая синхронизация ждет внутри embed_students, вторая за это время переставляет строки
+    first = threading.Thread(target=matrix.sync, args=(students, model_service))
+    first.start()
+    entered.wait(5)
+    second = threading.Thread(target=matrix.sync, args=(students[::-1], model_service))
+    second.start()
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    fresh = StudentMatrix()
+    fresh.sync(students[::-1], model_service)
+    assert [s.id for s in matrix._snapshot.students] == [s.id for s in fresh._snapshot.students]
+    np.testing.assert_allclose(matrix._snapshot.embeddings.to_float32(), fresh._snapshot.embeddings.to_float32(), atol=1e-6)
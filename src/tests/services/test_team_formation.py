@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock
+
+from src.services.distribution import DistributionService
+from src.services.team_formation import TeamFormation
+from src.db.models import Project, Student
+
+
+def random_formation(n_students, team_size, seed=0):
+    rng = np.random.default_rng(seed)
+    n_projects, n_roles, n_stack = 40, 8, 30
+    student_roles = (rng.random((n_students, n_roles)) < 0.15).astype(np.float32)
+    student_roles[np.arange(n_students), rng.integers(0, n_roles, n_students)] = 1.0
+    return TeamFormation(
+        student_roles,
+        (rng.random((n_students, n_stack)) < 0.08).astype(np.float32),
+        (rng.random((n_projects, n_roles)) < 0.35).astype(np.float32),
+        (rng.random((n_projects, n_stack)) < 0.1).astype(np.float32),
+        rng.normal(0.3, 0.15, (n_students, n_projects)),
+        rng.integers(1, 4, n_projects),
+        team_size,
+        seed=seed)
+
+
+def test_greedy_builds_complementary_teams():
+    # Два бэкендера и два фронтендера, проекту нужны обе роли: каждая команда закрывает обе
+    roles = np.array([[1, 0], [1, 0], [0, 1], [0, 1]], dtype=np.float32)
+    formation = TeamFormation(roles, np.zeros((4, 0)), np.array([[1, 1]]), np.zeros((1, 0)),
+                              np.full((4, 1), 0.5), np.array([2]), team_size=2)
+    formation.build()
+    teams = formation.teams()
+    assert [sorted(t["students"]) for t in teams] in ([[0, 2], [1, 3]], [[0, 3], [1, 2]])
+    assert all(t["role_coverage"] == 1.0 for t in teams)
+    assert formation.objective() == pytest.approx(2 * (1.0 + 0.5))
+
+
+def test_local_search_improves_and_keeps_state_consistent():
+    formation = random_formation(1000, 5)
+    formation.build()
+    greedy = formation.objective()
+    formation.improve(time_limit=10.0, max_passes=5)
+
+    assert formation.objective() >= greedy
+    assert sorted(s for t in formation.members for s in t) == list(range(1000))
+    assert [len(t) for t in formation.members] == formation.sizes.tolist()
+    np.testing.assert_array_equal(np.bincount(formation.target, minlength=40), formation.load)
+    # Инкрементально поддерживаемые счетчики совпадают с пересчитанными с нуля
+    for team, members in enumerate(formation.members):
+        np.testing.assert_allclose(formation.role_counts[team], formation.student_roles[members].sum(axis=0))
+        assert formation.affinity_sum[team] == pytest.approx(formation.affinity[members, formation.target[team]].sum())
+
+
+def test_team_sizes_are_balanced():
+    formation = random_formation(23, 5)
+    assert sorted(formation.sizes.tolist()) == [4, 4, 5, 5, 5]
+
+
+@pytest.mark.asyncio
+async def test_form_teams_reports_ids_and_objective():
+    students = [Student(id=100 + i, username=f"s{i}", desired_role=role, stack="python")
+                for i, role in enumerate(["backend", "frontend", "backend", "frontend", None])]
+    projects = [Project(id=7, name="p", stack="python, react", required_roles="backend, frontend",
+                        description="d", teams_amount=2)]
+    student_repo, project_repo = AsyncMock(), AsyncMock()
+    student_repo.get_students_without_team.return_value = students
+    project_repo.get_active_projects.return_value = projects
+
+    report = await DistributionService(model_service=None).form_teams(student_repo, project_repo, team_size=3)
+    assert sorted(s for t in report["teams"] for s in t["student_ids"]) == [100, 101, 102, 103, 104]
+    assert {t["project_id"] for t in report["teams"]} == {7}
+    assert all(t["role_coverage"] == 1.0 for t in report["teams"])
+    assert report["objective"] >= report["greedy_objective"]
+    assert set(report["elapsed_ms"]) == {"prepare", "greedy", "local_search", "total"}